@@ -0,0 +1,152 @@
+"""
+Async versions of the I/O-bound auth endpoints for ASGI deployments
+(``SERVER_MODE=asgi``, see the Procfile).
+
+They answer exactly like their DRF counterparts in views.py, but the
+password hash runs on ``hashing.hashing_pool`` so it never blocks the event
+loop, and ORM calls go through ``sync_to_async``; Django 3.2 has no async
+ORM. When the hashing queue is full they answer 503 instead of piling up
+more work. Emails are only queued in the outbox, never sent inline.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.http import HttpResponseNotAllowed, JsonResponse, QueryDict
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError
+
+from .backends import CachedJWTAuthentication
+from .hashing import HashQueueFull, hashing_pool
+from .models import User
+from .registration import (queue_password_reset_email, queue_verification_email,
+                           register_user, registration_data)
+from .serializers import (LoginSerializer, RegisterSerializer,
+                          SetNewPasswordSerializer, UserSerializer, check_user_password)
+
+
+def async_api_view(*methods):
+    """
+    Restrict an async view to ``methods`` and exempt it from CSRF like DRF
+    views are. Django's own decorators wrap views in sync functions, which
+    would hide the coroutine from the handler.
+    """
+    def decorator(view):
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            try:
+                return await view(request, *args, **kwargs)
+            except HashQueueFull:
+                response = JsonResponse(
+                    {'detail': 'Too many requests in progress, try again shortly.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                response['Retry-After'] = '1'
+                return response
+            except APIException as exc:
+                return error_response(exc)
+        wrapped.__name__ = view.__name__
+        wrapped.__doc__ = view.__doc__
+        wrapped.csrf_exempt = True
+        return wrapped
+    return decorator
+
+
+def error_response(exc):
+    """Render ``exc`` the way DRF's exception handler does."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = JsonResponse(data, status=exc.status_code, safe=False)
+    if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+        # What JWTAuthentication.authenticate_header gives the DRF views
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
+
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
+    if request.method == 'POST':
+        return request.POST
+    return QueryDict(request.body)
+
+
+async def authenticate(request):
+    """The user of the request's bearer token, as the DRF views see it."""
+    result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    if result is None:
+        raise NotAuthenticated()
+    return result[0]
+
+
+def user_by_email(email):
+    return User.objects.filter(email=email).first()
+
+
+@async_api_view('POST')
+async def login(request):
+    """LoginAPIView.post with the password check on the hashing pool."""
+    serializer = LoginSerializer(data=request_data(request), context={'request': request})
+    attrs = serializer.to_internal_value(serializer.initial_data)
+    user = await sync_to_async(serializer.get_user)(attrs)
+    valid = await hashing_pool.run(check_user_password, user, attrs.get('password', ''))
+    data = await sync_to_async(serializer.authenticate)(user, attrs, valid)
+    return JsonResponse(serializer.to_representation(data))
+
+
+@async_api_view('POST')
+async def register(request):
+    """RegisterView.post with the password hashed on the hashing pool."""
+    data = request_data(request)
+    serializer = RegisterSerializer(data=registration_data(data))
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    password_hash = await hashing_pool.run(make_password, serializer.validated_data['password'])
+    await sync_to_async(register_user)(serializer, data.get('callBackUrl') or '',
+                                       password_hash=password_hash)
+    return JsonResponse({'data': serializer.data}, status=status.HTTP_201_CREATED)
+
+
+@async_api_view('PATCH')
+async def set_new_password(request):
+    """SetNewPasswordAPIView.patch with the new password hashed on the hashing pool."""
+    serializer = SetNewPasswordSerializer(data=request_data(request))
+    attrs = serializer.to_internal_value(serializer.initial_data)
+    user = await sync_to_async(serializer.get_user)(attrs)
+    user.password = await hashing_pool.run(make_password, attrs['password'])
+    await sync_to_async(user.save)()
+    return JsonResponse({'success': True, 'message': 'Password reset success'})
+
+
+@async_api_view('POST')
+async def resend_verification_email(request):
+    """ResendVerificationEmailView.post."""
+    data = request_data(request)
+    user = await sync_to_async(user_by_email)(data.get('email'))
+    if user is None:
+        return JsonResponse({'error': 'User with this email does not exist.'},
+                            status=status.HTTP_404_NOT_FOUND)
+    if user.is_verified:
+        return JsonResponse({'detail': 'Email already verified.'}, status=status.HTTP_400_BAD_REQUEST)
+    await sync_to_async(queue_verification_email)(user, data.get('callBackUrl') or '')
+    return JsonResponse({'detail': 'Verification email resent.'})
+
+
+@async_api_view('POST')
+async def request_password_reset(request):
+    """RequestPasswordResetEmail.post."""
+    data = request_data(request)
+    user = await sync_to_async(user_by_email)(data.get('email', ''))
+    if user is not None:
+        await sync_to_async(queue_password_reset_email)(request, user, data)
+    return JsonResponse({'success': 'We have sent you a link to reset your password'})
+
+
+@async_api_view('GET')
+async def load_user(request):
+    """LoadUserView.get; the user comes from CachedJWTAuthentication's caches."""
+    user = await authenticate(request)
+    return JsonResponse({'user': UserSerializer(user).data})
@@ -0,0 +1,170 @@
+"""
+JWT authentication that keeps the users table out of the per-request path.
+
+``CachedJWTAuthentication`` caches decoded access tokens in a small
+in-process LRU with a TTL, and the auth-relevant fields of each user
+(``AUTH_USER_FIELDS``) in the Django cache. ``request.user`` is built from
+those fields as a deferred User: reading any other field loads all of the
+missing ones with a single query.
+
+The user fields are only cached when the cache is shared between processes
+(``CACHE_IS_SHARED``), as it is with the default file-based cache. With a
+process-local cache the other workers would never hear of an invalidation
+and keep a deactivated or demoted user's old fields for up to
+``JWT_USER_CACHE_TTL``, so every request reads them from the database
+instead.
+
+Entries are dropped by the receivers in ``signals.py`` when a user is saved
+or deleted, or when one of their refresh tokens is blacklisted. Code that
+changes users with ``QuerySet.update()`` bypasses those signals and has to
+call ``invalidate_user`` itself.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from junior import metrics
+
+from .models import User
+
+# Everything authentication, permission classes and role checks read
+AUTH_USER_FIELDS = ('id', 'email', 'username', 'role', 'is_active', 'is_staff',
+                    'is_superuser', 'is_verified', 'is_approved', 'auth_provider')
+
+
+class LRUTTLCache:
+    """
+    Thread-safe LRU mapping whose entries also expire after a TTL.
+
+    Entries can be set with a ``group``, e.g. the user a token belongs to,
+    and all the entries of a group dropped at once with ``discard_group``
+    without scanning the others.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def _delete(self, key):
+        value, expires, group = self._data.pop(key)
+        if group is not None:
+            keys = self._groups[group]
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires, group = entry
+            if expires <= time.monotonic():
+                self._delete(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, group=None):
+        if ttl <= 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._delete(key)
+            self._data[key] = (value, time.monotonic() + ttl, group)
+            if group is not None:
+                self._groups.setdefault(group, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._delete(next(iter(self._data)))
+
+    def discard_group(self, group):
+        """Drop every entry set with ``group``."""
+        with self._lock:
+            for key in list(self._groups.get(group, ())):
+                self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._groups.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+token_cache = LRUTTLCache(settings.JWT_TOKEN_CACHE_SIZE)
+
+
+def user_cache_key(user_id):
+    return 'auth-user:{}'.format(user_id)
+
+
+def invalidate_user(user_id):
+    """Forget the cached fields and decoded tokens of ``user_id``."""
+    cache.delete(user_cache_key(user_id))
+    token_cache.discard_group(user_id)
+
+
+def invalidate_users(user_ids):
+    """Forget the cached fields of many users, e.g. after a bulk UPDATE."""
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+def user_fields(user_id):
+    return User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}) \
+        .values(*AUTH_USER_FIELDS).first()
+
+
+def cached_user_fields(user_id):
+    # Invalidation only reaches the other processes through a shared cache
+    if not settings.CACHE_IS_SHARED or settings.JWT_USER_CACHE_TTL <= 0:
+        return user_fields(user_id)
+    key = user_cache_key(user_id)
+    fields = cache.get(key)
+    metrics.count_cache('jwt_user', fields is not None)
+    if fields is None:
+        fields = user_fields(user_id)
+        if fields is not None:
+            cache.set(key, fields, settings.JWT_USER_CACHE_TTL)
+    return fields
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        metrics.count_cache('jwt_token', token is not None)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            ttl = min(settings.JWT_TOKEN_CACHE_TTL, token['exp'] - time.time())
+            token_cache.set(raw_token, token, ttl, group=token.get(api_settings.USER_ID_CLAIM))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        fields = cached_user_fields(user_id)
+        if fields is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not fields['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # from_db expects the values in the model's field order
+        names = [field.attname for field in User._meta.concrete_fields
+                 if field.attname in fields]
+        user = User.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+        user.load_all_deferred = True
+        return user
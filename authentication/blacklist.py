@@ -0,0 +1,140 @@
+"""
+In-memory view of the refresh token blacklist, and pruning of the blacklist
+tables.
+
+simplejwt checks every refresh token against ``token_blacklist_blacklistedtoken``
+with a join on ``outstandingtoken``, and both tables only ever grow.
+``BlacklistFilter`` keeps the jtis of the unexpired blacklisted tokens in
+memory instead, so checking a refresh token takes no query. Each process
+loads them on its first request (see ``signals.py``) and afterwards only
+reads rows above the highest id it has seen. Tokens blacklisted in the same
+process are added directly by the ``BlacklistedToken`` post_save receiver,
+which every blacklisting goes through. Other processes notice through a
+version number in the shared cache, or at the latest after
+``TOKEN_BLACKLIST_SYNC_INTERVAL`` seconds when the cache is process-local.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+VERSION_KEY = 'token-blacklist-version'
+
+# Ids are assigned before commit, so a row can become visible after one with
+# a higher id; incremental syncs re-read this many ids below the high-water mark
+SYNC_OVERLAP = 100
+
+
+class BlacklistFilter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiries = {}
+        self._high_water = None
+        self._version = None
+        self._synced_at = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._expiries = {}
+            self._high_water = None
+            self._version = None
+            self._synced_at = 0.0
+
+    def _stale(self, version):
+        return (self._high_water is None or version != self._version
+                or time.monotonic() - self._synced_at > settings.TOKEN_BLACKLIST_SYNC_INTERVAL)
+
+    def sync(self, version=None):
+        now = timezone.now()
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        if self._high_water is not None:
+            rows = rows.filter(pk__gt=self._high_water - SYNC_OVERLAP)
+        rows = list(rows.order_by('pk').values_list('pk', 'token__jti', 'token__expires_at'))
+
+        with self._lock:
+            for pk, jti, expires_at in rows:
+                self._expiries[jti] = expires_at
+                self._high_water = max(self._high_water or 0, pk)
+            if self._high_water is None:
+                self._high_water = 0
+            self._expiries = {jti: expires_at for jti, expires_at in self._expiries.items()
+                              if expires_at > now}
+            self._version = version
+            self._synced_at = time.monotonic()
+
+    def add(self, jti, expires_at):
+        """
+        Record a new blacklist entry here and bump the shared version so
+        the other processes re-sync.
+        """
+        if cache.add(VERSION_KEY, 1, None):
+            previous, version = None, 1
+        else:
+            try:
+                version = cache.incr(VERSION_KEY)
+                previous = version - 1
+            except ValueError:
+                # Evicted between add() and incr()
+                cache.set(VERSION_KEY, 1, None)
+                previous, version = None, 1
+        with self._lock:
+            self._expiries[jti] = expires_at
+            if self._version == previous:
+                # Nothing else changed since our last sync
+                self._version = version
+
+    def __contains__(self, jti):
+        version = cache.get(VERSION_KEY)
+        if self._stale(version):
+            self.sync(version)
+        return jti in self._expiries
+
+    def seed(self):
+        """Load the blacklist now unless it already is."""
+        if self._high_water is None:
+            self.sync(cache.get(VERSION_KEY))
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class RefreshToken(tokens.RefreshToken):
+    """RefreshToken that checks the blacklist through ``blacklist_filter``."""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_filter:
+            raise TokenError(_("Token is blacklisted"))
+
+
+def prune_expired_tokens(batch_size=1000, pause=0):
+    """
+    Delete expired outstanding tokens and their blacklist entries in batches
+    of ``batch_size``, each in its own short transaction, sleeping ``pause``
+    seconds in between. Returns the number of outstanding tokens deleted.
+
+    Tokens have a fixed lifetime, so the expired ones are the oldest ids and
+    the ``ORDER BY id`` scan finds them first without an index on
+    ``expires_at``.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now)
+                   .order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
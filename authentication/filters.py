@@ -0,0 +1,39 @@
+import re
+
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+PHONE_RE = re.compile(r'^\+?[\d\s().-]{7,}$')
+
+
+class DirectorySearchFilter(BaseFilterBackend):
+    """
+    ``?q=`` search for the admin user directory where every branch is
+    answered from an index:
+
+    * input that looks like an email matches ``email`` exactly (ignoring case)
+    * input that looks like a phone number matches ``phone`` exactly
+    * anything else is a case-insensitive prefix match on the names, email
+      and username, or an exact referral code
+
+    The prefix and case-insensitive lookups compile to ``UPPER(col) LIKE
+    'Q%'``, which the ``UPPER(col) text_pattern_ops`` indexes added in
+    migration 0023 serve on PostgreSQL. Substring matches (``icontains``)
+    cannot use a b-tree index and are deliberately not offered.
+    """
+    search_param = 'q'
+
+    def get_search_query(self, term):
+        if '@' in term:
+            return Q(email__iexact=term)
+        if PHONE_RE.match(term):
+            return Q(phone=term)
+        return (Q(firstname__istartswith=term) | Q(lastname__istartswith=term)
+                | Q(username__istartswith=term) | Q(email__istartswith=term)
+                | Q(referral_code=term))
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        return queryset.filter(self.get_search_query(term))
@@ -0,0 +1,97 @@
+"""
+Bounded pool for password hashing in the async views.
+
+PBKDF2 costs tens of milliseconds of CPU per hash; run on the event loop it
+stalls every other request. The async views hand hashes to this pool
+instead. ``hashlib.pbkdf2_hmac`` releases the GIL, so worker threads hash
+in parallel on separate cores without the pickling a process pool needs.
+
+The number of hashes waiting or running is capped at
+``HASHING_MAX_QUEUE``; beyond that ``submit`` raises HashQueueFull and the
+views answer 503, so a credential flood is shed instead of queueing
+without bound. Queue wait times are kept in ``stats()``.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashQueueFull(Exception):
+    pass
+
+
+class HashingPool:
+
+    def __init__(self, workers=None, max_queue=None):
+        self._workers = workers
+        self._max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def workers(self):
+        return self._workers or settings.HASHING_WORKERS
+
+    @property
+    def max_queue(self):
+        return self._max_queue or settings.HASHING_MAX_QUEUE
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='password-hashing')
+            return self._executor
+
+    def _reserve(self):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                raise HashQueueFull()
+            self._pending += 1
+
+    def _run(self, queued_at, func, args):
+        waited = time.monotonic() - queued_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    async def run(self, func, *args):
+        """Run ``func(*args)`` on the pool and await its result."""
+        self._reserve()
+        try:
+            future = self.get_executor().submit(self._run, time.monotonic(), func, args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'wait_seconds_total': self._wait_total,
+                'wait_seconds_max': self._wait_max,
+                'wait_seconds_mean': self._wait_total / self._completed if self._completed else 0.0,
+            }
+
+
+hashing_pool = HashingPool()
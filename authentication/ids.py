@@ -0,0 +1,40 @@
+"""
+Random identifiers for users: referral codes, username suffixes and
+transaction ids.
+
+Codes are drawn from ``secrets`` with enough entropy (10 base-36 characters,
+~51 bits) that a collision is astronomically rare, so nothing is read from
+the database before a write. The unique indexes on the columns catch the
+rare collision and callers retry with fresh codes, see
+``registration.register_user``.
+"""
+import secrets
+import string
+
+ALPHABET = string.ascii_lowercase + string.digits
+
+REFERRAL_CODE_LENGTH = 10
+USERNAME_SUFFIX_LENGTH = 10
+TRANSACTION_ID_LENGTH = 16
+
+
+def random_code(length):
+    return ''.join(secrets.choice(ALPHABET) for _ in range(length))
+
+
+def random_codes(count, length):
+    """Return ``count`` distinct codes, e.g. for a bulk account import."""
+    codes = set()
+    while len(codes) < count:
+        codes.add(random_code(length))
+    return list(codes)
+
+
+def is_collision(error, *columns):
+    """
+    Whether the IntegrityError ``error`` was raised by the unique index of
+    one of ``columns``. The column name is part of the message on both
+    PostgreSQL and SQLite.
+    """
+    message = str(error)
+    return any(column in message for column in columns)
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from authentication.blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted tokens in batches (use --watch to run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch_size', type=int, default=1000, help='Tokens deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument('--watch', action='store_true', help='Keep pruning every --interval seconds')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between runs with --watch')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_expired_tokens(options['batch_size'], options['pause'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens"))
+
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from authentication.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails (use --watch to keep polling)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help='Keep polling for queued emails')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --watch')
+        parser.add_argument('--batch_size', type=int, default=None, help='Messages per SMTP connection')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = 0
+            while True:
+                claimed = deliver_outbox(options['batch_size'])
+                if not claimed:
+                    break
+                processed += claimed
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"Processed {processed} queued emails"))
+
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
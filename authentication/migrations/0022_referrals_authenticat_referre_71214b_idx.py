@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-19 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0021_auto_20261019_0700'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='referrals',
+            index=models.Index(fields=['referred', 'created_at'], name='authenticat_referre_71214b_idx'),
+        ),
+    ]
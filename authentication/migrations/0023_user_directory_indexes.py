@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-19 07:16
+
+from django.db import migrations, models
+
+# Case-insensitive prefix search (istartswith / iexact) compiles to
+# UPPER(col::text) LIKE 'Q%' on PostgreSQL; text_pattern_ops lets these
+# expression indexes serve LIKE under any collation. Built CONCURRENTLY so
+# the users table stays writable, hence the non-atomic migration.
+PREFIX_INDEXED_COLUMNS = ['firstname', 'lastname', 'username', 'email']
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in PREFIX_INDEXED_COLUMNS:
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS user_{0}_prefix_idx '
+            'ON authentication_user (UPPER({0}::text) text_pattern_ops)'.format(column))
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in PREFIX_INDEXED_COLUMNS:
+        schema_editor.execute(
+            'DROP INDEX CONCURRENTLY IF EXISTS user_{0}_prefix_idx'.format(column))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('authentication', '0022_referrals_authenticat_referre_71214b_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-created_at', '-id'], name='user_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['phone'], name='user_phone_idx'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
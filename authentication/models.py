@@ -10,6 +10,8 @@ from django.contrib.auth.models import (
 from django.db import models
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .ids import REFERRAL_CODE_LENGTH, USERNAME_SUFFIX_LENGTH, random_codes
+
 
 def identity_to(instance, filename):
     return 'identity/{filename}'.format(filename=filename)
@@ -17,7 +19,8 @@ def identity_to(instance, filename):
 
 class UserManager(BaseUserManager):
 
-    def create_user(self, username, firstname, lastname, address, referral_code, phone, email, password=None):
+    def create_user(self, username, firstname=None, lastname=None, address=None, referral_code=None,
+                    phone=None, email=None, password=None, password_hash=None, **extra_fields):
         '''if username is None:
             raise TypeError('Users should have a username')
             '''
@@ -25,9 +28,14 @@ class UserManager(BaseUserManager):
             raise TypeError('Users should have a Email')
 
         user = self.model(username=username, firstname=firstname, address=address, lastname=lastname,
-                          phone=phone, referral_code=referral_code, email=self.normalize_email(email))
+                          phone=phone, referral_code=referral_code, email=self.normalize_email(email),
+                          **extra_fields)
         # user = self.model(username=username, #email=self.normalize_email(email))
-        user.set_password(password)
+        if password_hash is not None:
+            # Hashed ahead of time, e.g. on the hashing pool by the async views
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.save()
         return user
 
@@ -45,6 +53,22 @@ class UserManager(BaseUserManager):
         user.save()
         return user
 
+    def bulk_create_users(self, users, batch_size=500):
+        """
+        Insert the unsaved ``users`` in batches, e.g. for an account import.
+
+        Missing referral codes and usernames are filled from one draw of
+        distinct random codes. A collision with an existing row raises
+        IntegrityError for the batch, which the caller can retry.
+        """
+        missing_codes = [user for user in users if not user.referral_code]
+        for user, code in zip(missing_codes, random_codes(len(missing_codes), REFERRAL_CODE_LENGTH)):
+            user.referral_code = code
+        missing_names = [user for user in users if not user.username]
+        for user, name in zip(missing_names, random_codes(len(missing_names), USERNAME_SUFFIX_LENGTH)):
+            user.username = name
+        return self.bulk_create(users, batch_size=batch_size)
+
     def create_superuser(self, email, username, password=None):
         if password is None:
             raise TypeError('Password should not be none')
@@ -93,6 +117,23 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the admin directory
+            models.Index(fields=['-created_at', '-id'], name='user_created_at_idx'),
+            models.Index(fields=['phone'], name='user_phone_idx'),
+        ]
+
+    # Set on the deferred users built by CachedJWTAuthentication
+    load_all_deferred = False
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Reading one deferred field of a cached auth user loads all of them,
+        # so code that uses the whole user pays one query instead of one per field
+        if fields is not None and self.load_all_deferred:
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using, fields)
+
     def __str__(self):
         return str(self.email)
 
@@ -116,6 +157,12 @@ class Referrals(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the referral quota's capped count per referrer
+            models.Index(fields=['referred', 'created_at']),
+        ]
+
     def __str__(self):
         return str(self.created_at)
 
@@ -129,3 +176,30 @@ class Profile(models.Model):
 
     def __str__(self):
         return self.nin
+
+
+class OutgoingEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        SENDING = 'SENDING', _('Sending')
+        SENT = 'SENT', _('Sent')
+        FAILED = 'FAILED', _('Failed')
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, null=True, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Earliest time of the next delivery attempt; while SENDING it is the
+    # lease expiry after which a crashed worker's batch is picked up again
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return str(self.subject)
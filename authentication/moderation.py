@@ -0,0 +1,49 @@
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .backends import invalidate_users
+from .models import User
+
+INVALIDATE_CHUNK_SIZE = 1000
+
+# Bulk moderation filter -> User lookup
+FILTER_LOOKUPS = {
+    'role': 'role',
+    'is_verified': 'is_verified',
+    'is_approved': 'is_approved',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+}
+
+
+def moderation_queryset(ids=None, filters=None):
+    if ids is not None:
+        return User.objects.filter(pk__in=ids)
+    return User.objects.filter(**{FILTER_LOOKUPS[name]: value for name, value in filters.items()})
+
+
+def set_user_flag(queryset, field, value):
+    """
+    Set the boolean ``field`` to ``value`` for every user in ``queryset``
+    with a single UPDATE; returns ``(matched, updated)``.
+
+    Users that already have the value are left alone. ``update()`` sends no
+    post_save signals, so the changed users' cached auth fields are dropped
+    here: they are found again by the ``updated_at`` stamp the UPDATE wrote
+    and streamed in chunks of ``INVALIDATE_CHUNK_SIZE`` ids.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        matched = queryset.count()
+        updated = queryset.exclude(**{field: value}).update(**{field: value, 'updated_at': now})
+    if updated:
+        ids = User.objects.filter(**{field: value, 'updated_at': now}) \
+            .values_list('pk', flat=True).iterator(chunk_size=INVALIDATE_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(ids, INVALIDATE_CHUNK_SIZE))
+            if not chunk:
+                break
+            invalidate_users(chunk)
+    return matched, updated
@@ -0,0 +1,127 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed batch stays reserved before another worker may retry it
+SENDING_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """Store a message in the outbox and wake the delivery worker after commit."""
+    message = OutgoingEmail.objects.create(
+        subject=subject, body=body, to=list(to), from_email=from_email)
+    if settings.EMAIL_OUTBOX_IN_PROCESS:
+        transaction.on_commit(OutboxWorker.kick)
+    return message
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    due = Q(status__in=[OutgoingEmail.Status.PENDING, OutgoingEmail.Status.SENDING],
+            next_attempt_at__lte=now)
+    with transaction.atomic():
+        batch = list(OutgoingEmail.objects.select_for_update(skip_locked=True)
+                     .filter(due).order_by('next_attempt_at')[:batch_size])
+        OutgoingEmail.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status=OutgoingEmail.Status.SENDING, next_attempt_at=now + SENDING_LEASE)
+    return batch
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def mark_failed(message, error):
+    message.attempts += 1
+    message.last_error = str(error)
+    if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        message.status = OutgoingEmail.Status.FAILED
+    else:
+        message.status = OutgoingEmail.Status.PENDING
+        message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+    message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_outbox(batch_size=None):
+    """
+    Send one batch of due outbox messages over a single SMTP connection.
+
+    Returns the number of messages claimed, so callers can loop until it
+    returns 0.
+    """
+    batch = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0
+
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+    except Exception as e:
+        logger.warning('Could not connect to the mail server: %s', e)
+        for message in batch:
+            mark_failed(message, e)
+        return len(batch)
+
+    try:
+        for message in batch:
+            email = EmailMessage(subject=message.subject, body=message.body,
+                                 from_email=message.from_email, to=message.to,
+                                 connection=mail_connection)
+            try:
+                # The connection is already open, so it is reused, not reopened
+                mail_connection.send_messages([email])
+            except Exception as e:
+                logger.warning('Could not send email %s: %s', message.pk, e)
+                mark_failed(message, e)
+                continue
+            OutgoingEmail.objects.filter(pk=message.pk).update(
+                status=OutgoingEmail.Status.SENT, sent_at=timezone.now(),
+                attempts=message.attempts + 1, last_error=None)
+    finally:
+        mail_connection.close()
+    return len(batch)
+
+
+class OutboxWorker(threading.Thread):
+    """
+    Single background thread per process that drains the outbox. It sleeps
+    until kicked by a new message or until the poll interval passes, which
+    is when retries with backoff become due.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.wakeup = threading.Event()
+        threading.Thread.__init__(self, name='email-outbox', daemon=True)
+
+    @classmethod
+    def kick(cls):
+        with cls._lock:
+            if cls._instance is None or not cls._instance.is_alive():
+                cls._instance = cls()
+                cls._instance.start()
+        cls._instance.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.clear()
+            close_old_connections()
+            try:
+                while deliver_outbox():
+                    pass
+            except Exception:
+                logger.exception('Email outbox delivery failed')
+            finally:
+                connection.close()
+            self.wakeup.wait(settings.EMAIL_OUTBOX_POLL_INTERVAL)
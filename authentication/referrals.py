@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Referrals, User
+
+
+class ReferralQuotaExceeded(Exception):
+    pass
+
+
+class ReferralQuota:
+    """
+    Rolling-window limit on the sign-ups one referrer can bring in.
+
+    The cache keeps, per referrer, the creation times of their most recent
+    ``limit`` referrals; counting the ones still inside the window answers
+    ``available`` without touching the database. On a cache miss the times
+    are read back through the (referred, created_at) index.
+
+    ``claim`` is the authoritative check: it locks the referrer row, counts
+    with a COUNT capped at ``limit`` and creates the Referrals row in the
+    same transaction, so concurrent sign-ups cannot overshoot the quota.
+    """
+    key_prefix = 'referral-quota'
+
+    def __init__(self, limit=None, window=None):
+        self._limit = limit
+        self._window = window
+
+    @property
+    def limit(self):
+        return self._limit or settings.REFERRAL_QUOTA_LIMIT
+
+    @property
+    def window(self):
+        return self._window or timedelta(days=settings.REFERRAL_QUOTA_WINDOW_DAYS)
+
+    def cache_key(self, referrer_id):
+        return '{}:{}'.format(self.key_prefix, referrer_id)
+
+    def window_start(self):
+        return timezone.now() - self.window
+
+    def referrals(self, referrer_id):
+        return Referrals.objects.filter(
+            referred_id=referrer_id, created_at__gte=self.window_start())
+
+    def recent(self, referrer_id):
+        """Creation times of the referrer's latest referrals, newest first."""
+        key = self.cache_key(referrer_id)
+        times = cache.get(key)
+        if times is None:
+            times = list(self.referrals(referrer_id).order_by('-created_at')
+                         .values_list('created_at', flat=True)[:self.limit])
+            cache.set(key, times, self.window.total_seconds())
+        return times
+
+    def used(self, referrer_id):
+        start = self.window_start()
+        return sum(1 for created_at in self.recent(referrer_id) if created_at >= start)
+
+    def available(self, referrer_id):
+        return self.used(referrer_id) < self.limit
+
+    def count(self, referrer_id):
+        """Referrals inside the window, counted no further than ``limit``."""
+        return self.referrals(referrer_id).order_by()[:self.limit].count()
+
+    def claim(self, referrer_id, owner):
+        """
+        Record that ``owner`` signed up with the referrer's code; raises
+        ReferralQuotaExceeded if the referrer has no quota left.
+        """
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(pk=referrer_id).values_list('pk'))
+            if self.count(referrer_id) >= self.limit:
+                raise ReferralQuotaExceeded()
+            referral = Referrals.objects.create(owner=owner, referred_id=referrer_id)
+            transaction.on_commit(lambda: self.record(referrer_id, referral.created_at))
+        return referral
+
+    def record(self, referrer_id, created_at):
+        key = self.cache_key(referrer_id)
+        times = cache.get(key)
+        if times is not None:
+            cache.set(key, [created_at] + times[:self.limit - 1],
+                      self.window.total_seconds())
+
+
+referral_quota = ReferralQuota()
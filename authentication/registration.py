@@ -0,0 +1,108 @@
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.contrib.sites.shortcuts import get_current_site
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils.encoding import smart_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .ids import USERNAME_SUFFIX_LENGTH, is_collision
+from .referrals import referral_quota
+from .utils import Util, referral_generator, username_generator
+
+VERIFICATION_FROM_EMAIL = 'hello@roadmap.careers'
+PASSWORD_RESET_FROM_EMAIL = 'no-reply@yieldroom.ng'
+
+# Attempts at saving a new user before an id collision is given up on
+REGISTRATION_ATTEMPTS = 3
+
+
+def queue_verification_email(user, link):
+    """
+    Queue the verification email for ``user`` in the outbox.
+
+    ``link`` is the page the token is appended to. An AccessToken is minted
+    directly: going through RefreshToken.for_user would also write an
+    OutstandingToken row that is never used.
+    """
+    token = AccessToken.for_user(user)
+    absurl = link + "?token=" + str(token)
+    email_body = 'Hi ' + (user.firstname or '') + \
+        ' Use the link below to verify your email \n' + absurl
+    return Util.send_email({'email_body': email_body, 'to_email': user.email,
+                            'email_subject': 'Verify your email',
+                            'from_email': VERIFICATION_FROM_EMAIL})
+
+
+def queue_password_reset_email(request, user, data):
+    """
+    Queue the password reset email for ``user`` in the outbox.
+
+    The link points at ``data['callbackUrl']``, or this site, and carries
+    ``data['redirect_url']`` along.
+    """
+    uidb64 = urlsafe_base64_encode(smart_bytes(user.id))
+    token = PasswordResetTokenGenerator().make_token(user)
+    site = data.get('callbackUrl') or get_current_site(request=request).domain
+    relative_link = reverse('password-reset-confirm', kwargs={'uidb64': uidb64, 'token': token})
+    absurl = 'https://' + site + relative_link
+    email_body = 'Hello, \n Use link below to reset your password  \n' + \
+        absurl + "?redirect_url=" + data.get('redirect_url', '')
+    return Util.send_email({'email_body': email_body, 'to_email': user.email,
+                            'email_subject': 'Reset your passsword',
+                            'from_email': PASSWORD_RESET_FROM_EMAIL})
+
+
+def regenerate_ids(data):
+    """
+    Replace the generated referral code and username suffix in the
+    validated ``data`` of a RegisterSerializer after a collision.
+    """
+    data['referral_code'] = referral_generator()
+    data['username'] = data['username'][:-USERNAME_SUFFIX_LENGTH] + username_generator()
+
+
+def registration_data(data):
+    """The RegisterSerializer input for a sign-up through RegisterView."""
+    return {
+        'firstname': data.get('firstname'),
+        'lastname': data.get('lastname'),
+        'username': (data.get('firstname') or '')+(data.get('lastname') or '')+str(username_generator()),
+        'address': data.get('address'),
+        'is_approved': True,
+        'linkedin': data.get('linkedln'),
+        'referral_code': str(referral_generator()),
+        'phone': data.get('phone'),
+        'password': data.get('password'),
+        'email': data.get('email'), }
+
+
+def register_user(serializer, link, referrer=None, **save_kwargs):
+    """
+    Save a validated RegisterSerializer and queue the verification email.
+
+    Both happen in one transaction, so a user is never stored without an
+    email and the outbox worker only sees the message once the user exists.
+    SMTP delivery itself happens off the request.
+
+    The username and referral code are generated without checking the
+    database first; if one collides with an existing user the insert is
+    retried with fresh ids.
+
+    With a ``referrer`` the sign-up is also counted against their referral
+    quota in the same transaction; ReferralQuotaExceeded rolls it back.
+    ``save_kwargs`` go to ``serializer.save``.
+    """
+    for attempt in range(REGISTRATION_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                user = serializer.save(**save_kwargs)
+                if referrer is not None:
+                    referral_quota.claim(referrer.pk, user)
+                queue_verification_email(user, link)
+            return user
+        except IntegrityError as error:
+            if (attempt == REGISTRATION_ATTEMPTS - 1
+                    or not is_collision(error, 'username', 'referral_code')):
+                raise
+            regenerate_ids(serializer.validated_data)
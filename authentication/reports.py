@@ -0,0 +1,102 @@
+from django.conf import settings
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .models import User
+from .serializers import RegisterSerializer
+
+# Readable RegisterSerializer fields; the write-only password is never exported
+USER_EXPORT_FIELDS = [field for field in RegisterSerializer.Meta.fields
+                      if field != 'password']
+
+
+class UserReport:
+    """
+    Paginated PDF listing of users.
+
+    Rows are pulled from the database in chunks and drawn page by page, so
+    the report never holds more than one chunk of users in memory.
+    """
+    title = 'Users'
+    pagesize = landscape(letter)
+    margin = 0.5 * inch
+    row_height = 14
+    font = 'Helvetica'
+    font_size = 8
+    columns = [
+        # (heading, field, width)
+        ('ID', 'id', 0.6 * inch),
+        ('Email', 'email', 2.6 * inch),
+        ('Username', 'username', 1.7 * inch),
+        ('First name', 'firstname', 1.2 * inch),
+        ('Last name', 'lastname', 1.2 * inch),
+        ('Phone', 'phone', 1.1 * inch),
+        ('Joined', 'created_at', 1.6 * inch),
+    ]
+
+    def __init__(self, queryset=None, chunk_size=None):
+        self.queryset = queryset if queryset is not None else User.objects.all()
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+    def rows(self):
+        queryset = self.queryset
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return queryset.values_list(
+            *[field for _, field, _ in self.columns]).iterator(chunk_size=self.chunk_size)
+
+    def fit(self, value, width):
+        text = '' if value is None else str(value)
+        while text and stringWidth(text, self.font, self.font_size) > width - 4:
+            text = text[:-2] + '…'
+        return text
+
+    def draw_header(self, pdf, page):
+        width, height = self.pagesize
+        top = height - self.margin
+        pdf.setFont(self.font + '-Bold', 12)
+        pdf.drawString(self.margin, top, self.title)
+        pdf.setFont(self.font, self.font_size)
+        pdf.drawRightString(width - self.margin, top, 'Page {}'.format(page))
+
+        y = top - 2 * self.row_height
+        x = self.margin
+        pdf.setFont(self.font + '-Bold', self.font_size)
+        for heading, _, column_width in self.columns:
+            pdf.drawString(x, y, heading)
+            x += column_width
+        pdf.line(self.margin, y - 4, width - self.margin, y - 4)
+        pdf.setFont(self.font, self.font_size)
+        return y - self.row_height
+
+    def render(self, output, progress=None):
+        """
+        Write the report to the binary file object ``output``; returns the row
+        count. ``progress`` is called with the running count after every chunk.
+        """
+        pdf = canvas.Canvas(output, pagesize=self.pagesize)
+        pdf.setTitle(self.title)
+        page = 1
+        y = self.draw_header(pdf, page)
+        count = 0
+
+        for row in self.rows():
+            if y < self.margin:
+                pdf.showPage()
+                page += 1
+                y = self.draw_header(pdf, page)
+            x = self.margin
+            for value, (_, _, column_width) in zip(row, self.columns):
+                pdf.drawString(x, y, self.fit(value, column_width))
+                x += column_width
+            y -= self.row_height
+            count += 1
+            if progress and count % self.chunk_size == 0:
+                progress(count)
+
+        if not count:
+            pdf.drawString(self.margin, y, 'No users found.')
+        pdf.save()
+        return count
@@ -1,11 +1,14 @@
 from rest_framework import serializers
 from .models import User, Referrals, Profile
 from django.contrib import auth
+from rest_framework_simplejwt import serializers as jwt_serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.models import update_last_login
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from django.contrib.auth.signals import user_login_failed
+from rest_framework_simplejwt.tokens import TokenError
+from .blacklist import RefreshToken
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import smart_str, force_str, smart_bytes, DjangoUnicodeDecodeError
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
@@ -57,6 +60,13 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'email', 'username', 'password', 'firstname',
                   'lastname', 'phone', 'address', 'referral_code']
+        # Both are generated by the views; their unique indexes catch the
+        # rare collision (see registration.register_user), so skip the
+        # SELECT per field that UniqueValidator would run.
+        extra_kwargs = {
+            'username': {'validators': []},
+            'referral_code': {'validators': []},
+        }
 
     def validate(self, attrs):
         email = attrs.get('email', '')
@@ -121,6 +131,18 @@ class SigninSerializer(TokenObtainPairSerializer):
         return data
 
 
+def check_user_password(user, password):
+    """
+    The password hash of a login. ``user`` may be None, in which case the
+    password is hashed anyway so unknown emails cost the same as wrong
+    passwords.
+    """
+    if user is None:
+        User().set_password(password)
+        return False
+    return user.check_password(password)
+
+
 class LoginSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(max_length=255, min_length=3)
     password = serializers.CharField(
@@ -131,12 +153,7 @@ class LoginSerializer(serializers.ModelSerializer):
     tokens = serializers.SerializerMethodField()
 
     def get_tokens(self, obj):
-        user = User.objects.get(email=obj['email'])
-
-        return {
-            'refresh': user.tokens()['refresh'],
-            'access': user.tokens()['access']
-        }
+        return obj['tokens']
 
     class Meta:
         model = User
@@ -144,34 +161,39 @@ class LoginSerializer(serializers.ModelSerializer):
                   'tokens', 'is_staff', 'is_approved']
 
     def validate(self, attrs):
-        email = attrs.get('email', '')
-        password = attrs.get('password', '')
-        filtered_user_by_email = User.objects.filter(email=email)
-        user = auth.authenticate(**attrs)
-        print(auth.authenticate(**attrs))
-        # print(email)
-
-        if filtered_user_by_email.exists() and filtered_user_by_email[0].auth_provider != 'email':
+        """
+        Check the credentials with one query, one password hash and one
+        token pair. Does what ``auth.authenticate`` does for ModelBackend
+        (the only configured backend): unknown emails still pay for a hash,
+        and inactive users get the same error as a wrong password.
+        """
+        user = self.get_user(attrs)
+        return self.authenticate(user, attrs, check_user_password(user, attrs.get('password', '')))
+
+    def get_user(self, attrs):
+        user = User.objects.filter(email=attrs.get('email', '')).first()
+        if user is not None and user.auth_provider != 'email':
             raise AuthenticationFailed(
-                detail='Please continue your login using ' + filtered_user_by_email[0].auth_provider)
-
-        if not user:
+                detail='Please continue your login using ' + user.auth_provider)
+        return user
+
+    def authenticate(self, user, attrs, password_valid):
+        """Finish a login once the password has been checked."""
+        if not password_valid or not user.is_active:
+            user_login_failed.send(sender=__name__, credentials={'email': attrs.get('email', '')},
+                                   request=self.context.get('request'))
             raise AuthenticationFailed('Invalid credentials, try again')
-        if not user.is_active:
-            raise AuthenticationFailed('Account disabled, contact admin')
         if not user.is_verified:
             raise AuthenticationFailed('Email is not verified')
 
         return {
             'email': user.email,
             'username': user.username,
-            'tokens': user.tokens,
+            'tokens': user.tokens(),
             'is_staff': user.is_staff,
             'is_approved': user.is_approved,
         }
 
-        return super().validate(attrs)
-
 
 class ResetPasswordEmailRequestSerializer(serializers.Serializer):
     email = serializers.EmailField(min_length=2)
@@ -193,24 +215,26 @@ class SetNewPasswordSerializer(serializers.Serializer):
     class Meta:
         fields = ['password', 'token', 'uidb64']
 
-    def validate(self, attrs):
+    def get_user(self, attrs):
+        """The user the reset link was issued for."""
         try:
-            password = attrs.get('password')
-            token = attrs.get('token')
-            uidb64 = attrs.get('uidb64')
-
-            id = force_str(urlsafe_base64_decode(uidb64))
+            id = force_str(urlsafe_base64_decode(attrs.get('uidb64')))
             user = User.objects.get(id=id)
-            if not PasswordResetTokenGenerator().check_token(user, token):
-                raise AuthenticationFailed('The reset link is invalid', 401)
-
-            user.set_password(password)
-            user.save()
-
-            return (user)
         except Exception as e:
             raise AuthenticationFailed('The reset link is invalid', 401)
-        return super().validate(attrs)
+        if not PasswordResetTokenGenerator().check_token(user, attrs.get('token')):
+            raise AuthenticationFailed('The reset link is invalid', 401)
+        return user
+
+    def validate(self, attrs):
+        user = self.get_user(attrs)
+        user.set_password(attrs.get('password'))
+        user.save()
+        return user
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
 
 
 class LogoutSerializer(serializers.Serializer):
@@ -239,6 +263,35 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'id', 'role')
 
 
+class UserDirectorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'email', 'firstname', 'lastname', 'phone', 'role',
+                  'referral_code', 'is_verified', 'is_approved', 'created_at')
+
+
+class UserModerationFilterSerializer(serializers.Serializer):
+    role = serializers.ChoiceField(choices=User.Role.choices, required=False)
+    is_verified = serializers.BooleanField(required=False)
+    is_approved = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class BulkModerationSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False,
+                                allow_empty=False, max_length=10000)
+    filter = UserModerationFilterSerializer(required=False)
+    value = serializers.BooleanField(default=True)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Pass either ids or filter')
+        if 'filter' in attrs and not attrs['filter']:
+            raise serializers.ValidationError('filter needs at least one condition')
+        return attrs
+
+
 class ApproveUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -0,0 +1,32 @@
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .backends import invalidate_user
+from .blacklist import blacklist_filter
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalidate_blacklisted_user(sender, instance, created, **kwargs):
+    if not created:
+        return
+    token = instance.token
+    if token.user_id is not None:
+        invalidate_user(token.user_id)
+    transaction.on_commit(lambda: blacklist_filter.add(token.jti, token.expires_at))
+
+
+@receiver(request_started)
+def seed_blacklist_filter(sender, **kwargs):
+    """Load the token blacklist on the process' first request, not its first refresh."""
+    request_started.disconnect(seed_blacklist_filter)
+    blacklist_filter.seed()
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.encoding import smart_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework_simplejwt.tokens import AccessToken
+from unittest import mock
+
+from authentication.hashing import HashingPool, HashQueueFull
+from authentication.models import OutgoingEmail, User
+from junior.middleware import AsyncWhiteNoiseMiddleware
+
+
+class HashingPoolTest(TestCase):
+    def test_queue_depth_is_bounded(self):
+        pool = HashingPool(workers=1, max_queue=2)
+        release = threading.Event()
+
+        async def flood():
+            running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(HashQueueFull):
+                await pool.run(release.wait)
+            release.set()
+            return await asyncio.gather(*running)
+
+        self.assertEqual(asyncio.run(flood()), [True, True])
+        stats = pool.stats()
+        self.assertEqual((stats['pending'], stats['completed'], stats['rejected']), (0, 2, 1))
+        self.assertGreater(stats['wait_seconds_max'], 0)
+
+
+@override_settings(EMAIL_OUTBOX_IN_PROCESS=False)
+class AsyncAuthViewsTest(TestCase):
+    def setUp(self):
+        self.user = User(username='ada', email='ada@test.com', is_verified=True)
+        self.user.set_password('secret-password')
+        self.user.save()
+
+    def test_login_matches_the_sync_view(self):
+        credentials = {'email': 'ada@test.com', 'password': 'secret-password'}
+        response = self.client.post(reverse('async-login'), credentials, content_type='application/json')
+        expected = self.client.post(reverse('login'), credentials, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), set(expected.json()))
+        self.assertEqual(response.json()['username'], 'ada')
+        self.assertEqual(set(response.json()['tokens']), {'refresh', 'access'})
+
+    def test_login_errors_match_the_sync_view(self):
+        for credentials in ({'email': 'ada@test.com', 'password': 'wrong-password'},
+                            {'email': 'not-an-email', 'password': 'secret-password'}):
+            response = self.client.post(reverse('async-login'), credentials)
+            expected = self.client.post(reverse('login'), credentials)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json())
+
+    def test_register(self):
+        response = self.client.post(reverse('async-register'), {
+            'firstname': 'Bo', 'lastname': 'Ng', 'email': 'bo@test.com',
+            'password': 'secret-password', 'callBackUrl': 'https://app.test/verify'},
+            content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['data']['email'], 'bo@test.com')
+        user = User.objects.get(email='bo@test.com')
+        self.assertTrue(user.check_password('secret-password'))
+        self.assertTrue(OutgoingEmail.objects.filter(to=['bo@test.com']).exists())
+
+        response = self.client.post(reverse('async-register'), {
+            'email': 'bo@test.com', 'password': 'secret-password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['errors'])
+
+    def test_set_new_password(self):
+        data = {'password': 'new-password',
+                'token': PasswordResetTokenGenerator().make_token(self.user),
+                'uidb64': urlsafe_base64_encode(smart_bytes(self.user.id))}
+        response = self.client.patch(reverse('async-password-reset-complete'), data,
+                                     content_type='application/json')
+        self.assertEqual(response.json(), {'success': True, 'message': 'Password reset success'})
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-password'))
+
+        response = self.client.patch(reverse('async-password-reset-complete'), data,
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'The reset link is invalid'})
+
+    def test_full_queue_answers_503(self):
+        with mock.patch('authentication.async_views.hashing_pool.run', side_effect=HashQueueFull):
+            response = self.client.post(reverse('async-login'), {
+                'email': 'ada@test.com', 'password': 'secret-password'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_resend_verification_email(self):
+        unverified = User.objects.create_user(username='bo', email='bo@test.com', password='pw')
+        for email, status in (('bo@test.com', 200), ('ada@test.com', 400), ('nobody@test.com', 404)):
+            data = {'email': email, 'callBackUrl': 'https://app.test/verify'}
+            response = self.client.post(reverse('async-resend-email-verification'), data)
+            expected = self.client.post(reverse('resend-email-verification'), data)
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(response.json(), expected.json())
+        self.assertEqual(OutgoingEmail.objects.filter(to=[unverified.email]).count(), 2)
+
+    def test_request_password_reset(self):
+        data = {'email': 'ada@test.com', 'callbackUrl': 'app.test', 'redirect_url': 'https://app.test/done'}
+        response = self.client.post(reverse('async-request-reset-email'), data,
+                                    content_type='application/json')
+        expected = self.client.post(reverse('request-reset-email'), data, content_type='application/json')
+        self.assertEqual(response.json(), expected.json())
+
+        messages = OutgoingEmail.objects.filter(to=['ada@test.com'])
+        self.assertEqual(messages.count(), 2)
+        self.assertIn('https://app.test/auth/password-reset/', messages[0].body)
+        self.assertIn('?redirect_url=https://app.test/done', messages[0].body)
+
+        response = self.client.post(reverse('async-request-reset-email'), {'email': 'nobody@test.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+
+    def test_load_user(self):
+        access = self.client.post(reverse('login'), {
+            'email': 'ada@test.com', 'password': 'secret-password'}).json()['tokens']['access']
+        response = self.client.get(reverse('async-load-user'), HTTP_AUTHORIZATION='Bearer ' + access)
+        expected = self.client.get(reverse('load-user'), HTTP_AUTHORIZATION='Bearer ' + access)
+        self.assertEqual(response.json(), expected.json())
+
+        response = self.client.get(reverse('async-load-user'))
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse('async-load-user'), HTTP_AUTHORIZATION='Bearer nonsense')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_load_user_through_the_asgi_handler(self):
+        access = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        # Django 3.2's AsyncClient sends extra keyword arguments as headers
+        response = await self.async_client.get(reverse('async-load-user'),
+                                                authorization='Bearer ' + access)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['user']['email'], 'ada@test.com')
+
+
+class AsyncWhiteNoiseMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        with open(os.path.join(root.name, 'robots.txt'), 'w') as f:
+            f.write('User-agent: *')
+        settings = override_settings(WHITENOISE_ROOT=root.name, WHITENOISE_AUTOREFRESH=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_async_chain(self):
+        async def view(request):
+            return HttpResponse('from the view')
+
+        middleware = AsyncWhiteNoiseMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/robots.txt'))
+        self.assertEqual(b''.join(response.streaming_content), b'User-agent: *')
+        response = async_to_sync(middleware)(RequestFactory().get('/api/'))
+        self.assertEqual(response.content, b'from the view')
+
+    def test_sync_chain(self):
+        middleware = AsyncWhiteNoiseMiddleware(lambda request: HttpResponse('from the view'))
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        response = middleware(RequestFactory().get('/robots.txt'))
+        self.assertEqual(b''.join(response.streaming_content), b'User-agent: *')
+        self.assertEqual(middleware(RequestFactory().get('/api/')).content, b'from the view')
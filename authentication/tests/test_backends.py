@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.backends import CachedJWTAuthentication, token_cache, user_cache_key
+from authentication.models import User
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create(username='ada', email='ada@test.com', firstname='Ada',
+                                        lastname='Obi', role=User.Role.EMPLOYER)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = str(self.refresh.access_token)
+        self.backend = CachedJWTAuthentication()
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION='Bearer {}'.format(self.access))
+        return self.backend.authenticate(request)[0]
+
+    def test_users_table_is_read_once(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.role, user.is_staff), (self.user.pk, 'EMPLOYER', False))
+        self.assertEqual(len(token_cache), 1)
+
+    def test_default_cache_is_shared_between_processes(self):
+        self.assertTrue(settings.CACHE_IS_SHARED)
+        self.authenticate()
+        # Another worker saving the user drops the entry through its own cache client
+        caches.create_connection('default').delete(user_cache_key(self.user.pk))
+        token_cache.clear()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_user_is_read_every_time_without_a_shared_cache(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_invalidation_only_drops_that_users_tokens(self):
+        other = User.objects.create(username='bola', email='bola@test.com')
+        token_cache.clear()
+        self.authenticate()
+        self.access = str(RefreshToken.for_user(other).access_token)
+        self.authenticate()
+        self.user.save()
+        self.assertEqual(len(token_cache), 1)
+        self.assertIsNotNone(token_cache.get(self.access.encode()))
+
+    def test_other_fields_load_with_one_query(self):
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual((user.firstname, user.lastname, user.phone), ('Ada', 'Obi', None))
+
+    def test_save_invalidates_the_user(self):
+        self.authenticate()
+        self.user.role = User.Role.ADMIN
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(self.authenticate().role, 'ADMIN')
+
+    def test_blacklist_invalidates_the_user(self):
+        self.authenticate()
+        self.refresh.blacklist()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(len(token_cache), 0)
+
+    def test_inactive_user_is_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from authentication.blacklist import RefreshToken, blacklist_filter
+from authentication.models import User
+from authentication.signals import seed_blacklist_filter
+
+
+class BlacklistFilterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+        self.addCleanup(cache.clear)
+        self.addCleanup(blacklist_filter.reset)
+        self.user = User.objects.create(username='ada', email='ada@test.com')
+
+    def test_valid_tokens_skip_the_database(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        RefreshToken(refresh)
+        with self.assertNumQueries(0):
+            RefreshToken(refresh)
+
+    def test_blacklisted_token_is_rejected(self):
+        refresh = RefreshToken.for_user(self.user)
+        RefreshToken(str(refresh))
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh.blacklist()
+        with self.assertNumQueries(0), self.assertRaises(TokenError):
+            RefreshToken(str(refresh))
+
+    def test_blacklisting_in_another_process_is_picked_up(self):
+        refresh = RefreshToken.for_user(self.user)
+        RefreshToken(str(refresh))
+        # A row written elsewhere: no signal in this process, only the version bump
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=OutstandingToken.objects.get(jti=refresh['jti']))])
+        RefreshToken(str(refresh))
+        cache.set('token-blacklist-version', 7)
+        with self.assertRaises(TokenError):
+            RefreshToken(str(refresh))
+
+    def test_seeded_on_the_first_request(self):
+        refresh = RefreshToken.for_user(self.user)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=refresh['jti']))
+        blacklist_filter.reset()
+        request_started.connect(seed_blacklist_filter)
+        self.addCleanup(request_started.disconnect, seed_blacklist_filter)
+
+        self.client.get('/job/')
+        with self.assertNumQueries(0), self.assertRaises(TokenError):
+            RefreshToken(str(refresh))
+
+    def test_add_bumps_the_version(self):
+        blacklist_filter.add('abc', timezone.now() + timedelta(days=1))
+        blacklist_filter.add('def', timezone.now() + timedelta(days=1))
+        self.assertEqual(cache.get('token-blacklist-version'), 2)
+
+    def test_refresh_rotation_blacklists_the_old_token(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class PruneTokenBlacklistTest(TestCase):
+    def test_prunes_only_expired_tokens(self):
+        user = User.objects.create(username='ada', email='ada@test.com')
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(
+                user=user, jti='old{}'.format(i), token='x', expires_at=now - timedelta(days=1))
+            if i % 2:
+                BlacklistedToken.objects.create(token=token)
+        live = OutstandingToken.objects.create(user=user, jti='live', token='x',
+                                               expires_at=now + timedelta(days=1))
+        BlacklistedToken.objects.create(token=live)
+
+        call_command('prune_token_blacklist', batch_size=2, stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.get().token_id, live.pk)
@@ -0,0 +1,146 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from authentication.models import User
+from junior.db import pool as db_pool
+from junior.db.pool import ConnectionPool, PoolTimeout
+
+
+class Connection:
+    """Stands in for a driver connection: the pool only closes them."""
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.resets = 0
+
+    def close(self):
+        self.closed = True
+
+
+def ping(conn):
+    if not conn.alive:
+        raise ConnectionError('server closed the connection unexpectedly')
+
+
+def reset(conn):
+    conn.resets += 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def make_pool(self, **kwargs):
+        self.made = []
+
+        def connect():
+            conn = Connection()
+            self.made.append(conn)
+            return conn
+
+        return ConnectionPool(connect, **kwargs)
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool(max_size=2, reset=reset)
+        first = pool.getconn()
+        pool.putconn(first)
+        self.assertIs(pool.getconn(), first)
+        self.assertEqual(len(self.made), 1)
+        self.assertEqual(first.resets, 1)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['in_use'], stats['checkouts']), (1, 1, 2))
+
+    def test_checkout_waits_for_a_connection_to_be_returned(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, (conn,)).start()
+        self.assertIs(pool.getconn(), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertGreater(stats['wait_seconds_max'], 0.04)
+        self.assertGreater(stats['checkout_seconds_max'], 0.04)
+
+    def test_checkout_times_out_when_the_pool_is_exhausted(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_dead_connections_are_replaced_on_checkout(self):
+        pool = self.make_pool(max_size=1, ping=ping)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.alive = False
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['connections_made'], stats['connections_lost']), (1, 2, 1))
+
+    def test_connections_that_fail_to_reset_are_closed(self):
+        def failing_reset(conn):
+            raise ConnectionError()
+
+        pool = self.make_pool(max_size=1, reset=failing_reset)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertIsNot(pool.getconn(), conn)
+
+    def test_failed_connects_free_their_slot(self):
+        def connect():
+            raise ConnectionError('could not connect to server')
+
+        pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                pool.getconn()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connections_above_min_size_are_closed(self):
+        pool = self.make_pool(min_size=1, max_size=3, max_idle=0.01)
+        conns = [pool.getconn() for _ in range(3)]
+        pool.putconn(conns[0])
+        time.sleep(0.02)
+        pool.putconn(conns[1])
+        pool.putconn(conns[2])
+        self.assertEqual([conn.closed for conn in conns], [True, False, False])
+        time.sleep(0.02)
+        pool.putconn(pool.getconn())
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_close(self):
+        pool = self.make_pool(max_size=2)
+        idle, in_use = pool.getconn(), pool.getconn()
+        pool.putconn(idle)
+        pool.close()
+        self.assertTrue(idle.closed)
+        pool.putconn(in_use)
+        self.assertTrue(in_use.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+
+class DatabasePoolStatsAPIViewTest(TestCase):
+
+    def tearDown(self):
+        db_pool.close_pools(lambda key: key[0] == 'stats-test')
+
+    def test_admins_get_each_pool_stats(self):
+        pool = db_pool.get_pool(('stats-test', 'junior'), lambda: ConnectionPool(Connection))
+        pool.putconn(pool.getconn())
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('db-pool-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stats-test/junior']['checkouts'], 1)
+
+    def test_users_are_refused(self):
+        user = User.objects.create_user('user', email='user@test.com', password='password')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('db-pool-stats')).status_code, 403)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from authentication.models import User
+
+
+class UserDirectoryTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@test.com', is_staff=True)
+        people = [('Ada', 'Obi', 'ada@test.com', '+2348000000001'),
+                  ('Adamu', 'Bello', 'adamu@test.com', '+2348000000002'),
+                  ('Bola', 'Adams', 'bola@test.com', '+2348000000003'),
+                  ('Chidi', 'Okafor', 'chidi@test.com', '+2348000000004')]
+        now = timezone.now()
+        for i, (firstname, lastname, email, phone) in enumerate(people):
+            user = User.objects.create(username=firstname.lower(), email=email, firstname=firstname,
+                                       lastname=lastname, phone=phone, referral_code='code{}'.format(i))
+            User.objects.filter(pk=user.pk).update(created_at=now - timedelta(days=i + 1))
+        self.client.force_authenticate(self.admin)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('user-directory'), dict(params, q=q))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def emails(self, response):
+        return [user['email'] for user in response.data['results']]
+
+    def test_email_matches_exactly(self):
+        self.assertEqual(self.emails(self.search('ADA@test.com')), ['ada@test.com'])
+
+    def test_phone_matches_exactly(self):
+        self.assertEqual(self.emails(self.search('+2348000000003')), ['bola@test.com'])
+
+    def test_prefix_match_on_names(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.search('ada')
+        self.assertEqual(self.emails(response), ['ada@test.com', 'adamu@test.com', 'bola@test.com'])
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn("'ada%'", sql.lower())
+        self.assertNotIn("'%ada%'", sql.lower())
+
+    def test_referral_code(self):
+        self.assertEqual(self.emails(self.search('code3')), ['chidi@test.com'])
+
+    def test_keyset_pagination(self):
+        response = self.client.get(reverse('user-directory'), {'page_size': 2})
+        self.assertEqual(self.emails(response), ['admin@test.com', 'ada@test.com'])
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.emails(response), ['adamu@test.com', 'bola@test.com'])
+
+    def test_admins_only(self):
+        self.client.force_authenticate(User.objects.get(email='ada@test.com'))
+        response = self.client.get(reverse('user-directory'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_list_points_to_the_directory(self):
+        response = self.client.get(reverse('user-details'), {'search': 'dam', 'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response['Deprecation'], 'true')
+        self.assertEqual(response['Link'], '<http://testserver/auth/users/directory/>; rel="successor-version"')
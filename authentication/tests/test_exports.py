@@ -0,0 +1,38 @@
+import csv
+import io
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authentication.models import User
+
+
+class ExportUserTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('export-user-data')
+        self.admin = User.objects.create(
+            username='admin', email='admin@test.com', is_staff=True, firstname='Ada')
+        self.user = User.objects.create(
+            username='member', email='member@test.com', referral_code='abc1234')
+
+    def test_admin_streams_users_csv(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url, {'sync': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual([row['email'] for row in rows], ['admin@test.com', 'member@test.com'])
+        self.assertNotIn('password', rows[0])
+        self.assertEqual(rows[0]['firstname'], 'Ada')
+        self.assertEqual(rows[1]['firstname'], '')
+        self.assertEqual(rows[1]['referral_code'], 'abc1234')
+
+    def test_non_admin_cannot_export(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
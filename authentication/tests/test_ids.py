@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from authentication.ids import ALPHABET, random_codes
+from authentication.models import User
+from authentication.utils import referral_generator, username_generator
+
+
+class IdGeneratorTest(TestCase):
+    def test_generators_need_no_query(self):
+        with self.assertNumQueries(0):
+            codes = [referral_generator() for _ in range(50)] + \
+                [username_generator() for _ in range(50)]
+        for code in codes:
+            self.assertEqual(len(code), 10)
+            self.assertTrue(set(code) <= set(ALPHABET))
+
+    def test_random_codes_are_distinct(self):
+        codes = random_codes(1000, 4)
+        self.assertEqual(len(set(codes)), 1000)
+
+    def test_bulk_create_users_fills_generated_fields(self):
+        users = [User(email='import{}@test.com'.format(i)) for i in range(20)]
+        users.append(User(email='named@test.com', username='named', referral_code='given'))
+        with self.assertNumQueries(1):
+            User.objects.bulk_create_users(users)
+
+        self.assertEqual(User.objects.count(), 21)
+        self.assertEqual(User.objects.values('referral_code').distinct().count(), 21)
+        named = User.objects.get(email='named@test.com')
+        self.assertEqual((named.username, named.referral_code), ('named', 'given'))
+
+
+class RegistrationCollisionTest(APITestCase):
+    data = {
+        'firstname': 'Ada', 'lastname': 'Obi', 'email': 'ada@test.com',
+        'password': 'secret-password', 'address': 'Lagos', 'phone': '0800',
+        'callBackUrl': 'https://app.test/verify',
+    }
+
+    def test_collision_is_retried_with_fresh_ids(self):
+        User.objects.create(username='taken', email='taken@test.com', referral_code='takencode0')
+        with mock.patch('authentication.views.referral_generator', return_value='takencode0'):
+            response = self.client.post(reverse('register'), self.data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email='ada@test.com')
+        self.assertNotEqual(user.referral_code, 'takencode0')
+        self.assertEqual(len(user.referral_code), 10)
+        self.assertTrue(user.username.startswith('AdaObi'))
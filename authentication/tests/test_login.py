@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth import base_user
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from authentication.models import User
+
+
+class LoginTest(APITestCase):
+    def setUp(self):
+        self.user = User(username='ada', email='ada@test.com', is_verified=True)
+        self.user.set_password('secret-password')
+        self.user.save()
+
+    def login(self, email='ada@test.com', password='secret-password'):
+        return self.client.post(reverse('login'), {'email': email, 'password': password},
+                                format='json')
+
+    def test_login_hashes_once_and_mints_one_token_pair(self):
+        check_password = mock.Mock(wraps=base_user.check_password)
+        with mock.patch.object(base_user, 'check_password', check_password), \
+                self.assertNumQueries(2):
+            response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(check_password.call_count, 1)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertEqual(set(response.data), {'email', 'username', 'tokens', 'is_staff', 'is_approved'})
+        self.assertEqual(response.data['username'], 'ada')
+
+        refresh = RefreshToken(response.data['tokens']['refresh'])
+        access = AccessToken(response.data['tokens']['access'])
+        self.assertEqual(refresh['user_id'], access['user_id'], self.user.id)
+
+    def test_wrong_password(self):
+        response = self.login(password='wrong-password')
+        self.assertEqual(str(response.data['detail']), 'Invalid credentials, try again')
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_unknown_email_still_hashes(self):
+        with mock.patch.object(User, 'set_password', autospec=True) as set_password:
+            response = self.login(email='nobody@test.com')
+        self.assertEqual(str(response.data['detail']), 'Invalid credentials, try again')
+        self.assertEqual(set_password.call_count, 1)
+
+    def test_inactive_user_gets_invalid_credentials(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.login()
+        self.assertEqual(str(response.data['detail']), 'Invalid credentials, try again')
+
+    def test_unverified_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_verified=False)
+        response = self.login()
+        self.assertEqual(str(response.data['detail']), 'Email is not verified')
+
+    def test_social_account_is_sent_to_its_provider(self):
+        User.objects.filter(pk=self.user.pk).update(auth_provider='google')
+        response = self.login(password='anything')
+        self.assertEqual(str(response.data['detail']), 'Please continue your login using google')
@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from authentication.backends import cached_user_fields, user_cache_key
+from authentication.models import User
+
+
+class BulkModerationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create(username='admin', email='admin@test.com', is_staff=True,
+                                         is_approved=True, is_verified=True)
+        self.users = [User.objects.create(username='u{}'.format(i), email='u{}@test.com'.format(i),
+                                          role=User.Role.EMPLOYER if i < 3 else User.Role.JOB_SEEKER)
+                      for i in range(5)]
+        self.client.force_authenticate(self.admin)
+
+    def test_approve_ids_with_one_update(self):
+        ids = [user.pk for user in self.users[:3]]
+        cached_user_fields(ids[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bulk-approve-users'), {'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'field': 'is_approved', 'value': True,
+                                         'matched': 3, 'updated': 3})
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(User.objects.filter(is_approved=True).values_list('pk', flat=True)),
+                         set(ids) | {self.admin.pk})
+        self.assertIsNone(cache.get(user_cache_key(ids[0])))
+
+    def test_verify_by_filter(self):
+        User.objects.filter(pk=self.users[0].pk).update(is_verified=True)
+        response = self.client.post(reverse('bulk-verify-users'),
+                                    {'filter': {'role': 'EMPLOYER'}}, format='json')
+        self.assertEqual(response.data['matched'], 3)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(User.objects.filter(role='EMPLOYER', is_verified=False).count(), 0)
+        self.assertFalse(User.objects.filter(role='JOB_SEEKER', is_verified=True)
+                         .exclude(pk=self.admin.pk).exists())
+
+    def test_revoke(self):
+        cached_user_fields(self.admin.pk)
+        response = self.client.post(reverse('bulk-approve-users'),
+                                    {'filter': {'is_approved': True}, 'value': False}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertFalse(User.objects.filter(is_approved=True).exists())
+        self.assertIsNone(cache.get(user_cache_key(self.admin.pk)))
+
+    def test_filter_updates_without_listing_ids(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bulk-verify-users'),
+                                        {'filter': {'role': 'EMPLOYER'}}, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        update = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')][0]
+        self.assertNotIn(' IN (', update)
+        self.assertIn('"role" = ', update)
+
+    def test_needs_ids_or_a_filter(self):
+        for data in ({}, {'filter': {}}, {'ids': [1], 'filter': {'role': 'ADMIN'}}, {'ids': []}):
+            response = self.client.post(reverse('bulk-approve-users'), data, format='json')
+            self.assertEqual(response.status_code, 400, data)
+        self.assertEqual(User.objects.filter(is_approved=True).count(), 1)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(reverse('bulk-approve-users'), {'ids': [self.users[0].pk]},
+                                    format='json')
+        self.assertEqual(response.status_code, 403)
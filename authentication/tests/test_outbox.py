@@ -0,0 +1,71 @@
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from authentication.models import OutgoingEmail
+from authentication.outbox import deliver_outbox
+from authentication.utils import Util
+
+
+def queue(count):
+    for i in range(count):
+        Util.send_email({'email_subject': f'Subject {i}', 'email_body': 'Body',
+                         'to_email': f'user{i}@test.com'})
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   EMAIL_OUTBOX_BATCH_SIZE=10, EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+                   EMAIL_OUTBOX_RETRY_DELAY=60)
+class OutboxTest(TestCase):
+    def test_send_email_only_queues(self):
+        queue(1)
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutgoingEmail.objects.get()
+        self.assertEqual(message.status, OutgoingEmail.Status.PENDING)
+        self.assertEqual(message.to, ['user0@test.com'])
+
+    def test_batch_is_sent_over_one_connection(self):
+        queue(15)
+        with mock.patch('authentication.outbox.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(deliver_outbox(), 10)
+            self.assertEqual(deliver_outbox(), 5)
+            self.assertEqual(deliver_outbox(), 0)
+
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 15)
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.Status.SENT).count(), 15)
+
+    def test_failures_back_off_then_give_up(self):
+        queue(1)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=OSError('connection reset')), \
+                self.assertLogs('authentication.outbox', level='WARNING'):
+            deliver_outbox()
+
+        message = OutgoingEmail.objects.get()
+        self.assertEqual(message.status, OutgoingEmail.Status.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.last_error, 'connection reset')
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # Not due yet
+        self.assertEqual(deliver_outbox(), 0)
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=OSError('connection reset')), \
+                self.assertLogs('authentication.outbox', level='WARNING'):
+            deliver_outbox()
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutgoingEmail.Status.FAILED)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_expired_sending_lease_is_retried(self):
+        queue(1)
+        OutgoingEmail.objects.update(status=OutgoingEmail.Status.SENDING,
+                                     next_attempt_at=timezone.now() - timedelta(seconds=1))
+        call_command('send_queued_email', stdout=mock.Mock())
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import OutgoingEmail, Referrals, User
+from authentication.referrals import ReferralQuotaExceeded, referral_quota
+from authentication.views import RegisterReferralView
+
+
+@override_settings(EMAIL_OUTBOX_IN_PROCESS=False)
+class ReferralQuotaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.referrer = User.objects.create(username='ref', email='ref@test.com', referral_code='refcode')
+
+    def refer(self, count, age=None):
+        for i in range(count):
+            owner = User.objects.create(username='owner{}{}'.format(age, i),
+                                        email='owner{}{}@test.com'.format(age, i))
+            referral = Referrals.objects.create(owner=owner, referred=self.referrer)
+            if age is not None:
+                Referrals.objects.filter(pk=referral.pk).update(
+                    created_at=timezone.now() - age)
+
+    def sign_up(self, email):
+        request = APIRequestFactory().post('/auth/register/referral/', {
+            'firstname': 'New', 'lastname': 'User', 'email': email,
+            'password': 'secret-password', 'referral_code': 'refcode'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            return RegisterReferralView.as_view()(request)
+
+    def test_available_is_cached(self):
+        self.refer(2)
+        with self.assertNumQueries(1):
+            self.assertTrue(referral_quota.available(self.referrer.pk))
+        with self.assertNumQueries(0):
+            self.assertEqual(referral_quota.used(self.referrer.pk), 2)
+
+    def test_referrals_outside_the_window_do_not_count(self):
+        self.refer(5, age=timedelta(days=31))
+        self.refer(1)
+        self.assertEqual(referral_quota.count(self.referrer.pk), 1)
+        self.assertTrue(referral_quota.available(self.referrer.pk))
+
+    def test_claim_checks_the_database_not_the_cache(self):
+        self.refer(5)
+        cache.set(referral_quota.cache_key(self.referrer.pk), [])
+        owner = User.objects.create(username='late', email='late@test.com')
+        with self.assertRaises(ReferralQuotaExceeded):
+            referral_quota.claim(self.referrer.pk, owner)
+        self.assertEqual(Referrals.objects.count(), 5)
+
+    def test_sign_ups_stop_at_the_limit(self):
+        self.refer(3)
+        self.assertEqual(self.sign_up('a@test.com').status_code, 201)
+        self.assertEqual(self.sign_up('b@test.com').status_code, 201)
+        self.assertEqual(referral_quota.used(self.referrer.pk), 5)
+
+        response = self.sign_up('c@test.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'User with referral code exceeded monthly limit')
+        self.assertFalse(User.objects.filter(email='c@test.com').exists())
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+
+    def test_quota_is_enforced_when_the_cache_is_stale(self):
+        self.refer(5)
+        cache.set(referral_quota.cache_key(self.referrer.pk), [])
+        response = self.sign_up('c@test.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(email='c@test.com').exists())
+
+    def test_unknown_referral_code(self):
+        request = APIRequestFactory().post('/auth/register/referral/', {
+            'email': 'x@test.com', 'password': 'secret-password', 'referral_code': 'nope'}, format='json')
+        response = RegisterReferralView.as_view()(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Referral code does not exists')
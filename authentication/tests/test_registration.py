@@ -0,0 +1,47 @@
+import jwt
+from django.conf import settings
+from django.core import mail
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from authentication.models import OutgoingEmail, User
+
+
+class RegistrationTest(APITestCase):
+    def setUp(self):
+        self.data = {
+            'firstname': 'Ada', 'lastname': 'Obi', 'email': 'ada@test.com',
+            'password': 'secret-password', 'address': 'Lagos', 'phone': '0800',
+            'callBackUrl': 'https://app.test/verify',
+        }
+
+    def test_register_queues_verification_email(self):
+        response = self.client.post(reverse('register'), self.data, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        user = User.objects.get(email='ada@test.com')
+        self.assertTrue(user.username.startswith('AdaObi'))
+        self.assertEqual(len(mail.outbox), 0)
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to, ['ada@test.com'])
+        self.assertEqual(email.from_email, 'hello@roadmap.careers')
+        self.assertTrue(email.body.startswith('Hi Ada Use the link below'))
+
+        token = email.body.split('https://app.test/verify?token=')[1]
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+        self.assertEqual(payload['user_id'], user.id)
+
+    def test_invalid_registration_queues_nothing(self):
+        self.data.pop('email')
+        response = self.client.post(reverse('register'), self.data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_resend_verification_queues_one_email(self):
+        User.objects.create(username='ada', email='ada@test.com', firstname='Ada')
+        response = self.client.post(reverse('resend-email-verification'),
+                                    {'email': 'ada@test.com', 'callBackUrl': 'https://app.test/verify'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
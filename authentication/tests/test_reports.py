@@ -0,0 +1,36 @@
+import io
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from authentication.reports import UserReport
+
+
+class UserReportTest(TestCase):
+    def test_render_paginates_in_chunks(self):
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@test.com', firstname='A' * 80)
+            for i in range(80)
+        ])
+        output = io.BytesIO()
+
+        with self.assertNumQueries(1):
+            count = UserReport(chunk_size=25).render(output)
+
+        self.assertEqual(count, 80)
+        pdf = output.getvalue()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(pdf.count(b'/Type /Page\n'), 3)
+
+    def test_view_renders_in_memory(self):
+        admin = User.objects.create(username='admin', email='admin@test.com', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        response = client.get(reverse('export-user-pdf'), {'sync': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
@@ -3,7 +3,7 @@ from .views import RegisterIssuerView, ResendVerificationEmailView, VerifiedUser
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
-from . import views
+from . import async_views, views
 
 
 urlpatterns = [
@@ -31,13 +31,29 @@ urlpatterns = [
     path('password-reset-complete', SetNewPasswordAPIView.as_view(),
          name='password-reset-complete'),
     path('list-users/', UserListAPIView.as_view(), name="user-details"),
+    path('users/directory/', views.UserDirectoryAPIView.as_view(), name="user-directory"),
     path('user/<int:id>', UserDetailAPIView.as_view(), name="user-data"),
     path('approve/<int:id>', ApproveUserAPIView.as_view(), name="approve-data"),
     path('verify/<int:id>', VerifiedUserAPIView.as_view(), name="verify-user"),
+    path('users/bulk/approve/', views.BulkModerationAPIView.as_view(field='is_approved'),
+         name="bulk-approve-users"),
+    path('users/bulk/verify/', views.BulkModerationAPIView.as_view(field='is_verified'),
+         name="bulk-verify-users"),
     path('export/users/', views.ExportUserAPIView.as_view(),
          name="export-user-data"),
     path('export/users/pdf/', views.ExportUsersPDFAPIView.as_view(),
-         name="export-user-data"),
+         name="export-user-pdf"),
+    path('async/login/', async_views.login, name="async-login"),
+    path('async/register/', async_views.register, name="async-register"),
+    path('async/password-reset-complete', async_views.set_new_password,
+         name="async-password-reset-complete"),
+    path('async/resend-email-verification/', async_views.resend_verification_email,
+         name="async-resend-email-verification"),
+    path('async/request-reset-email/', async_views.request_password_reset,
+         name="async-request-reset-email"),
+    path('async/loaduser/', async_views.load_user, name="async-load-user"),
+    path('hashing-stats/', views.HashingStatsAPIView.as_view(), name="hashing-stats"),
+    path('db-pool-stats/', views.DatabasePoolStatsAPIView.as_view(), name="db-pool-stats"),
 
 
 
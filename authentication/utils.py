@@ -1,65 +1,32 @@
-from django.core.mail import EmailMessage
 import string
 import random
 
-import threading
-from .models import User
-
-
-class EmailThread(threading.Thread):
-
-    def __init__(self, email):
-        self.email = email
-        threading.Thread.__init__(self)
-
-    def run(self):
-        self.email.send()
+from .ids import (REFERRAL_CODE_LENGTH, TRANSACTION_ID_LENGTH,
+                  USERNAME_SUFFIX_LENGTH, random_code)
+from .outbox import enqueue_email
 
 
 class Util:
     @staticmethod
     def send_email(data):
-        email = EmailMessage(
-            subject=data['email_subject'], body=data['email_body'], to=[data['to_email']])
-        EmailThread(email).start()
-
-
-# Generate referral code
-def referral_generator(size=7, chars=string.ascii_lowercase + string.digits):
-    the_id = "".join(random.choice(chars) for x in range(size))
+        """Queue an email in the outbox; it is delivered by the outbox worker."""
+        return enqueue_email(
+            subject=data['email_subject'], body=data['email_body'],
+            to=[data['to_email']], from_email=data.get('from_email'))
 
-    # Check if ID exist in database
-    try:
-        order_gen = User.objects.get(referral_code=the_id)
-        referral_generator
-    except User.DoesNotExist:
-        return the_id
-
-# Generate transaction ID
 
+def referral_generator(size=REFERRAL_CODE_LENGTH):
+    """Random referral code; uniqueness is enforced by the column's unique index."""
+    return random_code(size)
 
-def transaction_generator(size=13, chars=string.ascii_lowercase + string.digits):
-    the_id = "".join(random.choice(chars) for x in range(size))
-    # Check if ID exist in database
-    try:
-        order_gen = User.objects.get(referral_code=the_id)
-        transaction_generator
-    except User.DoesNotExist:
-        return the_id
 
-# Generate transaction ID
+def transaction_generator(size=TRANSACTION_ID_LENGTH):
+    return random_code(size)
 
-# Generate username  ID
 
-
-def username_generator(size=7, chars=string.ascii_lowercase + string.digits):
-    the_id = "".join(random.choice(chars) for x in range(size))
-    # Check if ID exist in database
-    try:
-        order_gen = User.objects.get(referral_code=the_id)
-        username_generator
-    except User.DoesNotExist:
-        return the_id
+def username_generator(size=USERNAME_SUFFIX_LENGTH):
+    """Random username suffix; uniqueness is enforced by the column's unique index."""
+    return random_code(size)
 
 
 def slug_generator(size=4, chars=string.ascii_lowercase + string.digits):
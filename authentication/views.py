@@ -8,33 +8,35 @@ from rest_framework import status
 #from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 #from core.auth.serializers import LoginSerializer, RegistrationSerializer
-from django.core.mail import send_mail as sender
 from rest_framework import filters, generics, status, views, permissions
-from .serializers import ProfileInvestorSerializer, ProfileIssuerSerializer, UserSerializer, ApproveUserSerializer, VerifiedUserSerializer, SigninSerializer, ReferralSerializer, InviteSerializer, RegisterSerializer, SetNewPasswordSerializer, ResetPasswordEmailRequestSerializer, EmailVerificationSerializer, LoginSerializer, LogoutSerializer, UserSerializer
+from .serializers import BulkModerationSerializer, UserDirectorySerializer, ProfileInvestorSerializer, ProfileIssuerSerializer, UserSerializer, ApproveUserSerializer, VerifiedUserSerializer, SigninSerializer, ReferralSerializer, InviteSerializer, RegisterSerializer, SetNewPasswordSerializer, ResetPasswordEmailRequestSerializer, EmailVerificationSerializer, LoginSerializer, LogoutSerializer, UserSerializer
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView, RetrieveAPIView
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from .models import Referrals, User
+from .models import User
 from .utils import Util
 from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
 import jwt
-import csv
 import io
 from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.parsers import MultiPartParser, FormParser
 from drf_yasg import openapi
 from .renderers import UserRenderer
+from .reports import USER_EXPORT_FIELDS, UserReport
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.utils.encoding import smart_str, force_str, smart_bytes, DjangoUnicodeDecodeError
-from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.encoding import smart_str, force_str, DjangoUnicodeDecodeError
+from django.utils.http import urlsafe_base64_decode
 from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
 from .utils import Util, username_generator, referral_generator
+from .registration import queue_password_reset_email, queue_verification_email, register_user, registration_data
+from .referrals import ReferralQuotaExceeded, referral_quota
+from .hashing import hashing_pool
+from junior.db import pool as db_pool
 from django.shortcuts import redirect
 from django.http import FileResponse, HttpResponsePermanentRedirect, HttpResponse, Http404
 import os
@@ -44,9 +46,14 @@ from reportlab.lib.units import inch
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.platypus import Image
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.pagination import CursorPagination
+from .filters import DirectorySearchFilter
+from .moderation import moderation_queryset, set_user_flag
 from django.template.loader import render_to_string, get_template
 #from xhtml2pdf import pisa
-from fpdf import FPDF
+from exports.models import ExportJob
+from exports.tasks import queue_export
+from junior.streaming import streaming_export
 '''
 
 from weasyprint import HTML
@@ -72,6 +79,11 @@ def render_to_pdf(template_src, context_dict={}):
 
         
 class UserListAPIView(ListAPIView):
+    """
+    Deprecated in favour of UserDirectoryAPIView, which searches and pages
+    through indexes. Kept unchanged for existing clients, with a
+    ``Deprecation`` header and a ``Link`` to the directory on every response.
+    """
     serializer_class = UserSerializer
     queryset = User.objects.all().order_by('-created_at')
     permission_classes = (IsAuthenticated, IsAdminUser,)
@@ -88,6 +100,34 @@ class UserListAPIView(ListAPIView):
     def get_queryset(self):
         return self.queryset.all()
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        response['Deprecation'] = 'true'
+        response['Link'] = '<{}>; rel="successor-version"'.format(
+            request.build_absolute_uri(reverse('user-directory')))
+        return response
+
+
+class UserDirectoryPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class UserDirectoryAPIView(ListAPIView):
+    """
+    Admin user directory: indexed ``?q=`` search (see DirectorySearchFilter)
+    with keyset pagination over ``created_at``, so later pages cost the same
+    as the first.
+    """
+    serializer_class = UserDirectorySerializer
+    queryset = User.objects.only(*UserDirectorySerializer.Meta.fields)
+    permission_classes = (IsAuthenticated, IsAdminUser,)
+    pagination_class = UserDirectoryPagination
+    filter_backends = [DirectorySearchFilter, DjangoFilterBackend]
+    filterset_fields = ['role', 'is_verified', 'is_approved']
+
 
 class UserDetailAPIView(RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
@@ -96,7 +136,7 @@ class UserDetailAPIView(RetrieveUpdateDestroyAPIView):
     lookup_field = "id"
 
     def get_queryset(self):
-        return self.queryset.filter(id=self.request.user)
+        return self.queryset.filter(id=self.request.user.id)
 
 class UserInvestorAPIView(RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
@@ -105,7 +145,7 @@ class UserInvestorAPIView(RetrieveUpdateDestroyAPIView):
     lookup_field = "id"
 
     def get_queryset(self):
-        return self.queryset.filter(id=self.request.user)
+        return self.queryset.filter(id=self.request.user.id)
 
 class RefreshViewSet(viewsets.ViewSet, TokenRefreshView):
     permission_classes = (AllowAny,)
@@ -171,36 +211,10 @@ class RegisterView(generics.GenericAPIView):
     renderer_classes = (UserRenderer,)
 
     def post(self, request):
-        user = {
-            'firstname': request.data.get('firstname'),
-            'lastname': request.data.get('lastname'),
-            'username': request.data.get('firstname')+request.data.get('lastname')+str(username_generator()),
-            'address': request.data.get('address'),
-            'is_approved':True,
-            'linkedin': request.data.get('linkedln'),
-            'referral_code': str(referral_generator()),
-            'phone': request.data.get('phone'),
-            'password': request.data.get('password'),
-            'email': request.data.get('email'), }
-        #user = request.data
+        user = registration_data(request.data)
         serializer = self.serializer_class(data=user)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-         
-        user = User.objects.get(email=request.data.get('email'))
-        token = RefreshToken.for_user(user).access_token
-        current_site = get_current_site(request).domain
-        relativeLink = reverse('email-verify')
-        #absurl = 'https://'+current_site+relativeLink+"?token="+str(token)
-        absurl = request.data.get('callBackUrl')+"?token="+str(token)
-        print(absurl)
-        email_body = 'Hi '+user.firstname + \
-            ' Use the link below to verify your email \n' + absurl
-        data = {'email_body': email_body, 'to_email': user.email,
-                'email_subject': 'Verify your email'}
-        sender(data['email_subject'], data['email_body'],
-               'hello@roadmap.careers', [data['to_email']])
-    
+        register_user(serializer, request.data.get('callBackUrl') or '')
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -227,24 +241,8 @@ class RegisterIssuerView(generics.GenericAPIView):
         #user = request.data
         serializer = self.serializer_class(data=user)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        user_data = serializer.data
-        user = User.objects.get(email=user_data['email'])
-        token = RefreshToken.for_user(user).access_token
-        current_site = get_current_site(request).domain
-        relativeLink = reverse('email-verify')
-        #absurl = 'https://'+current_site+relativeLink+"?token="+str(token)
-        absurl = request.data.get('callBackUrl')+"?token="+str(token)
-        print(absurl)
-        email_body = 'Hi '+user.firstname + \
-            ' Use the link below to verify your email \n' + absurl
-        data = {'email_body': email_body, 'to_email': user.email,
-                'email_subject': 'Verify your email'}
-        sender(data['email_subject'], data['email_body'],
-               'hello@roadmap.careers', [data['to_email']])
-
-        Util.send_email(data)
-        return Response(user, status=status.HTTP_201_CREATED)
+        register_user(serializer, request.data.get('callBackUrl') or '')
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class RegisterReferralView(generics.GenericAPIView):
@@ -254,55 +252,41 @@ class RegisterReferralView(generics.GenericAPIView):
     renderer_classes = (UserRenderer,)
 
     def post(self, request):
-        if request.data.get('referral_code'):
-            check_user = User.objects.get(
-                referral_code=request.data.get('referral_code'))
-            print(check_user.id)
-            if check_user:
-                today = datetime.date.today()
-                thirty_days_ago = today - datetime.timedelta(days=30)
-                check_refers = Referrals.objects.filter(
-                    referred=check_user.id, created_at__gte=thirty_days_ago)
-                if len(check_refers) > 4:
-                    return Response({"status": "error",  "error": "User with referral code exceeded monthly limit"},
-                                    status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    user = {
-                        'firstname': request.data.get('firstname'),
-                        'lastname': request.data.get('lastname'),
-                        'username': str(username_generator()),
-                        'address': request.data.get('address'),
-                        'linkedin': request.data.get('linkedln'),
-                        'referral_code': str(referral_generator()),
-                        'phone': request.data.get('phone'),
-                        'password': request.data.get('password'),
-                        'email': request.data.get('email'), }
-                    #user = request.data
-                    serializer = self.serializer_class(data=user)
-                    serializer.is_valid(raise_exception=True)
-                    serializer.save()
-                    user_data = serializer.data
-                    user = User.objects.get(email=user_data['email'])
-                    token = RefreshToken.for_user(user).access_token
-                    current_site = get_current_site(request).domain
-                    relativeLink = reverse('email-verify')
-                    absurl = 'https://'+current_site + \
-                        relativeLink+"?token="+str(token)
-                    print(absurl)
-                    email_body = 'Hi '+user.firstname + \
-                        ' Use the link below to verify your email \n' + absurl
-                    data = {'email_body': email_body, 'to_email': user.email,
-                            'email_subject': 'Verify your email'}
-
-                    Util.send_email(data)
-                    return Response(user_data, status=status.HTTP_201_CREATED)
-            else:
-                return Response({"status": "error",  "error": "Referral code does not exists"},
-                                status=status.HTTP_400_BAD_REQUEST)
-        else:
+        if not request.data.get('referral_code'):
             return Response({"status": "error",  "error": "No referral code entered"},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        referrer = User.objects.filter(
+            referral_code=request.data.get('referral_code')).only('pk').first()
+        if referrer is None:
+            return Response({"status": "error",  "error": "Referral code does not exists"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not referral_quota.available(referrer.pk):
+            return self.quota_exceeded()
+
+        user = {
+            'firstname': request.data.get('firstname'),
+            'lastname': request.data.get('lastname'),
+            'username': str(username_generator()),
+            'address': request.data.get('address'),
+            'linkedin': request.data.get('linkedln'),
+            'referral_code': str(referral_generator()),
+            'phone': request.data.get('phone'),
+            'password': request.data.get('password'),
+            'email': request.data.get('email'), }
+        serializer = self.serializer_class(data=user)
+        serializer.is_valid(raise_exception=True)
+        link = 'https://'+get_current_site(request).domain+reverse('email-verify')
+        try:
+            register_user(serializer, link, referrer=referrer)
+        except ReferralQuotaExceeded:
+            return self.quota_exceeded()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def quota_exceeded(self):
+        return Response({"status": "error",  "error": "User with referral code exceeded monthly limit"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
 class ResendVerificationEmailView(APIView):
     permission_classes = [AllowAny]
     parser_classes = [MultiPartParser, FormParser]
@@ -315,20 +299,7 @@ class ResendVerificationEmailView(APIView):
             if user.is_verified:
                 return Response({'detail': 'Email already verified.'}, status=status.HTTP_400_BAD_REQUEST)
             
-            token = RefreshToken.for_user(user).access_token
-            current_site = get_current_site(request).domain
-            relativeLink = reverse('email-verify')  # e.g. 'email-verify'
-            verification_url = f"{callback_url}?token={str(token)}"
-
-            email_body = f"Hi {user.firstname},\nUse the link below to verify your email:\n{verification_url}"
-            email_data = {
-                'email_body': email_body,
-                'to_email': user.email,
-                'email_subject': 'Verify your email'
-            }
-
-            sender(email_data['email_subject'], email_data['email_body'], 'hello@roadmap.careers', [email_data['to_email']])
-            Util.send_email(email_data)
+            queue_verification_email(user, callback_url or '')
 
             return Response({'detail': 'Verification email resent.'}, status=status.HTTP_200_OK)
         
@@ -394,36 +365,9 @@ class RequestPasswordResetEmail(generics.GenericAPIView):
     serializer_class = ResetPasswordEmailRequestSerializer
 
     def post(self, request):
-        serializer = self.serializer_class(data=request.data)
-
-        email = request.data.get('email', '')
-        # print(email)
-        # print('trueee')
-
-        if User.objects.filter(email=email).exists():
-            user = User.objects.get(email=email)
-            uidb64 = urlsafe_base64_encode(smart_bytes(user.id))
-            token = PasswordResetTokenGenerator().make_token(user)
-            if request.data.get('callbackUrl'):
-                current_site = request.data.get('callbackUrl')
-            else:
-                current_site = get_current_site(request=request).domain
-            relativeLink = reverse(
-                'password-reset-confirm', kwargs={'uidb64': uidb64, 'token': token})
-
-            redirect_url = request.data.get('redirect_url', '')
-            absurl = 'https://'+current_site + relativeLink
-            print("absurl")
-            print(absurl)
-            email_body = 'Hello, \n Use link below to reset your password  \n' + \
-                absurl+"?redirect_url="+redirect_url
-            print("redirect url")
-            print(absurl+"?redirect_url="+redirect_url)
-            data = {'email_body': email_body, 'to_email': user.email,
-                    'email_subject': 'Reset your passsword'}
-            sender(data['email_subject'], data['email_body'],
-               'no-reply@yieldroom.ng', [data['to_email']])
-            #Util.send_email(data)
+        user = User.objects.filter(email=request.data.get('email', '')).first()
+        if user is not None:
+            queue_password_reset_email(request, user, request.data)
         return Response({'success': 'We have sent you a link to reset your password'}, status=status.HTTP_200_OK)
 
 
@@ -467,6 +411,22 @@ class SetNewPasswordAPIView(generics.GenericAPIView):
         return Response({'success': True, 'message': 'Password reset success'}, status=status.HTTP_200_OK)
 
 
+class HashingStatsAPIView(APIView):
+    """Queue depth and wait times of the async views' password hashing pool."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(hashing_pool.stats())
+
+
+class DatabasePoolStatsAPIView(APIView):
+    """Size, checkout wait times and checkout durations of this process' database pools."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(db_pool.stats())
+
+
 class LogoutAPIView(generics.GenericAPIView):
     serializer_class = LogoutSerializer
 
@@ -518,8 +478,8 @@ class LoginView2(APIView):
             'iat': datetime.datetime.now(),
         }
 
-        token = jwt.encode(payload, 'secret',
-                           algorithm='HS256').decode('utf-8')
+        # bytes before PyJWT 2, str since
+        token = smart_str(jwt.encode(payload, 'secret', algorithm='HS256'))
 
         '''response = Response({
             "jwt": token
@@ -555,8 +515,8 @@ class LoginView3(APIView):
             'iat': datetime.datetime.now(),
         }
 
-        token = jwt.encode(payload, 'secret',
-                           algorithm='HS256').decode('utf-8')
+        # bytes before PyJWT 2, str since
+        token = smart_str(jwt.encode(payload, 'secret', algorithm='HS256'))
 
         '''response = Response({
             "jwt": token
@@ -619,61 +579,61 @@ class VerifiedUserAPIView(generics.GenericAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkModerationAPIView(generics.GenericAPIView):
+    """
+    Set ``field`` for a list of user ids or every user matching a filter,
+    in a single UPDATE. Replies with how many users matched and how many
+    actually changed.
+    """
+    serializer_class = BulkModerationSerializer
+    permission_classes = (IsAuthenticated, IsAdminUser)
+    field = None
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = moderation_queryset(data.get('ids'), data.get('filter'))
+        matched, updated = set_user_flag(queryset, self.field, data['value'])
+        return Response({'field': self.field, 'value': data['value'],
+                         'matched': matched, 'updated': updated})
+
+
 class ExportUserAPIView(generics.GenericAPIView):
+    """
+    Export users as CSV. The file is produced by a background export job;
+    pass sync=true to stream it straight from this request instead.
+    """
     serializer_class = RegisterSerializer
     queryset = User.objects.all()
     permission_classes = (IsAuthenticated, IsAdminUser)
 
-    def get_serializer(self, queryset, many=True):
-        return self.serializer_class(
-            queryset,
-            many=many,
-        )
-
     def get(self, request, *args, **kwargs):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="export.csv"'
+        if request.GET.get('sync') != 'true':
+            return queue_export(request, ExportJob.Kind.USERS_CSV, ExportJob.Format.CSV)
 
-        serializer = self.get_serializer(
-            User.objects.all(),
-            many=True
-        )
-        header = RegisterSerializer.Meta.fields
-
-        writer = csv.DictWriter(response, fieldnames=header)
-        writer.writeheader()
-        for row in serializer.data:
-            writer.writerow(row)
-
-        return response
+        rows = User.objects.order_by('pk').values_list(
+            *USER_EXPORT_FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        return streaming_export(USER_EXPORT_FIELDS, rows, 'csv', 'export')
 
 
 class ExportUsersPDFAPIView(generics.GenericAPIView):
+    """
+    Export users as a PDF report. The report is produced by a background
+    export job; pass sync=true to render small reports in this request.
+    """
     serializer_class = RegisterSerializer
     permission_classes = (IsAuthenticated, IsAdminUser,)
 
     def get(self, request):
-        user_db = User.objects.values()
-        print(user_db)
-        sales = [
-            {"item": "Keyboard", "amount": "$120,00"},
-            {"item": "Mouse", "amount": "$10,00"},
-            {"item": "House", "amount": "$1 000 000,00"},
-        ]
-        pdf = FPDF('P', 'mm', 'A4')
-        pdf.add_page()
-        pdf.set_font('courier', 'B', 16)
-        pdf.cell(40, 10, 'This is what you have sold this month so far:', 0, 1)
-        pdf.cell(40, 10, '', 0, 1)
-        pdf.set_font('courier', '', 12)
-        pdf.cell(200, 8, f"{'Item'.ljust(30)} {'Amount'.rjust(20)}", 0, 1)
-        pdf.line(10, 30, 150, 30)
-        pdf.line(10, 38, 150, 38)
-        for line in user_db:
-            pdf.cell(
-                200, 8, f"{line['firstname'].ljust(30)} {line['updated_at'].rjust(20)}", 0, 1)
-        pdf.output('report.pdf', 'F')
-        return FileResponse(open('report.pdf', 'rb'), as_attachment=False, content_type='application/pdf')
+        if request.GET.get('sync') != 'true' or \
+                User.objects.count() > settings.USER_REPORT_SYNC_MAX_ROWS:
+            return queue_export(request, ExportJob.Kind.USERS_PDF, ExportJob.Format.PDF)
+
+        buffer = io.BytesIO()
+        UserReport().render(buffer)
+        buffer.seek(0)
+        return FileResponse(buffer, as_attachment=False, filename='users.pdf', content_type='application/pdf')
 
     '''
     def get(self, request, *args, **kwargs):
@@ -726,3 +686,4 @@ class ExportUsersPDFAPIView(generics.GenericAPIView):
 
         return response
         '''
+
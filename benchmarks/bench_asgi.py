@@ -0,0 +1,140 @@
+"""
+Concurrent request capacity: sync workers (WSGI) against one ASGI event loop.
+
+Both modes serve Facebook sign-ins while the Graph API is a local stub that
+answers after ``--provider-latency`` seconds, i.e. an I/O-bound endpoint.
+The sync mode is ``--workers`` WSGI workers that each handle one request at
+a time, like gunicorn's default sync workers. The ASGI mode is the async
+view on a single event loop, with the provider calls on a pool of
+``--provider-threads`` threads. Each mode gets ``--requests`` requests with
+``--concurrency`` in flight::
+
+    python -m benchmarks.bench_asgi --requests 200 --concurrency 50 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.harness import report, setup_django, test_database
+
+# Used as ROOT_URLCONF while benchmarking, as social_auth is not mounted in
+# junior.urls; filled in once Django is set up
+urlpatterns = []
+
+PROFILE = {'id': '1', 'email': 'bench@bench.test', 'name': 'Bench User'}
+
+
+def start_graph_stub(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = json.dumps(PROFILE).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_sync(requests, concurrency, workers):
+    """``workers`` handlers behind a queue fed by ``concurrency`` clients."""
+    from django.db import connections
+    from django.test import Client
+
+    local = threading.local()
+    worker_slots = threading.Semaphore(workers)
+
+    def one(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        queued = time.perf_counter()
+        with worker_slots:
+            response = client.post('/social/facebook/', {'auth_token': 'token'},
+                                   content_type='application/json')
+        assert response.status_code == 200, response.content
+        return time.perf_counter() - queued
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    connections.close_all()
+    return samples, elapsed
+
+
+def run_asgi(requests, concurrency):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+
+    async def main():
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with in_flight:
+                started = time.perf_counter()
+                response = await client.post('/social/async/facebook/', {'auth_token': 'token'},
+                                             content_type='application/json')
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - started
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(one(i) for i in range(requests)))
+        return samples, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--provider-threads', type=int, default=50)
+    parser.add_argument('--provider-latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+    from django.urls import include, path
+
+    urlpatterns.append(path('social/', include('social_auth.urls')))
+
+    from authentication.models import User
+
+    stub = start_graph_stub(args.provider_latency)
+    graph_url = 'http://127.0.0.1:%d' % stub.server_port
+    with test_database(), override_settings(
+            ROOT_URLCONF=__name__, FACEBOOK_GRAPH_URL=graph_url,
+            SOCIAL_PROVIDER_WORKERS=args.provider_threads,
+            SOCIAL_PROVIDER_POOL_SIZE=args.provider_threads,
+            EMAIL_OUTBOX_IN_PROCESS=False):
+        User.objects.create_user(username='bench', email=PROFILE['email'],
+                                 auth_provider='facebook', is_verified=True)
+
+        print('{} requests, {} concurrent, provider latency {:.0f}ms'.format(
+            args.requests, args.concurrency, args.provider_latency * 1000))
+        for name, (samples, elapsed) in (
+                ('wsgi, %d workers' % args.workers,
+                 run_sync(args.requests, args.concurrency, args.workers)),
+                ('asgi, 1 event loop', run_asgi(args.requests, args.concurrency))):
+            report(name, samples)
+            print('{:<28} {:.1f} requests/s'.format('', len(samples) / elapsed))
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Request latency and Postgres connections as worker threads are added.
+
+Each worker thread plays requests the way Django serves them: a query that
+takes ``--query-latency`` seconds, then the end-of-request connection
+handling. Three setups are compared at each worker count:
+
+* connect: the stock backend with ``CONN_MAX_AGE=0``, a new connection per
+  request;
+* persistent: the stock backend with ``CONN_MAX_AGE=1800``, one connection per
+  thread, which is what DATABASES used to be;
+* pooled: junior.db.backends.postgresql with a ``--pool-size`` pool shared by
+  the threads.
+
+Alongside the latencies the most connections Postgres saw to the benchmark
+database is printed, sampled from pg_stat_activity. Needs a Postgres
+DATABASE_URL::
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_db_pool --workers 4 16 64
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import report, setup_django, test_database
+
+SETUPS = {
+    'connect': {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 0},
+    'persistent': {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 1800},
+    'pooled': {'ENGINE': 'junior.db.backends.postgresql', 'CONN_MAX_AGE': 0},
+}
+
+
+def make_connection(name, settings_dict, pool_size, alias):
+    from django.db.utils import load_backend
+
+    settings_dict = dict(settings_dict, **SETUPS[name])
+    settings_dict['POOL'] = {'min_size': pool_size, 'max_size': pool_size, 'timeout': 30}
+    return load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+
+
+class ConnectionSampler:
+    """Keeps the most backends pg_stat_activity lists for the database."""
+
+    def __init__(self, settings_dict):
+        self.settings_dict = settings_dict
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        connection = make_connection('connect', self.settings_dict, 0, 'sampler')
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop.wait(0.01):
+                    cursor.execute('SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()')
+                    # Less the sampler's own connection
+                    self.peak = max(self.peak, cursor.fetchone()[0] - 1)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run(name, settings_dict, workers, requests, query_latency, pool_size):
+    local = threading.local()
+    connections = []
+
+    def one(i):
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = make_connection(name, settings_dict, pool_size, 'bench')
+            connections.append(connection)
+        started = time.perf_counter()
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_sleep(%s)', [query_latency])
+        connection.close_if_unusable_or_obsolete()
+        return time.perf_counter() - started
+
+    with ConnectionSampler(settings_dict) as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            samples = list(executor.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+    for connection in connections:
+        connection.inc_thread_sharing()
+        connection.close()
+    return samples, elapsed, sampler.peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--query-latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from junior.db import pool as db_pool
+
+    if connection.vendor != 'postgresql':
+        parser.error('DATABASE_URL has to point at Postgres')
+
+    with test_database():
+        settings_dict = dict(connection.settings_dict)
+        print('{} requests, {:.0f}ms query, pool of {}'.format(
+            args.requests, args.query_latency * 1000, args.pool_size))
+        for workers in args.workers:
+            for name in SETUPS:
+                samples, elapsed, peak = run(name, settings_dict, workers, args.requests,
+                                             args.query_latency, args.pool_size)
+                report('{}, {} workers'.format(name, workers), samples)
+                print('{:<28} {:.1f} requests/s, {} connections at most'.format(
+                    '', len(samples) / elapsed, peak))
+            pool_stats = db_pool.stats().get('bench/' + settings_dict['NAME'])
+            if pool_stats:
+                print('{:<28} pool wait mean={:.2f}ms max={:.2f}ms, checkout mean={:.2f}ms'.format(
+                    '', pool_stats['wait_seconds_mean'] * 1000, pool_stats['wait_seconds_max'] * 1000,
+                    pool_stats['checkout_seconds_mean'] * 1000))
+            db_pool.close_pools(lambda key: key[0] == 'bench')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Referral code / username generation: the previous generators against the
+current ones, plus a bulk account import.
+
+The previous generators ran a ``User.objects.get`` per code before the
+insert; the current ones draw from ``secrets`` and leave uniqueness to the
+unique indexes::
+
+    python -m benchmarks.bench_id_generation --users 2000 --iterations 500
+"""
+import argparse
+import random
+import string
+
+from benchmarks.harness import measure, report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000,
+                        help='existing users in the table')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--import-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from authentication.models import User
+    from authentication.utils import referral_generator, username_generator
+
+    def previous_referral_generator(size=7, chars=string.ascii_lowercase + string.digits):
+        """referral_generator as it was: one SELECT per attempt."""
+        the_id = ''.join(random.choice(chars) for x in range(size))
+        try:
+            User.objects.get(referral_code=the_id)
+        except User.DoesNotExist:
+            return the_id
+
+    with test_database():
+        User.objects.bulk_create_users(
+            [User(email='seed{}@bench.test'.format(i)) for i in range(args.users)])
+
+        report('previous generator', measure(
+            lambda i: (previous_referral_generator(), previous_referral_generator()),
+            args.iterations))
+        report('secrets generator', measure(
+            lambda i: (referral_generator(), username_generator()), args.iterations))
+
+        users = [User(email='import{}@bench.test'.format(i)) for i in range(args.import_size)]
+        with CaptureQueriesContext(connection) as queries:
+            samples = measure(lambda i: User.objects.bulk_create_users(users), 1)
+        print('bulk import of {} users: {:.0f}ms, {} queries'.format(
+            args.import_size, samples[0] * 1000, len(queries)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Login throughput on one core: the previous LoginSerializer against the
+current one.
+
+The previous serializer authenticated twice (two PBKDF2 runs), looked the
+user up three times and minted two refresh tokens per login. Runs in one
+thread, so logins/s is per core::
+
+    python -m benchmarks.bench_login --logins 50
+"""
+import argparse
+import statistics
+
+from benchmarks.harness import measure, report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib import auth
+    from rest_framework import serializers
+    from rest_framework.exceptions import AuthenticationFailed
+
+    from authentication.models import User
+    from authentication.serializers import LoginSerializer
+
+    class PreviousLoginSerializer(serializers.ModelSerializer):
+        """LoginSerializer as it was before the single-hash path."""
+        email = serializers.EmailField(max_length=255, min_length=3)
+        password = serializers.CharField(max_length=68, min_length=6, write_only=True)
+        username = serializers.CharField(max_length=255, min_length=3, read_only=True)
+        tokens = serializers.SerializerMethodField()
+
+        def get_tokens(self, obj):
+            user = User.objects.get(email=obj['email'])
+            return {'refresh': user.tokens()['refresh'], 'access': user.tokens()['access']}
+
+        class Meta:
+            model = User
+            fields = ['email', 'password', 'username', 'tokens', 'is_staff', 'is_approved']
+
+        def validate(self, attrs):
+            filtered_user_by_email = User.objects.filter(email=attrs.get('email', ''))
+            user = auth.authenticate(**attrs)
+            auth.authenticate(**attrs)
+            if filtered_user_by_email.exists() and filtered_user_by_email[0].auth_provider != 'email':
+                raise AuthenticationFailed(
+                    detail='Please continue your login using ' + filtered_user_by_email[0].auth_provider)
+            if not user:
+                raise AuthenticationFailed('Invalid credentials, try again')
+            return {'email': user.email, 'username': user.username, 'tokens': user.tokens,
+                    'is_staff': user.is_staff, 'is_approved': user.is_approved}
+
+    def run(serializer_class):
+        def call(i):
+            serializer = serializer_class(data={'email': 'bench@bench.test',
+                                                'password': 'bench-password'})
+            serializer.is_valid(raise_exception=True)
+            assert serializer.data['tokens']['access']
+        return call
+
+    with test_database():
+        user = User(username='bench', email='bench@bench.test', is_verified=True)
+        user.set_password('bench-password')
+        user.save()
+        print(f'password hasher: {settings.PASSWORD_HASHERS[0]}')
+
+        for name, serializer_class in (('previous', PreviousLoginSerializer),
+                                       ('single hash', LoginSerializer)):
+            samples = measure(run(serializer_class), args.logins)
+            report(name, samples)
+            print(f'{"":<28} {1 / statistics.mean(samples):.1f} logins/s per core')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Registration latency: the previous request path against the current one.
+
+The previous path re-read the new user, then sent the verification email
+synchronously on the request thread (twice for RegisterIssuerView). The
+current path reuses the saved instance and only queues the email. SMTP is
+a stub backend with a configurable connect/message delay::
+
+    python -m benchmarks.bench_registration --requests 50 --connect-latency 0.15
+"""
+import argparse
+
+from benchmarks.harness import measure, report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--connect-latency', type=float, default=0.15)
+    parser.add_argument('--message-latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.mail import send_mail
+    from django.test import override_settings
+    from rest_framework import generics, status
+    from rest_framework.response import Response
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from authentication.models import User
+    from authentication.outbox import deliver_outbox
+    from authentication.serializers import RegisterSerializer
+    from authentication.views import RegisterView
+    from benchmarks.stub_smtp import EmailBackend
+
+    class PreviousRegisterView(generics.GenericAPIView):
+        """RegisterView.post as it was before the outbox pipeline."""
+        serializer_class = RegisterSerializer
+
+        def post(self, request):
+            serializer = self.serializer_class(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            user = User.objects.get(email=request.data.get('email'))
+            token = RefreshToken.for_user(user).access_token
+            absurl = request.data.get('callBackUrl') + "?token=" + str(token)
+            email_body = 'Hi ' + user.firstname + \
+                ' Use the link below to verify your email \n' + absurl
+            send_mail('Verify your email', email_body, 'hello@roadmap.careers', [user.email])
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    factory = APIRequestFactory()
+
+    def payload(prefix, i):
+        return {'firstname': 'Bench', 'lastname': 'User', 'username': f'{prefix}{i}',
+                'password': 'bench-password', 'email': f'{prefix}{i}@bench.test',
+                'referral_code': f'{prefix}{i}', 'address': 'Lagos', 'phone': '0800',
+                'callBackUrl': 'https://app.test/verify'}
+
+    def run(view, prefix):
+        def call(i):
+            response = view(factory.post('/auth/register/', payload(prefix, i), format='json'))
+            assert response.status_code == 201, response.data
+        return call
+
+    overrides = override_settings(
+        EMAIL_BACKEND='benchmarks.stub_smtp.EmailBackend',
+        EMAIL_OUTBOX_IN_PROCESS=False,
+        STUB_SMTP_CONNECT_LATENCY=args.connect_latency,
+        STUB_SMTP_MESSAGE_LATENCY=args.message_latency,
+    )
+    with test_database(), overrides:
+        print(f'password hasher: {settings.PASSWORD_HASHERS[0]}')
+        report('previous (sync SMTP)', measure(run(PreviousRegisterView.as_view(), 'old'), args.requests))
+        report('outbox pipeline', measure(run(RegisterView.as_view(), 'new'), args.requests))
+
+        before = EmailBackend.connections_opened
+        drain = measure(lambda i: deliver_outbox(), 1)
+        print(f'outbox drain: {EmailBackend.messages_sent - args.requests} messages over '
+              f'{EmailBackend.connections_opened - before} connection(s) in {drain[0] * 1000:.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Shared setup for the benchmark scripts in this package.
+
+Benchmarks run against a throwaway test database created from the configured
+DATABASE_URL, exactly like ``manage.py test`` does, e.g.::
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_registration
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'junior.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Create a test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, iterations):
+    """Call ``func(i)`` ``iterations`` times; returns latencies in seconds."""
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, samples):
+    print('{:<28} n={:<5} mean={:8.2f}ms  p50={:8.2f}ms  p95={:8.2f}ms  max={:8.2f}ms'.format(
+        name, len(samples),
+        statistics.mean(samples) * 1000,
+        percentile(samples, 50) * 1000,
+        percentile(samples, 95) * 1000,
+        max(samples) * 1000,
+    ))
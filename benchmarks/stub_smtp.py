@@ -0,0 +1,39 @@
+"""
+Email backend that behaves like a remote SMTP server without sending
+anything: opening a connection and every message cost a fixed delay.
+"""
+import time
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+class EmailBackend(BaseEmailBackend):
+    connections_opened = 0
+    messages_sent = 0
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self.connect_latency = getattr(settings, 'STUB_SMTP_CONNECT_LATENCY', 0.15)
+        self.message_latency = getattr(settings, 'STUB_SMTP_MESSAGE_LATENCY', 0.02)
+        self.is_open = False
+
+    def open(self):
+        if self.is_open:
+            return False
+        time.sleep(self.connect_latency)
+        EmailBackend.connections_opened += 1
+        self.is_open = True
+        return True
+
+    def close(self):
+        self.is_open = False
+
+    def send_messages(self, email_messages):
+        new_connection = self.open()
+        for _ in email_messages:
+            time.sleep(self.message_latency)
+            EmailBackend.messages_sent += 1
+        if new_connection:
+            self.close()
+        return len(email_messages)
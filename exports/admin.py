@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'export_format', 'status', 'rows_written', 'rows_total', 'requested_by', 'created_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'started_at', 'heartbeat_at', 'finished_at')
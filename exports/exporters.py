@@ -0,0 +1,89 @@
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+
+from authentication.models import User
+from authentication.reports import USER_EXPORT_FIELDS, UserReport
+from junior.streaming import csv_lines, ndjson_lines
+from .models import ExportJob
+
+
+def write_rows(output, header, rows, export_format, progress, every):
+    """Encode ``rows`` into the binary file ``output``; returns the row count."""
+    lines = csv_lines(header, rows) if export_format == 'csv' else ndjson_lines(header, rows)
+    if export_format == 'csv':
+        output.write(next(lines).encode('utf-8'))
+    count = 0
+    for line in lines:
+        output.write(line.encode('utf-8'))
+        count += 1
+        if count % every == 0:
+            progress(count)
+    return count
+
+
+def viewset_queryset(viewset_class, job):
+    """
+    Rebuild the export queryset a viewset would produce for the job's owner
+    and recorded query parameters, so background exports honor the same
+    filters and role scoping as the list views.
+    """
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    for key, value in job.filters.items():
+        http_request.GET.setlist(key, value if isinstance(value, list) else [value])
+    request = Request(http_request)
+    request.user = job.requested_by
+
+    view = viewset_class(request=request, args=(), kwargs={}, format_kwarg=None, action='export')
+    return view.get_export_queryset()
+
+
+class UsersExporter:
+    def count(self, job):
+        return User.objects.count()
+
+    def write(self, job, output, progress, chunk_size):
+        rows = User.objects.order_by('pk').values_list(
+            *USER_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+        return write_rows(output, USER_EXPORT_FIELDS, rows, job.export_format, progress, chunk_size)
+
+
+class UsersPDFExporter:
+    def count(self, job):
+        return User.objects.count()
+
+    def write(self, job, output, progress, chunk_size):
+        return UserReport(chunk_size=chunk_size).render(output, progress=progress)
+
+
+class ViewSetExporter:
+    def __init__(self, viewset_path, columns_path):
+        self.viewset_path = viewset_path
+        self.columns_path = columns_path
+
+    def resolve(self):
+        # Imported lazily: joblisting.views imports this app to queue jobs
+        from django.utils.module_loading import import_string
+        return import_string(self.viewset_path), import_string(self.columns_path)
+
+    def count(self, job):
+        viewset_class, _ = self.resolve()
+        return viewset_queryset(viewset_class, job).count()
+
+    def write(self, job, output, progress, chunk_size):
+        from joblisting.exports import export_rows
+        viewset_class, columns = self.resolve()
+        rows = export_rows(viewset_queryset(viewset_class, job), columns, chunk_size)
+        return write_rows(output, [header for header, _ in columns], rows,
+                          job.export_format, progress, chunk_size)
+
+
+EXPORTERS = {
+    ExportJob.Kind.USERS_CSV: UsersExporter(),
+    ExportJob.Kind.USERS_PDF: UsersPDFExporter(),
+    ExportJob.Kind.JOB_LISTINGS: ViewSetExporter(
+        'joblisting.views.JobListingViewSet', 'joblisting.exports.JOB_LISTING_EXPORT_COLUMNS'),
+    ExportJob.Kind.JOB_APPLICATIONS: ViewSetExporter(
+        'joblisting.views.JobApplicationViewSet', 'joblisting.exports.JOB_APPLICATION_EXPORT_COLUMNS'),
+}
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from exports.models import ExportJob
+from exports.tasks import claimable_jobs, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Run pending export jobs and reclaim abandoned ones (use --watch to keep polling)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help='Keep polling for pending jobs')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --watch')
+
+    def handle(self, *args, **options):
+        while True:
+            pending = list(claimable_jobs().order_by('created_at').values_list('pk', flat=True))
+            for job_id in pending:
+                if run_export_job(job_id):
+                    job = ExportJob.objects.get(pk=job_id)
+                    style = self.style.SUCCESS if job.status == ExportJob.Status.COMPLETED else self.style.ERROR
+                    self.stdout.write(style(f"{job}: {job.rows_written} rows"))
+
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
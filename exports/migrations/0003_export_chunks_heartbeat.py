@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_to_database_storage(apps, schema_editor):
+    ExportJob = apps.get_model('exports', 'ExportJob')
+    # Running jobs keep their lease; finished ones wrote a file the web
+    # process may not be able to read, so they have to be requested again
+    ExportJob.objects.filter(status='PROCESSING').update(heartbeat_at=models.F('started_at'))
+    ExportJob.objects.filter(status='COMPLETED').update(
+        status='FAILED', error='This export was stored on the worker; request it again.')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exports', '0002_alter_exportjob_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(move_to_database_storage, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='exportjob',
+            name='file',
+        ),
+        migrations.CreateModel(
+            name='ExportChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='exports.exportjob')),
+            ],
+            options={
+                'ordering': ['job', 'index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='exportchunk',
+            constraint=models.UniqueConstraint(fields=('job', 'index'), name='unique_export_chunk'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import models
+from authentication.models import User
+
+
+class ExportJob(models.Model):
+    class Kind(models.TextChoices):
+        USERS_CSV = 'USERS_CSV', 'Users (CSV)'
+        USERS_PDF = 'USERS_PDF', 'Users (PDF)'
+        JOB_LISTINGS = 'JOB_LISTINGS', 'Job listings'
+        JOB_APPLICATIONS = 'JOB_APPLICATIONS', 'Job applications'
+
+    class Format(models.TextChoices):
+        CSV = 'csv', 'CSV'
+        NDJSON = 'ndjson', 'NDJSON'
+        PDF = 'pdf', 'PDF'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        PROCESSING = 'PROCESSING', 'Processing'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    export_format = models.CharField(max_length=10, choices=Format.choices, default=Format.CSV)
+    filters = models.JSONField(default=dict, blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_written = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        if self.status == self.Status.COMPLETED:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, int(self.rows_written * 100 / self.rows_total))
+
+    @property
+    def filename(self):
+        return f"{self.kind.lower().replace('_', '-')}-{self.pk}.{self.export_format}"
+
+
+class ExportChunk(models.Model):
+    """
+    A piece of a completed export's file. Exports are kept in the database
+    rather than in MEDIA_ROOT because the worker that writes them and the
+    web process that serves them need not share a filesystem.
+    """
+    job = models.ForeignKey(ExportJob, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['job', 'index']
+        constraints = [models.UniqueConstraint(fields=['job', 'index'], name='unique_export_chunk')]
@@ -0,0 +1,20 @@
+from django.urls import reverse
+from rest_framework import serializers
+from .models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'kind', 'export_format', 'filters', 'status', 'progress',
+                  'rows_total', 'rows_written', 'error', 'download_url',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.Status.COMPLETED:
+            return None
+        return reverse('exportjob-download', kwargs={'pk': obj.pk})
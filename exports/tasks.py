@@ -0,0 +1,151 @@
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ExportChunk, ExportJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+# Query parameters that steer the export endpoints rather than filter rows
+CONTROL_PARAMS = ('background', 'export_format', 'sync', 'page')
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.EXPORT_JOB_WORKERS, thread_name_prefix='export-job')
+    return _executor
+
+
+class LeaseLost(Exception):
+    """Another worker claimed the job this worker was running."""
+
+
+def claimable_jobs():
+    """Pending jobs, and jobs whose worker's lease on them has run out."""
+    expired = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_LEASE_SECONDS)
+    return ExportJob.objects.filter(
+        Q(status=ExportJob.Status.PENDING)
+        | Q(status=ExportJob.Status.PROCESSING, heartbeat_at__lt=expired))
+
+
+def save_chunks(job, output):
+    """Store the binary file ``output`` as the job's chunks, from the start."""
+    chunk_bytes = settings.EXPORT_FILE_CHUNK_BYTES
+    output.seek(0)
+    ExportChunk.objects.bulk_create(
+        ExportChunk(job=job, index=index, data=data)
+        for index, data in enumerate(iter(lambda: output.read(chunk_bytes), b'')))
+
+
+def run_export_job(job_id):
+    """
+    Produce the file for a pending export job.
+
+    The job is claimed with a conditional UPDATE so an in-process worker and
+    the ``run_export_jobs`` command never run the same job twice. The claim
+    is a lease, identified by ``started_at``: every progress update renews
+    it by moving ``heartbeat_at`` forward, and a job whose heartbeat is
+    ``EXPORT_JOB_LEASE_SECONDS`` old, because its worker crashed, is claimed
+    again from scratch. A worker whose renewal matches no row has had its
+    lease taken over and stops without writing anything back.
+
+    The file is written to the database as ExportChunk rows, in the same
+    transaction that marks the job completed, so any web process can serve
+    it. Returns False when the job could not be claimed.
+    """
+    from .exporters import EXPORTERS
+
+    started_at = timezone.now()
+    claimed = claimable_jobs().filter(pk=job_id).update(
+        status=ExportJob.Status.PROCESSING, started_at=started_at, heartbeat_at=started_at,
+        rows_written=0)
+    if not claimed:
+        return False
+
+    job = ExportJob.objects.select_related('requested_by').get(pk=job_id)
+    # Only while this worker still holds the lease
+    leased = ExportJob.objects.filter(pk=job.pk, started_at=started_at)
+    exporter = EXPORTERS[job.kind]
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+
+    def renew(**fields):
+        if not leased.update(heartbeat_at=timezone.now(), **fields):
+            raise LeaseLost(job.pk)
+
+    def progress(rows_written):
+        renew(rows_written=rows_written)
+
+    with tempfile.TemporaryFile() as output:
+        try:
+            job.rows_total = exporter.count(job)
+            renew(rows_total=job.rows_total)
+            job.rows_written = exporter.write(job, output, progress, chunk_size)
+            job.status = ExportJob.Status.COMPLETED
+        except LeaseLost:
+            logger.warning('Export job %s was reclaimed by another worker, discarding this run', job.pk)
+            return True
+        except Exception as e:
+            logger.exception('Export job %s failed', job.pk)
+            job.status = ExportJob.Status.FAILED
+            job.error = str(e)
+
+        job.finished_at = timezone.now()
+        with transaction.atomic():
+            saved = leased.update(status=job.status, rows_total=job.rows_total,
+                                  rows_written=job.rows_written, error=job.error,
+                                  finished_at=job.finished_at)
+            if saved and job.status == ExportJob.Status.COMPLETED:
+                save_chunks(job, output)
+    if not saved:
+        logger.warning('Export job %s was reclaimed by another worker, discarding this run', job.pk)
+    return True
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_export_job(job_id)
+    finally:
+        connection.close()
+
+
+def dispatch_export_job(job):
+    """Hand ``job`` to the in-process worker pool once the transaction commits."""
+    if settings.EXPORT_JOBS_IN_PROCESS:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.pk))
+
+
+def create_export_job(user, kind, export_format, filters=None):
+    job = ExportJob.objects.create(
+        requested_by=user, kind=kind, export_format=export_format, filters=filters or {})
+    dispatch_export_job(job)
+    return job
+
+
+def queue_export(request, kind, export_format):
+    """Create an export job for ``request`` and answer 202 with its status url."""
+    filters = {
+        key: values if len(values) > 1 else values[0]
+        for key, values in request.query_params.lists()
+        if key not in CONTROL_PARAMS
+    }
+    job = create_export_job(request.user, kind, export_format, filters)
+    return Response({
+        'id': job.pk,
+        'status': job.status,
+        'status_url': reverse('exportjob-detail', kwargs={'pk': job.pk}),
+    }, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,201 @@
+import csv
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from authentication.models import User
+from exports.exporters import EXPORTERS
+from exports.models import ExportJob
+from exports.tasks import run_export_job
+from joblisting.models import Company, JobListing
+
+
+class ExportJobTest(APITestCase):
+    def setUp(self):
+        settings_override = override_settings(EXPORT_JOBS_IN_PROCESS=False, EXPORT_CHUNK_SIZE=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create(username='admin', email='admin@test.com', role='ADMIN', is_staff=True)
+        self.employer = User.objects.create(username='employer', email='employer@test.com', role='EMPLOYER')
+        self.other_employer = User.objects.create(username='other', email='other@test.com', role='EMPLOYER')
+
+        company = Company.objects.create(name='Test Company', location='Test City')
+        for title, owner, job_type in [('Developer', self.employer, 'FULL_TIME'),
+                                       ('Contractor', self.employer, 'CONTRACT'),
+                                       ('Designer', self.other_employer, 'CONTRACT')]:
+            JobListing.objects.create(
+                title=title, company=company, posted_by=owner, description='d',
+                requirements='r', job_type=job_type, location='Lagos')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def download(self, client, job_id):
+        response = client.get(reverse('exportjob-download', kwargs={'pk': job_id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_user_csv_export_runs_as_job(self):
+        client = self.client_for(self.admin)
+        response = client.get(reverse('export-user-data'))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        status_response = client.get(response.data['status_url'])
+        self.assertEqual(status_response.data['status'], 'PENDING')
+        self.assertIsNone(status_response.data['download_url'])
+
+        self.assertTrue(run_export_job(response.data['id']))
+        self.assertFalse(run_export_job(response.data['id']))
+
+        status_response = client.get(response.data['status_url'])
+        self.assertEqual(status_response.data['status'], 'COMPLETED')
+        self.assertEqual(status_response.data['progress'], 100)
+        self.assertEqual(status_response.data['rows_written'], 3)
+
+        rows = list(csv.DictReader(io.StringIO(self.download(client, response.data['id']).decode('utf-8'))))
+        self.assertEqual([row['email'] for row in rows],
+                         ['admin@test.com', 'employer@test.com', 'other@test.com'])
+
+    def test_user_pdf_export_runs_as_job(self):
+        client = self.client_for(self.admin)
+        response = client.get(reverse('export-user-pdf'))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        call_command('run_export_jobs', stdout=io.StringIO())
+        self.assertTrue(self.download(client, response.data['id']).startswith(b'%PDF'))
+
+    def test_job_listing_export_keeps_filters_and_scope(self):
+        client = self.client_for(self.employer)
+        response = client.get(reverse('joblisting-export'),
+                              {'background': 'true', 'job_type': 'CONTRACT', 'export_format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = ExportJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.filters, {'job_type': 'CONTRACT'})
+        self.assertEqual(job.export_format, 'ndjson')
+
+        run_export_job(job.pk)
+        content = self.download(client, job.pk).decode('utf-8')
+        self.assertEqual(len(content.splitlines()), 1)
+        self.assertIn('"title": "Contractor"', content)
+
+    def test_download_before_completion_and_other_users_jobs(self):
+        job = ExportJob.objects.create(requested_by=self.employer, kind=ExportJob.Kind.JOB_LISTINGS)
+
+        response = self.client_for(self.employer).get(reverse('exportjob-download', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client_for(self.other_employer).get(reverse('exportjob-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_failed_job_records_error(self):
+        class BrokenExporter:
+            def count(self, job):
+                raise RuntimeError('database went away')
+
+        job = ExportJob.objects.create(requested_by=self.admin, kind=ExportJob.Kind.JOB_LISTINGS)
+        with mock.patch.dict(EXPORTERS, {ExportJob.Kind.JOB_LISTINGS: BrokenExporter()}), \
+                self.assertLogs('exports.tasks', level='ERROR'):
+            run_export_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.Status.FAILED)
+        self.assertEqual(job.error, 'database went away')
+
+    def test_abandoned_job_is_reclaimed_after_its_lease(self):
+        job = ExportJob.objects.create(requested_by=self.admin, kind=ExportJob.Kind.JOB_LISTINGS,
+                                       status=ExportJob.Status.PROCESSING, started_at=timezone.now(),
+                                       heartbeat_at=timezone.now())
+        self.assertFalse(run_export_job(job.pk))
+
+        ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+        call_command('run_export_jobs', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), (ExportJob.Status.COMPLETED, 3))
+
+    def test_run_that_lost_its_lease_writes_nothing(self):
+        job = ExportJob.objects.create(requested_by=self.admin, kind=ExportJob.Kind.JOB_LISTINGS)
+        exporter = EXPORTERS[ExportJob.Kind.JOB_LISTINGS]
+
+        def count(job):
+            # Another worker takes the job over meanwhile
+            ExportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() + timedelta(seconds=1))
+            return exporter.count(job)
+
+        with mock.patch.object(exporter, 'count', side_effect=count), \
+                self.assertLogs('exports.tasks', level='WARNING'):
+            self.assertTrue(run_export_job(job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.Status.PROCESSING)
+        self.assertFalse(job.chunks.exists())
+
+    def test_progress_renews_the_lease(self):
+        job = ExportJob.objects.create(requested_by=self.admin, kind=ExportJob.Kind.USERS_CSV)
+        exporter = EXPORTERS[ExportJob.Kind.USERS_CSV]
+        heartbeats = []
+
+        def write(job, output, progress, chunk_size):
+            # The job was claimed two hours ago and is still making progress
+            ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+            progress(1)
+            heartbeats.append(ExportJob.objects.get(pk=job.pk).heartbeat_at)
+            self.assertFalse(run_export_job(job.pk))
+            return 1
+
+        with mock.patch.object(exporter, 'write', side_effect=write):
+            self.assertTrue(run_export_job(job.pk))
+
+        self.assertGreater(heartbeats[0], timezone.now() - timedelta(minutes=1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), (ExportJob.Status.COMPLETED, 1))
+
+    def test_worker_stops_once_its_lease_is_taken_over(self):
+        job = ExportJob.objects.create(requested_by=self.admin, kind=ExportJob.Kind.USERS_CSV)
+        exporter = EXPORTERS[ExportJob.Kind.USERS_CSV]
+        calls = []
+
+        def write(job, output, progress, chunk_size):
+            # Another worker reclaims the job after the first chunk
+            for count in (2, 4):
+                calls.append(count)
+                progress(count)
+                ExportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() + timedelta(seconds=1))
+            return 4
+
+        with mock.patch.object(exporter, 'write', side_effect=write), \
+                self.assertLogs('exports.tasks', level='WARNING'):
+            self.assertTrue(run_export_job(job.pk))
+
+        self.assertEqual(calls, [2, 4])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), (ExportJob.Status.PROCESSING, 2))
+        self.assertFalse(job.chunks.exists())
+
+    def test_download_does_not_need_the_workers_filesystem(self):
+        client = self.client_for(self.admin)
+        response = client.get(reverse('export-user-data'))
+
+        # The worker and the web process each have their own MEDIA_ROOT
+        worker_root, web_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, web_root)
+        with override_settings(MEDIA_ROOT=worker_root, EXPORT_FILE_CHUNK_BYTES=16):
+            run_export_job(response.data['id'])
+        shutil.rmtree(worker_root)
+
+        self.assertGreater(ExportJob.objects.get(pk=response.data['id']).chunks.count(), 1)
+        with override_settings(MEDIA_ROOT=web_root):
+            content = self.download(client, response.data['id']).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['email'] for row in rows],
+                         ['admin@test.com', 'employer@test.com', 'other@test.com'])
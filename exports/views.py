@@ -0,0 +1,40 @@
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from junior.streaming import EXPORT_FORMATS
+from .models import ExportJob
+from .serializers import ExportJobSerializer
+
+
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for background export jobs.
+
+    list: Get the export jobs requested by the authenticated user (all jobs for admins)
+    retrieve: Poll the status and progress of an export job
+    download: Download the file of a completed export job
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'ADMIN' or user.is_staff:
+            return ExportJob.objects.all()
+        return ExportJob.objects.filter(requested_by=user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the file of a completed export job."""
+        job = self.get_object()
+        if job.status != ExportJob.Status.COMPLETED:
+            return Response({"detail": "This export is not ready.", "status": job.status},
+                           status=status.HTTP_409_CONFLICT)
+
+        # One chunk in memory at a time
+        chunks = job.chunks.order_by('index').values_list('data', flat=True).iterator(chunk_size=1)
+        content_type = EXPORT_FORMATS.get(job.export_format, 'application/pdf')
+        response = StreamingHttpResponse((bytes(data) for data in chunks), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.filename}"'
+        return response
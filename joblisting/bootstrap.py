@@ -0,0 +1,92 @@
+"""
+Session bootstrap: everything the first screen needs after login in one
+response.
+
+The payload is the user plus the count and first page of their
+applications, skills, recommended courses and career recommendations. It
+takes five queries however much data the user has: one for all four counts
+(correlated subqueries) and one per page, with the related rows the
+serializers read joined in.
+
+Payloads are cached per user for ``BOOTSTRAP_CACHE_TTL`` seconds. The
+receivers in ``signals.py`` drop them when the user or one of their
+collections is saved or deleted, and when a listing they applied to
+changes. Edits to companies and career paths only show up once the entry
+expires. As with the JWT user fields, nothing is cached unless the cache is
+shared between processes (``CACHE_IS_SHARED``): the other workers would
+never see the invalidations.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework.settings import api_settings
+
+from authentication.models import User
+from authentication.serializers import UserSerializer
+from junior import metrics
+from .models import CareerRecommendation, JobApplication, RecommendedCourse, UserSkill
+from .serializers import (CareerRecommendationSerializer, JobApplicationSerializer,
+                          RecommendedCourseSerializer, UserSkillSerializer)
+
+
+def bootstrap_cache_key(user_id):
+    return 'bootstrap:{}'.format(user_id)
+
+
+def invalidate_bootstrap(*user_ids):
+    cache.delete_many([bootstrap_cache_key(user_id) for user_id in user_ids])
+
+
+def count_of(model, field):
+    """``SELECT COUNT(*)`` of ``model`` rows pointing at the outer user."""
+    rows = (model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(rows), 0)
+
+
+# name: (model, user field, related rows to join, ordering, serializer)
+COLLECTIONS = {
+    'applications': (JobApplication, 'applicant',
+                     ('applicant', 'job__company', 'job__posted_by'),
+                     ('-created_at', '-pk'), JobApplicationSerializer),
+    'skills': (UserSkill, 'user', ('skill',),
+               ('-proficiency', '-pk'), UserSkillSerializer),
+    'recommended_courses': (RecommendedCourse, 'user', (),
+                            ('-relevance_score', '-pk'), RecommendedCourseSerializer),
+    'career_recommendations': (CareerRecommendation, 'user', ('career_path',),
+                               ('-confidence_score', '-pk'), CareerRecommendationSerializer),
+}
+
+
+def build_bootstrap(request):
+    user = request.user
+    page_size = api_settings.PAGE_SIZE
+    context = {'request': request}
+
+    counts = User.objects.filter(pk=user.pk).values(**{
+        name + '_count': count_of(model, field) for name, (model, field, *_) in COLLECTIONS.items()
+    }).get()
+
+    data = {'user': UserSerializer(user).data}
+    for name, (model, field, related, ordering, serializer_class) in COLLECTIONS.items():
+        page = (model.objects.filter(**{field: user}).select_related(*related)
+                .order_by(*ordering)[:page_size])
+        data[name] = {
+            'count': counts[name + '_count'],
+            'results': serializer_class(page, many=True, context=context).data,
+        }
+    return data
+
+
+def get_bootstrap(request):
+    # Invalidation only reaches the other processes through a shared cache
+    if not settings.CACHE_IS_SHARED or settings.BOOTSTRAP_CACHE_TTL <= 0:
+        return build_bootstrap(request)
+    key = bootstrap_cache_key(request.user.pk)
+    data = cache.get(key)
+    metrics.count_cache('bootstrap', data is not None)
+    if data is None:
+        data = build_bootstrap(request)
+        cache.set(key, data, settings.BOOTSTRAP_CACHE_TTL)
+    return data
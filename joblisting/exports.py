@@ -0,0 +1,61 @@
+from django.conf import settings
+from junior.streaming import EXPORT_FORMATS, streaming_export
+
+# (column header, queryset lookup) pairs; lookups are read with values_list so
+# related names come from the same query instead of one query per row.
+JOB_LISTING_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('company', 'company__name'),
+    ('posted_by', 'posted_by__email'),
+    ('job_type', 'job_type'),
+    ('experience_level', 'experience_level'),
+    ('location', 'location'),
+    ('remote', 'remote'),
+    ('salary_min', 'salary_min'),
+    ('salary_max', 'salary_max'),
+    ('application_url', 'application_url'),
+    ('deadline', 'deadline'),
+    ('is_active', 'is_active'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+JOB_APPLICATION_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('job_id', 'job_id'),
+    ('job_title', 'job__title'),
+    ('company', 'job__company__name'),
+    ('applicant_id', 'applicant_id'),
+    ('applicant_email', 'applicant__email'),
+    ('applicant_firstname', 'applicant__firstname'),
+    ('applicant_lastname', 'applicant__lastname'),
+    ('status', 'status'),
+    ('resume', 'resume'),
+    ('cover_letter', 'cover_letter'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+
+def export_rows(queryset, columns, chunk_size=None):
+    """Iterate ``queryset`` as tuples through a server-side cursor."""
+    if not queryset.ordered:
+        queryset = queryset.order_by('pk')
+    return queryset.values_list(*[lookup for _, lookup in columns]).iterator(
+        chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+def export_response(queryset, columns, export_format, filename):
+    return streaming_export(
+        [header for header, _ in columns],
+        export_rows(queryset, columns),
+        export_format,
+        filename,
+    )
+
+
+def get_export_format(request):
+    """Return the requested export format, or None when it is not supported."""
+    export_format = request.query_params.get('export_format', 'csv').lower()
+    return export_format if export_format in EXPORT_FORMATS else None
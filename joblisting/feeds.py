@@ -0,0 +1,103 @@
+import json
+
+from defusedxml.ElementTree import iterparse
+
+
+# Import field -> path of the element inside a feed item. Paths are local tag
+# names (namespaces stripped) and may be nested with "/", e.g. "company/name".
+DEFAULT_FEED_MAPPING = {
+    'item_tag': 'job',
+    'fields': {
+        'title': 'title',
+        'description': 'description',
+        'requirements': 'requirements',
+        'job_type': 'job_type',
+        'experience_level': 'experience_level',
+        'location': 'location',
+        'remote': 'remote',
+        'salary_min': 'salary_min',
+        'salary_max': 'salary_max',
+        'application_url': 'application_url',
+        'deadline': 'deadline',
+        'company_name': 'company_name',
+        'company_location': 'company_location',
+        'company_website': 'company_website',
+    }
+}
+
+RSS_FEED_MAPPING = {
+    'item_tag': 'item',
+    'fields': {
+        'title': 'title',
+        'description': 'description',
+        'application_url': 'link',
+        'location': 'location',
+        'job_type': 'job_type',
+        'company_name': 'company',
+    }
+}
+
+FEED_MAPPINGS = {
+    'jobs': DEFAULT_FEED_MAPPING,
+    'rss': RSS_FEED_MAPPING,
+}
+
+
+def load_mapping(preset='jobs', path=None):
+    """Return the mapping for ``preset``, overridden by the JSON file at ``path``."""
+    mapping = {
+        'item_tag': FEED_MAPPINGS[preset]['item_tag'],
+        'fields': dict(FEED_MAPPINGS[preset]['fields']),
+    }
+    if path:
+        with open(path, 'r', encoding='utf-8') as file:
+            override = json.load(file)
+        mapping['item_tag'] = override.get('item_tag', mapping['item_tag'])
+        if override.get('replace_fields'):
+            mapping['fields'] = {}
+        mapping['fields'].update(override.get('fields', {}))
+    return mapping
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _flatten(elem, prefix, values):
+    for child in elem:
+        if not isinstance(child.tag, str):
+            continue
+        path = prefix + local_name(child.tag)
+        text = (child.text or '').strip()
+        if text and path not in values:
+            values[path] = text
+        _flatten(child, path + '/', values)
+
+
+def iter_feed_items(source, mapping):
+    """
+    Yield one import row per feed item of an XML/RSS ``source``.
+
+    The document is parsed incrementally and every item is detached from the
+    tree once yielded, so memory does not grow with the size of the feed.
+    """
+    item_tag = mapping['item_tag']
+    fields = mapping['fields']
+    stack = []
+
+    for event, elem in iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if local_name(elem.tag) != item_tag:
+            continue
+
+        values = {}
+        _flatten(elem, '', values)
+        yield {field: values.get(path) for field, path in fields.items()}
+
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
@@ -0,0 +1,131 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from .models import Company, JobListing
+
+
+def normalize_job_type(raw):
+    """Map a free-text job type onto JobListing.JobType."""
+    raw = (raw or '').upper()
+    if 'PART' in raw:
+        return JobListing.JobType.PART_TIME
+    if 'CONTRACT' in raw:
+        return JobListing.JobType.CONTRACT
+    if 'FREELANCE' in raw:
+        return JobListing.JobType.FREELANCE
+    if 'INTERN' in raw:
+        return JobListing.JobType.INTERNSHIP
+    return JobListing.JobType.FULL_TIME
+
+
+def normalize_experience_level(raw):
+    """Map a free-text experience level onto JobListing.ExperienceLevel."""
+    raw = (raw or '').upper()
+    if 'SENIOR' in raw or 'SR' in raw:
+        return JobListing.ExperienceLevel.SENIOR
+    if 'MID' in raw:
+        return JobListing.ExperienceLevel.MID
+    if 'EXECUTIVE' in raw or 'LEAD' in raw:
+        return JobListing.ExperienceLevel.EXECUTIVE
+    return JobListing.ExperienceLevel.ENTRY
+
+
+def parse_salary(raw):
+    try:
+        return Decimal(str(raw).strip().replace(',', ''))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def parse_deadline(raw):
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw.strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def build_job_listing(row, company, posted_by):
+    """
+    Build an unsaved JobListing from an import row.
+
+    ``row`` uses the column names of the ``import_jobs`` CSV format.
+    """
+    location = row.get('location') or ''
+    return JobListing(
+        title=row.get('title') or '',
+        company=company,
+        posted_by=posted_by,
+        description=row.get('description') or '',
+        requirements=row.get('requirements') or '',
+        job_type=normalize_job_type(row.get('job_type')),
+        experience_level=normalize_experience_level(row.get('experience_level')),
+        location=location,
+        remote='REMOTE' in location.upper() or (row.get('remote') or '').lower() == 'true',
+        salary_min=parse_salary(row.get('salary_min')),
+        salary_max=parse_salary(row.get('salary_max')),
+        application_url=row.get('application_url') or '',
+        deadline=parse_deadline(row.get('deadline')),
+        is_active=True
+    )
+
+
+class JobListingBatchWriter:
+    """
+    Collects import rows and writes them with ``bulk_create`` in batches.
+
+    Companies are resolved once per name and kept for the rest of the run.
+    A batch that fails to insert is dropped, its rows counted in ``failed``,
+    so the next batch starts clean.
+    """
+
+    def __init__(self, posted_by, batch_size=500):
+        self.posted_by = posted_by
+        self.batch_size = batch_size
+        self.companies = {}
+        self.created_companies = 0
+        self.written = 0
+        self.failed = 0
+        self._pending = []
+
+    @property
+    def queued(self):
+        return self.written + len(self._pending)
+
+    def get_company(self, row):
+        name = row.get('company_name')
+        if name in self.companies:
+            return self.companies[name]
+        # Company names are not unique, so take the first of any duplicates
+        company = Company.objects.filter(name=name).order_by('pk').first()
+        if company is None:
+            company = Company.objects.create(
+                name=name,
+                location=row.get('company_location') or '',
+                website=row.get('company_website') or ''
+            )
+            self.created_companies += 1
+        self.companies[name] = company
+        return company
+
+    def add(self, row):
+        """Queue a row; returns False when the row has no company name."""
+        if not row.get('company_name'):
+            return False
+        self._pending.append(
+            build_job_listing(row, self.get_company(row), self.posted_by))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            try:
+                JobListing.objects.bulk_create(pending, batch_size=self.batch_size)
+            except Exception:
+                self.failed += len(pending)
+                raise
+            self.written += len(pending)
+        return self.written
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from authentication.models import User
+from joblisting.feeds import FEED_MAPPINGS, iter_feed_items, load_mapping
+from joblisting.importing import JobListingBatchWriter
+
+
+class Command(BaseCommand):
+    help = 'Import job listings from an XML or RSS feed without loading it into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed_file', type=str, help='Path to the XML/RSS feed file')
+        parser.add_argument('--admin_email', type=str, help='Admin email to associate with jobs', default='admin@example.com')
+        parser.add_argument('--preset', type=str, choices=sorted(FEED_MAPPINGS), default='jobs',
+                            help='Built-in field mapping to start from')
+        parser.add_argument('--mapping', type=str, default=None,
+                            help='JSON file with "item_tag" and "fields" overriding the preset')
+        parser.add_argument('--batch_size', type=int, default=500, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        admin_email = options['admin_email']
+
+        try:
+            admin_user = User.objects.get(email=admin_email)
+        except User.DoesNotExist:
+            raise CommandError(f"Admin user with email {admin_email} does not exist. Please create this user first.")
+
+        try:
+            mapping = load_mapping(options['preset'], options['mapping'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not load mapping: {e}")
+
+        writer = JobListingBatchWriter(admin_user, batch_size=options['batch_size'])
+        skipped = 0
+
+        with open(options['feed_file'], 'rb') as feed:
+            for row in iter_feed_items(feed, mapping):
+                failed = writer.failed
+                try:
+                    if not writer.add(row):
+                        skipped += 1
+                except Exception as e:
+                    if writer.failed > failed:
+                        self.stdout.write(self.style.ERROR(
+                            f"Error writing a batch of {writer.failed - failed} jobs: {e}"))
+                    else:
+                        skipped += 1
+                        self.stdout.write(self.style.ERROR(f"Error importing item: {e}"))
+                    continue
+
+                if writer.queued and writer.queued % 1000 == 0:
+                    self.stdout.write(self.style.SUCCESS(f"Imported {writer.queued} jobs..."))
+
+        try:
+            writer.flush()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error writing the last batch of jobs: {e}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully imported {writer.written} job listings "
+            f"({writer.created_companies} new companies, {skipped} skipped, "
+            f"{writer.failed} lost in failed batches)"))
@@ -1,9 +1,8 @@
 import csv
 from django.core.management.base import BaseCommand
-from api.models import Company, JobListing
-from users.models import User
-from django.utils.text import slugify
-from datetime import datetime
+from joblisting.models import Company
+from joblisting.importing import build_job_listing
+from authentication.models import User
 
 class Command(BaseCommand):
     help = 'Import job listings from CSV file'
@@ -50,64 +49,9 @@ class Command(BaseCommand):
                         if created:
                             self.stdout.write(self.style.SUCCESS(f"Created company: {company.name}"))
                     
-                    # Process job type
-                    job_type = 'FULL_TIME'  # Default
-                    raw_job_type = row.get('job_type', '').upper()
-                    if 'PART' in raw_job_type:
-                        job_type = 'PART_TIME'
-                    elif 'CONTRACT' in raw_job_type:
-                        job_type = 'CONTRACT'
-                    elif 'FREELANCE' in raw_job_type:
-                        job_type = 'FREELANCE'
-                    elif 'INTERN' in raw_job_type:
-                        job_type = 'INTERNSHIP'
-                    
-                    # Process experience level
-                    experience_level = 'ENTRY'  # Default
-                    raw_experience = row.get('experience_level', '').upper()
-                    if 'SENIOR' in raw_experience or 'SR' in raw_experience:
-                        experience_level = 'SENIOR'
-                    elif 'MID' in raw_experience:
-                        experience_level = 'MID'
-                    elif 'EXECUTIVE' in raw_experience or 'LEAD' in raw_experience:
-                        experience_level = 'EXECUTIVE'
-                    
-                    # Process salary
-                    try:
-                        salary_min = float(row.get('salary_min', 0))
-                    except (ValueError, TypeError):
-                        salary_min = None
-                        
-                    try:
-                        salary_max = float(row.get('salary_max', 0))
-                    except (ValueError, TypeError):
-                        salary_max = None
-                    
-                    # Process deadline
-                    deadline = None
-                    if row.get('deadline'):
-                        try:
-                            deadline = datetime.strptime(row.get('deadline'), '%Y-%m-%d').date()
-                        except ValueError:
-                            pass
-                    
                     # Create job listing
-                    job_listing = JobListing.objects.create(
-                        title=row.get('title', ''),
-                        company=company,
-                        posted_by=admin_user,
-                        description=row.get('description', ''),
-                        requirements=row.get('requirements', ''),
-                        job_type=job_type,
-                        experience_level=experience_level,
-                        location=row.get('location', ''),
-                        remote='REMOTE' in row.get('location', '').upper() or row.get('remote', '').lower() == 'true',
-                        salary_min=salary_min,
-                        salary_max=salary_max,
-                        application_url=row.get('application_url', ''),
-                        deadline=deadline,
-                        is_active=True
-                    )
+                    job_listing = build_job_listing(row, company, admin_user)
+                    job_listing.save()
                     
                     job_count += 1
                     if job_count % 100 == 0:
@@ -24,7 +24,7 @@ class JobListingSerializer(serializers.ModelSerializer):
                   'experience_level', 'location', 'remote', 
                   'salary_min', 'salary_max', 'application_url', 
                   'deadline', 'is_active', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'posted_by']
     
     def create(self, validated_data):
         validated_data['posted_by'] = self.context['request'].user
@@ -43,4 +43,36 @@ class JobApplicationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['applicant'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class JobApplySerializer(JobApplicationSerializer):
+    """An application through a listing's apply action, which supplies the job."""
+
+    class Meta(JobApplicationSerializer.Meta):
+        read_only_fields = JobApplicationSerializer.Meta.read_only_fields + ['job']
+
+class UserSkillSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(read_only=True)
+    skill_type = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = UserSkill
+        fields = ['id', 'skill', 'name', 'skill_type', 'proficiency', 'verified',
+                  'source', 'created_at', 'updated_at']
+
+
+class RecommendedCourseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecommendedCourse
+        fields = ['id', 'title', 'provider', 'url', 'reason', 'source', 'recommended_at',
+                  'completed', 'completed_at', 'relevance_score']
+
+
+class CareerRecommendationSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='get_path_title', read_only=True)
+
+    class Meta:
+        model = CareerRecommendation
+        fields = ['id', 'career_path', 'title', 'custom_path', 'confidence_score',
+                  'reasons', 'generated_at', 'viewed']
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.models import User
+from .bootstrap import invalidate_bootstrap
+from .models import CareerRecommendation, JobApplication, JobListing, RecommendedCourse, UserSkill
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_bootstrap(sender, instance, **kwargs):
+    invalidate_bootstrap(instance.pk)
+
+
+@receiver(post_save, sender=JobApplication)
+@receiver(post_delete, sender=JobApplication)
+def invalidate_applicant_bootstrap(sender, instance, **kwargs):
+    invalidate_bootstrap(instance.applicant_id)
+
+
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+@receiver(post_save, sender=RecommendedCourse)
+@receiver(post_delete, sender=RecommendedCourse)
+@receiver(post_save, sender=CareerRecommendation)
+@receiver(post_delete, sender=CareerRecommendation)
+def invalidate_owner_bootstrap(sender, instance, **kwargs):
+    invalidate_bootstrap(instance.user_id)
+
+
+@receiver(post_save, sender=JobListing)
+def invalidate_applicants_bootstrap(sender, instance, created, **kwargs):
+    # Listings are embedded in their applications
+    if not created:
+        invalidate_bootstrap(*instance.applications.values_list('applicant_id', flat=True))
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from joblisting.models import (
+    CareerPath, CareerRecommendation, Company, JobApplication, JobListing,
+    RecommendedCourse, Skill, UserSkill
+)
+from authentication.models import User
+
+
+class BootstrapTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.employer = User.objects.create(username='employer', email='employer@test.com', role='EMPLOYER')
+        self.seeker = User.objects.create(username='seeker', email='seeker@test.com', role='JOB_SEEKER')
+        self.company = Company.objects.create(name='Test Company', location='Test City')
+        self.path = CareerPath.objects.create(
+            title='Backend Engineer', description='APIs', industry='Tech',
+            experience_level='ENTRY', salary_range='50k', future_growth='High')
+        self.url = reverse('bootstrap')
+        self.client.force_authenticate(user=self.seeker)
+
+    def add_rows(self, count):
+        start = JobListing.objects.count()
+        for i in range(start, start + count):
+            job = JobListing.objects.create(
+                title='Job %d' % i, company=self.company, posted_by=self.employer,
+                description='Test description', requirements='Test requirements',
+                job_type='FULL_TIME', location='Test City')
+            JobApplication.objects.create(job=job, applicant=self.seeker, cover_letter='Hi')
+            skill = Skill.objects.create(name='Skill %d' % i, skill_type='HARD')
+            UserSkill.objects.create(user=self.seeker, skill=skill, proficiency=i % 5)
+            RecommendedCourse.objects.create(
+                user=self.seeker, title='Course %d' % i, provider='Provider',
+                url='https://example.com/%d' % i, reason='Gap', source='AI', relevance_score=i)
+            CareerRecommendation.objects.create(
+                user=self.seeker, career_path=self.path, custom_path={},
+                confidence_score=i, reasons=[])
+
+    def test_payload(self):
+        self.add_rows(2)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['username'], 'seeker')
+        for name in ('applications', 'skills', 'recommended_courses', 'career_recommendations'):
+            self.assertEqual(response.data[name]['count'], 2)
+            self.assertEqual(len(response.data[name]['results']), 2)
+        self.assertEqual(response.data['applications']['results'][0]['job_details']['company_details']['name'],
+                         'Test Company')
+        self.assertEqual(response.data['skills']['results'][0]['name'], 'Skill 1')
+        self.assertEqual(response.data['recommended_courses']['results'][0]['title'], 'Course 1')
+        self.assertEqual(response.data['career_recommendations']['results'][0]['title'], 'Backend Engineer')
+
+    def test_empty_collections(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['applications'], {'count': 0, 'results': []})
+        self.assertEqual(response.data['skills'], {'count': 0, 'results': []})
+
+    def test_query_count_is_fixed(self):
+        for count in (1, 15):
+            self.add_rows(count)
+            cache.clear()
+            # One for the counts, one per collection page
+            with self.assertNumQueries(5):
+                response = self.client.get(self.url)
+            self.assertEqual(len(response.data['applications']['results']), min(
+                response.data['applications']['count'], 10))
+
+    def test_cached_until_write(self):
+        self.add_rows(1)
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['skills']['count'], 1)
+
+        UserSkill.objects.create(user=self.seeker, custom_name='Writing', custom_type='SOFT')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['skills']['count'], 2)
+
+        JobApplication.objects.get().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['applications']['count'], 0)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_not_cached_without_a_shared_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_listing_change_invalidates_applicants(self):
+        self.add_rows(1)
+        self.client.get(self.url)
+        job = JobListing.objects.get()
+        job.title = 'Renamed'
+        job.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['applications']['results'][0]['job_details']['title'], 'Renamed')
+
+    def test_cached_per_user(self):
+        self.add_rows(1)
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.employer)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['user']['username'], 'employer')
+        self.assertEqual(response.data['applications']['count'], 0)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from joblisting.models import Company, JobListing, JobApplication
+from authentication.models import User
+
+
+def read_content(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+class ExportTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@test.com', role='ADMIN', is_staff=True)
+        self.employer = User.objects.create(username='employer', email='employer@test.com', role='EMPLOYER')
+        self.other_employer = User.objects.create(username='other', email='other@test.com', role='EMPLOYER')
+        self.job_seeker = User.objects.create(username='seeker', email='seeker@test.com', role='JOB_SEEKER')
+
+        self.company = Company.objects.create(name='Test Company', location='Test City')
+        self.job = JobListing.objects.create(
+            title='Software Developer', company=self.company, posted_by=self.employer,
+            description='Test description', requirements='Test requirements',
+            job_type='FULL_TIME', location='Test City')
+        self.contract = JobListing.objects.create(
+            title='Contractor', company=self.company, posted_by=self.other_employer,
+            description='Test description', requirements='Test requirements',
+            job_type='CONTRACT', location='Remote', remote=True)
+        JobApplication.objects.create(job=self.job, applicant=self.job_seeker, cover_letter='Hi')
+        JobApplication.objects.create(job=self.contract, applicant=self.job_seeker, cover_letter='Hello')
+
+        self.listings_url = reverse('joblisting-export')
+        self.applications_url = reverse('jobapplication-export')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_admin_exports_listings_as_csv(self):
+        response = self.client_for(self.admin).get(self.listings_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('job-listings.csv', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.StringIO(read_content(response))))
+        self.assertEqual([row['title'] for row in rows], ['Software Developer', 'Contractor'])
+        self.assertEqual(rows[0]['company'], 'Test Company')
+        self.assertEqual(rows[0]['posted_by'], 'employer@test.com')
+
+    def test_listing_export_honors_list_filters(self):
+        response = self.client_for(self.admin).get(
+            self.listings_url, {'job_type': 'CONTRACT', 'export_format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        rows = [json.loads(line) for line in read_content(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Contractor')
+        self.assertTrue(rows[0]['remote'])
+
+    def test_employer_exports_only_own_listings(self):
+        response = self.client_for(self.employer).get(self.listings_url)
+        rows = list(csv.DictReader(io.StringIO(read_content(response))))
+        self.assertEqual([row['title'] for row in rows], ['Software Developer'])
+
+    def test_job_seeker_cannot_export_listings(self):
+        response = self.client_for(self.job_seeker).get(self.listings_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unsupported_format(self):
+        response = self.client_for(self.admin).get(self.listings_url, {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_employer_exports_applications_for_own_jobs(self):
+        response = self.client_for(self.employer).get(self.applications_url)
+        rows = list(csv.DictReader(io.StringIO(read_content(response))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['job_title'], 'Software Developer')
+        self.assertEqual(rows[0]['applicant_email'], 'seeker@test.com')
+
+    def test_export_query_count_does_not_grow_with_rows(self):
+        for i in range(20):
+            applicant = User.objects.create(username=f'seeker{i}', email=f'seeker{i}@test.com')
+            JobApplication.objects.create(job=self.job, applicant=applicant)
+
+        response = self.client_for(self.admin).get(self.applications_url)
+        with self.assertNumQueries(1):
+            rows = read_content(response).splitlines()
+        self.assertEqual(len(rows), 23)
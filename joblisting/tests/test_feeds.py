@@ -0,0 +1,105 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+from joblisting.feeds import iter_feed_items, load_mapping
+from joblisting.models import Company, JobListing
+from authentication.models import User
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class FeedParserTest(TestCase):
+    def test_items_are_mapped_and_detached(self):
+        source = io.BytesIO(
+            b'<feed><job><title>A</title><company><name>Acme</name></company></job>'
+            b'<job><title>B</title></job></feed>'
+        )
+        mapping = {'item_tag': 'job', 'fields': {'title': 'title', 'company_name': 'company/name'}}
+        rows = list(iter_feed_items(source, mapping))
+
+        self.assertEqual(rows, [
+            {'title': 'A', 'company_name': 'Acme'},
+            {'title': 'B', 'company_name': None},
+        ])
+
+    def test_mapping_file_overrides_preset(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump({'item_tag': 'posting', 'fields': {'company_name': 'employer'}}, file)
+        self.addCleanup(os.remove, file.name)
+
+        mapping = load_mapping('rss', file.name)
+        self.assertEqual(mapping['item_tag'], 'posting')
+        self.assertEqual(mapping['fields']['company_name'], 'employer')
+        self.assertEqual(mapping['fields']['application_url'], 'link')
+
+
+class ImportJobFeedCommandTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='feedadmin', email='admin@example.com')
+
+    def test_import_xml_feed(self):
+        out = io.StringIO()
+        call_command('import_job_feed', os.path.join(FIXTURES, 'jobs_feed.xml'),
+                     batch_size=2, stdout=out)
+
+        self.assertEqual(JobListing.objects.count(), 3)
+        self.assertEqual(Company.objects.count(), 2)
+        self.assertIn('1 skipped', out.getvalue())
+
+        backend = JobListing.objects.get(title='Backend Engineer')
+        self.assertEqual(backend.company.website, 'https://acme.example.com')
+        self.assertEqual(backend.experience_level, 'SENIOR')
+        self.assertEqual(backend.salary_min, Decimal('1000'))
+        self.assertEqual(str(backend.deadline), '2030-01-31')
+        self.assertEqual(backend.posted_by, self.admin)
+
+        intern = JobListing.objects.get(title='Data Intern')
+        self.assertEqual(intern.job_type, 'INTERNSHIP')
+        self.assertTrue(intern.remote)
+        self.assertIsNone(intern.salary_min)
+
+        self.assertTrue(JobListing.objects.get(title='Frontend Engineer').remote)
+
+    def test_import_rss_feed(self):
+        call_command('import_job_feed', os.path.join(FIXTURES, 'jobs_feed.rss'),
+                     preset='rss', stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(JobListing.objects.values_list('title', 'company__name', 'job_type')),
+            [('QA Analyst', 'Initech', 'PART_TIME'), ('Support Lead', 'Initech', 'FULL_TIME')])
+        self.assertEqual(
+            JobListing.objects.get(title='QA Analyst').application_url,
+            'https://partner.example.com/jobs/10')
+
+    def test_failed_batch_is_dropped_and_counted(self):
+        out = io.StringIO()
+        original = JobListing.objects.bulk_create
+        calls = []
+
+        def bulk_create(objs, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise DatabaseError('insert failed')
+            return original(objs, **kwargs)
+
+        with mock.patch.object(JobListing.objects, 'bulk_create', side_effect=bulk_create):
+            call_command('import_job_feed', os.path.join(FIXTURES, 'jobs_feed.xml'),
+                         batch_size=2, stdout=out)
+
+        self.assertEqual(calls, [2, 1])
+        self.assertEqual(list(JobListing.objects.values_list('title', flat=True)), ['Frontend Engineer'])
+        self.assertIn('Error writing a batch of 2 jobs', out.getvalue())
+        self.assertIn('1 skipped, 2 lost in failed batches', out.getvalue())
+
+    def test_duplicate_company_names_use_the_first(self):
+        first = Company.objects.create(name='Globex', location='Abuja')
+        Company.objects.create(name='Globex', location='Kano')
+        call_command('import_job_feed', os.path.join(FIXTURES, 'jobs_feed.xml'), stdout=io.StringIO())
+
+        self.assertEqual(JobListing.objects.get(title='Frontend Engineer').company, first)
@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authentication.models import User
+from exports.models import ExportJob
+from joblisting.models import Company, JobListing
+from junior import metrics
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class MetricsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        settings_override = override_settings(METRICS_DIR=self.directory.name, METRICS_TOKEN='',
+                                              METRICS_ENABLED=True, DEBUG=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.directory.cleanup)
+        metrics.registry.reset()
+
+        employer = User.objects.create(username='employer', email='employer@test.com', role='EMPLOYER')
+        self.seeker = User.objects.create(username='seeker', email='seeker@test.com', role='JOB_SEEKER')
+        company = Company.objects.create(name='Company', location='City')
+        JobListing.objects.create(
+            title='Job', company=company, posted_by=employer, description='Description',
+            requirements='Requirements', job_type='FULL_TIME', location='City')
+        self.client.force_authenticate(user=self.seeker)
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return dict(line.rsplit(' ', 1) for line in response.content.decode().splitlines()
+                    if not line.startswith('#'))
+
+    def test_request_histograms_and_counters(self):
+        for _ in range(2):
+            self.client.get(reverse('joblisting-list'))
+        self.client.get(reverse('joblisting-detail', args=[0]))
+        self.client.get(reverse('bootstrap'))
+        self.client.get(reverse('bootstrap'))
+        ExportJob.objects.create(requested_by=self.seeker, kind=ExportJob.Kind.JOB_LISTINGS)
+
+        samples = self.scrape()
+        labels = '{view="JobListingViewSet.list",status="2xx"'
+        self.assertEqual(samples['junior_request_duration_seconds_count' + labels + '}'], '2')
+        self.assertEqual(samples['junior_request_duration_seconds_bucket' + labels + ',le="+Inf"}'], '2')
+        self.assertEqual(
+            samples['junior_request_duration_seconds_count{view="JobListingViewSet.retrieve",status="4xx"}'], '1')
+        self.assertGreater(int(samples['junior_db_queries_total{view="JobListingViewSet.list"}']), 0)
+        self.assertEqual(samples['junior_cache_requests_total{cache="bootstrap",result="miss"}'], '1')
+        self.assertEqual(samples['junior_cache_requests_total{cache="bootstrap",result="hit"}'], '1')
+        self.assertEqual(samples['junior_background_queue_depth{queue="export_jobs"}'], '1')
+        self.assertEqual(samples['junior_background_queue_depth{queue="password_hashing"}'], '0')
+
+    def test_buckets(self):
+        registry = metrics.Registry(self.directory.name, autoflush=False)
+        for duration in (0.0005, 0.0015, 0.0019, 100):
+            registry.observe_request('View.get', 200, duration, 1)
+        counts, total = registry.snapshot()['histograms'][0][1:]
+        self.assertEqual(counts[:3], [1, 0, 2])
+        self.assertEqual(counts[-1], 1)
+        self.assertAlmostEqual(total, 100.0039)
+
+    def test_processes_are_added_up(self):
+        # Another worker, still running, and one that has exited
+        other = metrics.Registry(self.directory.name, autoflush=False)
+        other.observe_request('JobListingViewSet.list', 200, 0.01, 3)
+        other.flush()
+        with open(os.path.join(self.directory.name, 'exited.json'), 'w') as f:
+            json.dump({
+                'pid': dead_pid(),
+                'histograms': [[['JobListingViewSet.list', '2xx'], [0] * (len(metrics.BUCKETS) + 1), 0.0]],
+                'counters': [['junior_db_queries_total', [['view', 'JobListingViewSet.list']], 5]],
+                'gauges': [['junior_background_queue_depth', [['queue', 'password_hashing']], 7]],
+            }, f)
+        self.client.get(reverse('joblisting-list'))
+
+        samples = self.scrape()
+        self.assertEqual(samples['junior_request_duration_seconds_count'
+                                 '{view="JobListingViewSet.list",status="2xx"}'], '2')
+        self.assertGreater(int(samples['junior_db_queries_total{view="JobListingViewSet.list"}']), 8)
+        self.assertEqual(samples['junior_background_queue_depth{queue="password_hashing"}'], '0')
+
+        # The exited process' numbers now live in the archive, counted once
+        self.assertEqual(sorted(name for name in os.listdir(self.directory.name) if name.endswith('.json')),
+                         sorted([metrics.ARCHIVE, other._filename, metrics.registry._filename]))
+        samples = self.scrape()
+        self.assertEqual(samples['junior_request_duration_seconds_count'
+                                 '{view="JobListingViewSet.list",status="2xx"}'], '2')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+
+    @override_settings(DEBUG=False)
+    def test_token_is_required_without_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
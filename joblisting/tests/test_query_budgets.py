@@ -0,0 +1,343 @@
+"""
+Query budgets of every API route.
+
+Each route is requested with 1, 10 and 100 rows of everything it could list
+or touch: companies, job listings, applications, users and export jobs. The
+queries it runs must stay within its budget in ``BUDGETS`` and must be the
+same number whatever the row count, so a serializer change that queries per
+row fails here with the offending SQL printed.
+
+Requests are measured cold, with the cache, the decoded token cache and the
+token blacklist emptied first, and authenticate with a real bearer token.
+"""
+import re
+import tempfile
+
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from django.utils.encoding import smart_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from authentication.backends import token_cache
+from authentication.blacklist import blacklist_filter
+from authentication.models import User
+from authentication.signals import seed_blacklist_filter
+from exports.models import ExportChunk, ExportJob
+from joblisting.models import (
+    CareerPath, CareerRecommendation, Company, JobApplication, JobListing,
+    RecommendedCourse, Skill, UserSkill
+)
+
+PASSWORD = 'secret-password'
+
+SIZES = (1, 10, 100)
+
+# Most queries each route may run, by route as in the URLconfs
+BUDGETS = {
+    'api/token/': 2,
+    'api/token/refresh/': 6,
+    'api/token/verify/': 1,
+    'auth/register/': 5,
+    'auth/login/': 2,
+    'auth/invite/': 1,
+    'auth/sign-in/': 1,
+    'auth/logout/': 7,
+    'auth/loaduser/': 1,
+    'auth/email-verify/': 2,
+    'auth/request-reset-email/': 2,
+    'auth/resend-email-verification/': 2,
+    'auth/password-reset/<uidb64>/<token>/': 1,
+    'auth/password-reset-complete': 2,
+    'auth/list-users/': 3,
+    'auth/users/directory/': 2,
+    'auth/user/<id>': 2,
+    'auth/approve/<id>': 3,
+    'auth/verify/<id>': 3,
+    'auth/users/bulk/approve/': 6,
+    'auth/users/bulk/verify/': 6,
+    'auth/export/users/': 2,
+    'auth/export/users/pdf/': 3,
+    'auth/async/login/': 2,
+    'auth/async/register/': 5,
+    'auth/async/password-reset-complete': 2,
+    'auth/async/resend-email-verification/': 2,
+    'auth/async/request-reset-email/': 2,
+    'auth/async/loaduser/': 1,
+    'auth/hashing-stats/': 1,
+    'auth/db-pool-stats/': 1,
+    'job/bootstrap/': 6,
+    'job/companies/': 3,
+    'job/companies/<pk>/': 2,
+    'job/job/listing/': 3,
+    'job/job/listing/export/': 2,
+    'job/job/listing/my_listings/': 3,
+    'job/job/listing/<pk>/': 2,
+    'job/job/listing/<pk>/apply/': 5,
+    'job/applications/': 3,
+    'job/applications/export/': 2,
+    'job/applications/my_applications/': 3,
+    'job/applications/<pk>/': 2,
+    'job/': 1,
+    'exports/jobs/': 3,
+    'exports/jobs/<pk>/': 2,
+    'exports/jobs/<pk>/download/': 3,
+    'exports/': 1,
+    'metrics': 2,
+    '': 4,
+    'api/api.json/': 0,
+    'redoc/': 0,
+}
+
+# Django's admin and the development media server are not ours to budget
+UNBUDGETED = ('admin/', 'media/')
+
+
+def route_template(pattern):
+    """``job/^job/listing/(?P<pk>[^/.]+)/$`` as ``job/job/listing/<pk>/``."""
+    route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'<\1>', pattern)
+    return re.sub(r'<\w+:(\w+)>', r'<\1>', route).replace('^', '').replace('$', '')
+
+
+def routes(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif '(?P<format>' not in str(pattern.pattern):
+            # Format suffix variants run the same view
+            yield route_template(prefix + str(pattern.pattern))
+
+
+def format_queries(queries):
+    return '\n'.join('{}. {}'.format(i, query['sql']) for i, query in enumerate(queries, 1))
+
+
+@override_settings(EMAIL_OUTBOX_IN_PROCESS=False, EXPORT_JOBS_IN_PROCESS=False,
+                   SERVER_TIMING_SAMPLE_RATE=0, METRICS_TOKEN='secret')
+class QueryBudgetTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=directory.name, METRICS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user('admin', email='admin@test.com', password=PASSWORD)
+        User.objects.filter(pk=self.admin.pk).update(role='ADMIN', is_staff=True, is_approved=True)
+        self.employer = User.objects.create_user('employer', email='employer@test.com', password=PASSWORD)
+        User.objects.filter(pk=self.employer.pk).update(role='EMPLOYER')
+        self.seeker = User.objects.create_user('seeker', email='seeker@test.com', password=PASSWORD)
+        User.objects.filter(pk=self.seeker.pk).update(
+            role='JOB_SEEKER', is_approved=True, is_verified=True, referral_code='SEEKER')
+        # Never verified, and the target of the password resets
+        self.unverified = User.objects.create_user('unverified', email='unverified@test.com',
+                                                   password=PASSWORD)
+        for user in (self.admin, self.employer, self.seeker, self.unverified):
+            user.refresh_from_db()
+        self.path = CareerPath.objects.create(
+            title='Backend Engineer', description='APIs', industry='Tech',
+            experience_level='ENTRY', salary_range='50k', future_growth='High')
+        self.rows = 0
+        self.registered = 0
+
+    def add_rows(self, count):
+        for i in range(self.rows, self.rows + count):
+            User.objects.create(username='user%d' % i, email='user%d@test.com' % i, role='JOB_SEEKER')
+            company = Company.objects.create(name='Company %d' % i, location='City')
+            job = JobListing.objects.create(
+                title='Job %d' % i, company=company, posted_by=self.employer,
+                description='Description', requirements='Requirements',
+                job_type='FULL_TIME', location='City')
+            JobApplication.objects.create(job=job, applicant=self.seeker, cover_letter='Hi')
+            skill = Skill.objects.create(name='Skill %d' % i, skill_type='HARD')
+            UserSkill.objects.create(user=self.seeker, skill=skill, proficiency=i % 5)
+            RecommendedCourse.objects.create(
+                user=self.seeker, title='Course %d' % i, provider='Provider',
+                url='https://example.com/%d' % i, reason='Gap', source='AI', relevance_score=i)
+            CareerRecommendation.objects.create(
+                user=self.seeker, career_path=self.path, custom_path={},
+                confidence_score=i, reasons=[])
+            ExportJob.objects.create(requested_by=self.seeker, kind=ExportJob.Kind.JOB_LISTINGS)
+        self.rows += count
+
+    def new_listing(self):
+        return JobListing.objects.create(
+            title='New job', company=Company.objects.first(), posted_by=self.employer,
+            description='Description', requirements='Requirements',
+            job_type='FULL_TIME', location='City')
+
+    def new_unverified_user(self):
+        self.registered += 1
+        return User.objects.create(username='new%d' % self.registered,
+                                   email='new%d@test.com' % self.registered)
+
+    def sign_up(self):
+        self.registered += 1
+        return {'firstname': 'New', 'lastname': 'User', 'email': 'signup%d@test.com' % self.registered,
+                'password': PASSWORD, 'callBackUrl': 'https://app.test/verify'}
+
+    def password_reset(self):
+        # The token is only valid for the current password
+        self.unverified.refresh_from_db()
+        return {'password': PASSWORD,
+                'token': PasswordResetTokenGenerator().make_token(self.unverified),
+                'uidb64': urlsafe_base64_encode(smart_bytes(self.unverified.pk))}
+
+    def completed_export(self):
+        job = ExportJob.objects.create(requested_by=self.seeker, kind=ExportJob.Kind.JOB_LISTINGS,
+                                       status=ExportJob.Status.COMPLETED)
+        ExportChunk.objects.create(job=job, index=0, data=b'id,title\n')
+        return job
+
+    def calls(self):
+        """
+        How each route is requested, as ``(user, method, path, data)``, with
+        the request format last when it is not JSON. ``user`` may also be the
+        bearer token itself. Each is a function, so
+        the rows a request needs are made fresh.
+        """
+        listing = JobListing.objects.order_by('pk').first()
+        application = JobApplication.objects.order_by('pk').first()
+        company = Company.objects.order_by('pk').first()
+        export = ExportJob.objects.order_by('pk').first()
+        login = {'email': self.seeker.email, 'password': PASSWORD}
+        bulk = {'ids': list(User.objects.filter(username__startswith='user').values_list('pk', flat=True)),
+                'value': True}
+        return {
+            'api/token/': lambda: (None, 'post', '/api/token/', login),
+            'api/token/refresh/': lambda: (None, 'post', '/api/token/refresh/',
+                                           {'refresh': str(RefreshToken.for_user(self.seeker))}),
+            'api/token/verify/': lambda: (None, 'post', '/api/token/verify/',
+                                          {'token': str(AccessToken.for_user(self.seeker))}),
+            'auth/register/': lambda: (None, 'post', '/auth/register/', self.sign_up()),
+            'auth/login/': lambda: (None, 'post', '/auth/login/', login),
+            'auth/invite/': lambda: (None, 'get', '/auth/invite/',
+                                     {'user': self.seeker.referral_code}),
+            'auth/sign-in/': lambda: (None, 'post', '/auth/sign-in/', login),
+            'auth/logout/': lambda: (self.seeker, 'post', '/auth/logout/',
+                                     {'refresh': str(RefreshToken.for_user(self.seeker))}),
+            'auth/loaduser/': lambda: (self.seeker, 'get', '/auth/loaduser/', None),
+            'auth/email-verify/': lambda: (None, 'get', '/auth/email-verify/', {
+                'token': str(RefreshToken.for_user(self.new_unverified_user()).access_token)}),
+            'auth/request-reset-email/': lambda: (None, 'post', '/auth/request-reset-email/', {
+                'email': self.unverified.email, 'redirect_url': 'https://app.test/reset'}),
+            'auth/resend-email-verification/': lambda: (
+                None, 'post', '/auth/resend-email-verification/',
+                {'email': self.unverified.email, 'callBackUrl': 'https://app.test/verify'}, 'multipart'),
+            'auth/password-reset/<uidb64>/<token>/': lambda: (
+                None, 'get', '/auth/password-reset/{uidb64}/{token}/'.format(**self.password_reset()),
+                {'redirect_url': 'https://app.test/reset'}),
+            'auth/password-reset-complete': lambda: (
+                None, 'patch', '/auth/password-reset-complete', self.password_reset()),
+            'auth/list-users/': lambda: (self.admin, 'get', '/auth/list-users/', None),
+            'auth/users/directory/': lambda: (self.admin, 'get', '/auth/users/directory/', None),
+            'auth/user/<id>': lambda: (self.seeker, 'get', '/auth/user/%d' % self.seeker.pk, None),
+            'auth/approve/<id>': lambda: (self.admin, 'patch', '/auth/approve/%d' % self.seeker.pk,
+                                          {'is_approved': True}),
+            'auth/verify/<id>': lambda: (self.admin, 'patch', '/auth/verify/%d' % self.seeker.pk,
+                                         {'is_verified': True}),
+            'auth/users/bulk/approve/': lambda: (self.admin, 'post', '/auth/users/bulk/approve/', bulk),
+            'auth/users/bulk/verify/': lambda: (self.admin, 'post', '/auth/users/bulk/verify/', bulk),
+            'auth/export/users/': lambda: (self.admin, 'get', '/auth/export/users/', {'sync': 'true'}),
+            'auth/export/users/pdf/': lambda: (self.admin, 'get', '/auth/export/users/pdf/',
+                                               {'sync': 'true'}),
+            'auth/async/login/': lambda: (None, 'post', '/auth/async/login/', login),
+            'auth/async/register/': lambda: (None, 'post', '/auth/async/register/', self.sign_up()),
+            'auth/async/password-reset-complete': lambda: (
+                None, 'patch', '/auth/async/password-reset-complete', self.password_reset()),
+            'auth/async/resend-email-verification/': lambda: (
+                None, 'post', '/auth/async/resend-email-verification/',
+                {'email': self.unverified.email, 'callBackUrl': 'https://app.test/verify'}),
+            'auth/async/request-reset-email/': lambda: (
+                None, 'post', '/auth/async/request-reset-email/',
+                {'email': self.unverified.email, 'redirect_url': 'https://app.test/reset'}),
+            'auth/async/loaduser/': lambda: (self.seeker, 'get', '/auth/async/loaduser/', None),
+            'auth/hashing-stats/': lambda: (self.admin, 'get', '/auth/hashing-stats/', None),
+            'auth/db-pool-stats/': lambda: (self.admin, 'get', '/auth/db-pool-stats/', None),
+            'job/bootstrap/': lambda: (self.seeker, 'get', '/job/bootstrap/', None),
+            'job/companies/': lambda: (self.seeker, 'get', '/job/companies/', None),
+            'job/companies/<pk>/': lambda: (self.seeker, 'get', '/job/companies/%d/' % company.pk, None),
+            'job/job/listing/': lambda: (self.seeker, 'get', '/job/job/listing/', None),
+            'job/job/listing/export/': lambda: (self.employer, 'get', '/job/job/listing/export/', None),
+            'job/job/listing/my_listings/': lambda: (self.employer, 'get',
+                                                     '/job/job/listing/my_listings/', None),
+            'job/job/listing/<pk>/': lambda: (self.seeker, 'get', '/job/job/listing/%d/' % listing.pk,
+                                              None),
+            'job/job/listing/<pk>/apply/': lambda: (
+                self.seeker, 'post', '/job/job/listing/%d/apply/' % self.new_listing().pk,
+                {'job': JobListing.objects.latest('pk').pk, 'cover_letter': 'Hi'}),
+            'job/applications/': lambda: (self.seeker, 'get', '/job/applications/', None),
+            'job/applications/export/': lambda: (self.seeker, 'get', '/job/applications/export/', None),
+            'job/applications/my_applications/': lambda: (self.seeker, 'get',
+                                                          '/job/applications/my_applications/', None),
+            'job/applications/<pk>/': lambda: (self.seeker, 'get',
+                                               '/job/applications/%d/' % application.pk, None),
+            'job/': lambda: (self.seeker, 'get', '/job/', None),
+            'exports/jobs/': lambda: (self.seeker, 'get', '/exports/jobs/', None),
+            'exports/jobs/<pk>/': lambda: (self.seeker, 'get', '/exports/jobs/%d/' % export.pk, None),
+            'exports/jobs/<pk>/download/': lambda: (
+                self.seeker, 'get', '/exports/jobs/%d/download/' % self.completed_export().pk, None),
+            'exports/': lambda: (self.seeker, 'get', '/exports/', None),
+            'metrics': lambda: ('secret', 'get', '/metrics', None),
+            '': lambda: (None, 'get', '/', None),
+            'api/api.json/': lambda: (None, 'get', '/api/api.json/', {'format': 'openapi'}),
+            'redoc/': lambda: (None, 'get', '/redoc/', None),
+        }
+
+    def measure(self, call):
+        """The response status and the queries of one request."""
+        user, method, path, data, *parser = call()
+        headers = {}
+        if user is not None:
+            token = user if isinstance(user, str) else AccessToken.for_user(user)
+            headers['HTTP_AUTHORIZATION'] = 'Bearer {}'.format(token)
+        self.client.cookies.clear()
+        cache.clear()
+        token_cache.clear()
+        blacklist_filter.reset()
+        # Only a process' first request seeds the filter, whichever test sends it
+        request_started.disconnect(seed_blacklist_filter)
+
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'get':
+                response = self.client.get(path, data, **headers)
+            else:
+                response = getattr(self.client, method)(path, data, format=parser[0] if parser else 'json',
+                                                        **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            response.close()
+        return response.status_code, queries.captured_queries
+
+    def test_every_route_has_a_budget(self):
+        budgeted = [route for route in routes(get_resolver().url_patterns)
+                    if not route.startswith(UNBUDGETED)]
+        self.assertEqual(sorted(set(budgeted)), sorted(BUDGETS))
+        self.assertEqual(sorted(self.calls()), sorted(BUDGETS))
+
+    def test_queries_stay_within_budget_and_do_not_grow_with_rows(self):
+        # A view that errors is reported under its own route
+        self.client.raise_request_exception = False
+        measured = {route: {} for route in BUDGETS}
+        for size in SIZES:
+            self.add_rows(size - self.rows)
+            for route, call in self.calls().items():
+                measured[route][size] = self.measure(call)
+
+        for route, by_size in measured.items():
+            with self.subTest(route=route):
+                for size, (status_code, queries) in by_size.items():
+                    self.assertLess(status_code, 400, '{} failed at {} rows:\n{}'.format(
+                        route, size, format_queries(queries)))
+                counts = {size: len(queries) for size, (status_code, queries) in by_size.items()}
+                largest = by_size[SIZES[-1]][1]
+                self.assertLessEqual(len(largest), BUDGETS[route], '{} ran {} queries, over its budget of {}:\n{}'
+                                     .format(route, len(largest), BUDGETS[route], format_queries(largest)))
+                self.assertEqual(len(set(counts.values())), 1, '{} queries grow with the rows {}, at {} rows:\n{}'
+                                 .format(route, counts, SIZES[-1], format_queries(largest)))
@@ -0,0 +1,152 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authentication.models import User
+from joblisting.models import Company, JobApplication, JobListing
+from junior import db_router
+from junior.db.pool import PoolTimeout
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_PIN_SECONDS=10, REPLICA_RETRY_INTERVAL=30,
+                   CACHE_IS_SHARED=True)
+class ReplicaRoutingTest(APITestCase):
+    """
+    Routes between the test database and a second, in-memory SQLite alias
+    standing in for a replica. The two hold different listings, so each
+    response shows which one served it.
+    """
+    # The alias only exists once setUpClass has added it
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings[REPLICA] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+        connections.ensure_defaults(REPLICA)
+        connections.prepare_test_settings(REPLICA)
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        db_router.reset_health()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for using, title in (('default', 'On the primary'), (REPLICA, 'On the replica')):
+            employer = User.objects.db_manager(using).create(
+                username='employer', email='employer@test.com', role='EMPLOYER')
+            self.seeker = User.objects.db_manager(using).create(
+                username='seeker', email='seeker@test.com', role='JOB_SEEKER')
+            company = Company.objects.using(using).create(name='Company', location='City')
+            self.job = JobListing.objects.using(using).create(
+                title=title, company=company, posted_by=employer, description='Description',
+                requirements='Requirements', job_type='FULL_TIME', location='City')
+        self.client.force_authenticate(user=self.seeker)
+
+    def titles(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [job['title'] for job in response.data['results']]
+
+    def test_browsing_reads_from_the_replica(self):
+        response = self.client.get(reverse('joblisting-list'), {'search': 'On the'})
+        self.assertEqual(self.titles(response), ['On the replica'])
+        response = self.client.get(reverse('joblisting-detail', args=[self.job.pk]))
+        self.assertEqual(response.data['title'], 'On the replica')
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_other_views_read_from_the_primary(self):
+        JobApplication.objects.create(job=self.job, applicant=self.seeker, cover_letter='Hello')
+        response = self.client.get(reverse('jobapplication-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        response = self.client.post(reverse('joblisting-apply', args=[self.job.pk]),
+                                    {'job': self.job.pk, 'cover_letter': 'Hello'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.cookies[db_router.PIN_COOKIE]['max-age'], 10)
+        response = self.client.get(reverse('joblisting-list'))
+        self.assertEqual(self.titles(response), ['On the primary'])
+
+    def test_writers_without_the_cookie_are_pinned_by_user(self):
+        response = self.client.post(reverse('joblisting-apply', args=[self.job.pk]),
+                                    {'job': self.job.pk, 'cover_letter': 'Hello'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # A cross-site client sending a bearer token does not send the cookie back
+        self.client.cookies.clear()
+        response = self.client.get(reverse('joblisting-list'))
+        self.assertEqual(self.titles(response), ['On the primary'])
+
+        # Other users are not pinned
+        self.client.force_authenticate(user=User.objects.get(username='employer'))
+        response = self.client.get(reverse('joblisting-list'))
+        self.assertEqual(self.titles(response), ['On the replica'])
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_writers_are_pinned_by_header_without_a_shared_cache(self):
+        response = self.client.get(reverse('joblisting-list'))
+        self.assertEqual(self.titles(response), ['On the replica'])
+
+        response = self.client.post(reverse('joblisting-apply', args=[self.job.pk]),
+                                    {'cover_letter': 'Hello'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pin = response[db_router.PIN_HEADER]
+        self.client.cookies.clear()
+        response = self.client.get(reverse('joblisting-list'), HTTP_X_PRIMARY_PIN=pin)
+        self.assertEqual(self.titles(response), ['On the primary'])
+
+    def test_forged_pins_are_ignored(self):
+        self.client.cookies[db_router.PIN_COOKIE] = '1'
+        response = self.client.get(reverse('joblisting-list'), HTTP_X_PRIMARY_PIN='primary:forged')
+        self.assertEqual(self.titles(response), ['On the replica'])
+
+    def test_only_browsing_models_go_to_the_replica(self):
+        token = db_router.start_request()
+        self.addCleanup(db_router.end_request, token)
+        db_router.current().replicas_allowed = True
+        db_router.current().request = RequestFactory().get('/')
+        router = db_router.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(User))
+        self.assertEqual(router.db_for_read(JobListing), REPLICA)
+        self.assertEqual(router.db_for_read(Company), REPLICA)
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(connections[REPLICA], 'ensure_connection', side_effect=OperationalError):
+            with self.assertLogs('junior.db_router', 'WARNING'):
+                response = self.client.get(reverse('joblisting-list'))
+            self.assertEqual(self.titles(response), ['On the primary'])
+            self.assertTrue(db_router.is_down(REPLICA))
+        # Not retried until REPLICA_RETRY_INTERVAL has passed
+        response = self.client.get(reverse('joblisting-list'))
+        self.assertEqual(self.titles(response), ['On the primary'])
+
+    def test_exhausted_replica_pool_falls_back_to_the_primary(self):
+        with mock.patch.object(connections[REPLICA], 'ensure_connection',
+                               side_effect=PoolTimeout('No database connection free')):
+            with self.assertLogs('junior.db_router', 'WARNING'):
+                response = self.client.get(reverse('joblisting-list'))
+        self.assertEqual(self.titles(response), ['On the primary'])
+        self.assertTrue(db_router.is_down(REPLICA))
+
+    def test_replica_failing_mid_read_is_retried_on_the_primary(self):
+        with mock.patch.object(connections[REPLICA], 'create_cursor',
+                               side_effect=OperationalError('server closed the connection')):
+            with self.assertLogs('junior.db_router', 'WARNING'):
+                response = self.client.get(reverse('joblisting-detail', args=[self.job.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'On the primary')
+        self.assertTrue(db_router.is_down(REPLICA))
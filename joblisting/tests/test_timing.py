@@ -0,0 +1,61 @@
+import json
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authentication.models import User
+from joblisting.models import Company, JobListing
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingTest(APITestCase):
+    def setUp(self):
+        employer = User.objects.create(username='employer', email='employer@test.com', role='EMPLOYER')
+        self.seeker = User.objects.create(username='seeker', email='seeker@test.com', role='JOB_SEEKER')
+        company = Company.objects.create(name='Company', location='City')
+        for i in range(3):
+            JobListing.objects.create(
+                title='Job %d' % i, company=company, posted_by=employer, description='Description',
+                requirements='Requirements', job_type='FULL_TIME', location='City')
+        self.client.force_authenticate(user=self.seeker)
+
+    def get_timed(self, url):
+        with self.assertLogs('junior.timing', 'INFO') as logs:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(logs.records), 1)
+        return response, json.loads(logs.records[0].getMessage())
+
+    def test_header_and_log_line(self):
+        with CaptureQueriesContext(connection) as queries:
+            response, line = self.get_timed(reverse('joblisting-list'))
+        count = len(queries.captured_queries)
+        metrics = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(metrics), {'total', 'db', 'db-slowest', 'serialize', 'render'})
+        self.assertIn('desc="{} queries"'.format(count), metrics['db'])
+        self.assertEqual(line['view'], 'JobListingViewSet.list')
+        self.assertEqual((line['method'], line['status'], line['queries']), ('GET', 200, count))
+        # Truncated to SQL_LOG_LENGTH
+        self.assertTrue(any(query['sql'].startswith(line['slowest_query'])
+                            for query in queries.captured_queries))
+        self.assertGreater(line['serialize_ms'], 0)
+        self.assertGreater(line['render_ms'], 0)
+        self.assertGreaterEqual(line['total_ms'], line['db_ms'])
+
+    def test_detail_action(self):
+        job = JobListing.objects.first()
+        response, line = self.get_timed(reverse('joblisting-detail', args=[job.pk]))
+        self.assertEqual(line['view'], 'JobListingViewSet.retrieve')
+
+    def test_api_views_are_named_by_method(self):
+        response, line = self.get_timed(reverse('bootstrap'))
+        self.assertEqual(line['view'], 'BootstrapAPIView.get')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client.get(reverse('joblisting-list'))
+        self.assertNotIn('Server-Timing', response)
@@ -7,15 +7,12 @@ from authentication.models import User
 class AuthenticationTest(APITestCase):
     def setUp(self):
         self.register_url = reverse('register')
-        self.token_url = reverse('token_obtain_pair')
+        self.token_url = '/api/token/'
         self.user_data = {
-            'username': 'testuser',
             'email': 'test@example.com',
             'password': 'TestPassword123!',
-            'password2': 'TestPassword123!',
-            'first_name': 'Test',
-            'last_name': 'User',
-            'role': 'JOB_SEEKER'
+            'firstname': 'Test',
+            'lastname': 'User',
         }
         
     def test_registration(self):
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CompanyViewSet, JobListingViewSet, JobApplicationViewSet
+from .views import BootstrapAPIView, CompanyViewSet, JobListingViewSet, JobApplicationViewSet
 
 router = DefaultRouter()
 router.register('companies', CompanyViewSet)
@@ -8,5 +8,6 @@ router.register('job/listing', JobListingViewSet)
 router.register('applications', JobApplicationViewSet, basename='jobapplication')
 
 urlpatterns = [
+    path('bootstrap/', BootstrapAPIView.as_view(), name='bootstrap'),
     path('', include(router.urls)),
 ]
@@ -1,10 +1,21 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Company, JobListing, JobApplication
-from .serializers import CompanySerializer, JobListingSerializer, JobApplicationSerializer
+from .serializers import CompanySerializer, JobListingSerializer, JobApplicationSerializer, JobApplySerializer
 from .permissions import IsEmployerOrAdmin, IsOwnerOrAdmin
+from .exports import (
+    JOB_APPLICATION_EXPORT_COLUMNS, JOB_LISTING_EXPORT_COLUMNS,
+    export_response, get_export_format
+)
+from .bootstrap import get_bootstrap
+from exports.models import ExportJob
+from exports.tasks import queue_export
+
+APPLICATION_RELATED = ('applicant', 'job__company', 'job__posted_by')
+
 
 class CompanyViewSet(viewsets.ModelViewSet):
     """
@@ -23,6 +34,8 @@ class CompanyViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'location']
     ordering_fields = ['name', 'created_at']
+    # Reads junior.db_router may send to a replica
+    replica_actions = ('list', 'retrieve')
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -42,6 +55,7 @@ class JobListingViewSet(viewsets.ModelViewSet):
     destroy: Delete a job listing (owner/admins only)
     my_listings: Get job listings posted by the authenticated user (employers only)
     apply: Apply for a job (job seekers only)
+    export: Stream the filtered job listings as CSV or NDJSON (employers/admins only)
     """
     queryset = JobListing.objects.all()
     serializer_class = JobListingSerializer
@@ -50,22 +64,25 @@ class JobListingViewSet(viewsets.ModelViewSet):
     filterset_fields = ['job_type', 'experience_level', 'remote', 'company']
     search_fields = ['title', 'description', 'company__name', 'location']
     ordering_fields = ['created_at', 'deadline']
+    replica_actions = ('list', 'retrieve')
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'my_listings']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'my_listings', 'export']:
             return [IsEmployerOrAdmin()]
         return [permissions.IsAuthenticated()]
     
     def get_queryset(self):
+        # The serializer nests the company and the poster of every listing
+        listings = JobListing.objects.select_related('company', 'posted_by')
         # Filter by active status unless user is employer/admin
         if self.request.user.role in ['EMPLOYER', 'ADMIN'] or self.request.user.is_staff:
-            return JobListing.objects.all()
-        return JobListing.objects.filter(is_active=True)
+            return listings
+        return listings.filter(is_active=True)
     
     @action(detail=False, methods=['get'])
     def my_listings(self, request):
         """Get job listings posted by the authenticated user (employers only)."""
-        listings = JobListing.objects.filter(posted_by=request.user)
+        listings = JobListing.objects.select_related('company', 'posted_by').filter(posted_by=request.user)
         page = self.paginate_queryset(listings)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -73,6 +90,29 @@ class JobListingViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(listings, many=True)
         return Response(serializer.data)
     
+    def get_export_queryset(self):
+        listings = self.filter_queryset(self.get_queryset())
+        # Employers only export their own postings
+        if self.request.user.role == 'EMPLOYER' and not self.request.user.is_staff:
+            listings = listings.filter(posted_by=self.request.user)
+        return listings
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the filtered job listings as CSV or NDJSON (employers/admins only).
+        Pass background=true to produce the file as an export job instead.
+        """
+        export_format = get_export_format(request)
+        if export_format is None:
+            return Response({"detail": "Unsupported export format."},
+                           status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('background') == 'true':
+            return queue_export(request, ExportJob.Kind.JOB_LISTINGS, export_format)
+        return export_response(self.get_export_queryset(), JOB_LISTING_EXPORT_COLUMNS,
+                               export_format, 'job-listings')
+    
     @action(detail=True, methods=['post'])
     def apply(self, request, pk=None):
         """Apply for a job (job seekers only)."""
@@ -91,7 +131,7 @@ class JobListingViewSet(viewsets.ModelViewSet):
             return Response({"detail": "You have already applied for this job."},
                            status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = JobApplicationSerializer(data=request.data, context={'request': request})
+        serializer = JobApplySerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(job=job, applicant=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -109,21 +149,24 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
     partial_update: Partially update a job application (owner/employers/admins only)
     destroy: Delete a job application (owner/admins only)
     my_applications: Get applications made by the authenticated user (job seekers only)
+    export: Stream the visible applications as CSV or NDJSON
     """
     serializer_class = JobApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         user = self.request.user
+        # The serializer nests the applicant and the job, with its company and poster
+        applications = JobApplication.objects.select_related(*APPLICATION_RELATED)
         # Admins can see all applications
         if user.role == 'ADMIN' or user.is_staff:
-            return JobApplication.objects.all()
+            return applications
         # Employers can see applications for their job listings
         elif user.role == 'EMPLOYER':
-            return JobApplication.objects.filter(job__posted_by=user)
+            return applications.filter(job__posted_by=user)
         # Job seekers can see their own applications
         else:
-            return JobApplication.objects.filter(applicant=user)
+            return applications.filter(applicant=user)
     
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
@@ -137,10 +180,42 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Only job seekers can view their applications."},
                            status=status.HTTP_403_FORBIDDEN)
         
-        applications = JobApplication.objects.filter(applicant=request.user)
+        applications = JobApplication.objects.select_related(*APPLICATION_RELATED).filter(
+            applicant=request.user)
         page = self.paginate_queryset(applications)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(applications, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+    
+    def get_export_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the applications visible to the user as CSV or NDJSON.
+        Pass background=true to produce the file as an export job instead.
+        """
+        export_format = get_export_format(request)
+        if export_format is None:
+            return Response({"detail": "Unsupported export format."},
+                           status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('background') == 'true':
+            return queue_export(request, ExportJob.Kind.JOB_APPLICATIONS, export_format)
+        return export_response(self.get_export_queryset(), JOB_APPLICATION_EXPORT_COLUMNS,
+                               export_format, 'applications')
+
+
+class BootstrapAPIView(APIView):
+    """
+    Everything the first screen needs after login: the user, and the count
+    and first page of their applications, skills, recommended courses and
+    career recommendations. Cached per user, see bootstrap.py.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_bootstrap(request))
@@ -2,6 +2,9 @@
 ASGI config for logistics project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The Procfile serves it with uvicorn workers when SERVER_MODE=asgi; the async
+views in authentication.async_views and social_auth.async_views then run on
+the event loop instead of a thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -0,0 +1,89 @@
+"""
+PostgreSQL backend that takes its connections from a per-process pool.
+
+Django closes a connection at the end of every request when ``CONN_MAX_AGE``
+is 0; this backend hands it back to a ``junior.db.pool.ConnectionPool``
+instead, so a request costs a checkout rather than a connect, and a process
+never holds more than the pool's ``max_size`` connections however many
+threads it runs. The pool is configured by the ``POOL`` entry of the
+database's settings::
+
+    'POOL': {'min_size': 1, 'max_size': 10, 'timeout': 10, 'max_idle': 300, 'pre_ping': True}
+
+Connections are rolled back before they are pooled again, and connections
+returned in the middle of an atomic block are closed. The only other session
+state Django leaves behind is server-side cursors (``.iterator()``), which
+``DISABLE_SERVER_SIDE_CURSORS`` turns off when a PgBouncer in transaction
+pooling mode sits in front of Postgres.
+"""
+import psycopg2.extensions
+import psycopg2.extras
+from django.db.backends.postgresql import base, creation
+
+from junior.db.pool import ConnectionPool, close_pools, get_pool
+
+
+def connect(conn_params, options):
+    """What Django's backend does to open a connection, less the wrapper state."""
+    connection = base.Database.connect(**conn_params)
+    isolation_level = options.get('isolation_level')
+    if isolation_level is not None and isolation_level != connection.isolation_level:
+        connection.set_session(isolation_level=isolation_level)
+    psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+def ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if not connection.autocommit:
+        connection.rollback()
+
+
+def reset(connection):
+    if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would keep it from being dropped
+        close_pools(lambda key: key[1] == test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        config = self.settings_dict.get('POOL', {})
+
+        def factory():
+            return ConnectionPool(
+                lambda: connect(conn_params, options),
+                min_size=config.get('min_size', 0),
+                max_size=config.get('max_size', 10),
+                timeout=config.get('timeout', 30),
+                max_idle=config.get('max_idle'),
+                ping=ping if config.get('pre_ping', True) else None,
+                reset=reset,
+            )
+
+        key = (self.alias, conn_params.get('database'), repr(sorted(conn_params.items())))
+        return get_pool(key, factory)
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Django keeps using a connection closed in an atomic block
+                # until the block exits, so it cannot go to anyone else
+                self.pool.putconn(self.connection, discard=self.in_atomic_block)
@@ -0,0 +1,249 @@
+"""
+Per-process pool of database connections.
+
+Without it every worker thread keeps a persistent connection of its own
+(``CONN_MAX_AGE``), so the connections Postgres sees grow with dynos times
+threads, busy or not. A ``ConnectionPool`` opens at most ``max_size``
+connections in a process and hands them out for one request at a time; a
+request that finds them all checked out waits up to ``timeout`` seconds for
+one to come back, then PoolTimeout, a DatabaseError, is raised.
+
+``min_size`` connections are kept open once made; idle ones above that are
+closed after ``max_idle`` seconds. Idle connections are handed out newest
+first so the extra ones actually age out. With ``ping`` set, each connection
+is checked before it is handed out and replaced if it has died while idle
+(a Postgres restart, a failover, PgBouncer dropping it). ``reset`` runs on
+every connection that comes back, e.g. to roll back an open transaction; a
+connection it fails on is closed instead of pooled.
+
+The pool knows nothing about the driver: connections come from ``connect``
+and only need ``close()`` and a ``closed`` attribute.
+``stats()`` reports the time spent waiting for a connection and the time
+connections were held, which is what to watch when sizing ``max_size``.
+"""
+import collections
+import os
+import threading
+import time
+
+from django.db import DatabaseError
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, min_size=0, max_size=10, timeout=30.0, max_idle=None,
+                 ping=None, reset=None):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._ping = ping
+        self._reset = reset
+        self._cond = threading.Condition()
+        self._idle = collections.deque()
+        self._checked_out = {}
+        self._size = 0
+        self._closed = False
+        self._waiting = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._cond:
+            self._checkouts = 0
+            self._timeouts = 0
+            self._connections_made = 0
+            self._connections_lost = 0
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self._held_total = 0.0
+            self._held_max = 0.0
+            self._returns = 0
+
+    def _make(self):
+        """Open a connection for a slot already counted in ``_size``."""
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._connections_made += 1
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _discard(self, conn):
+        """Close a connection and free its slot."""
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self):
+        """Check a connection out, waiting up to ``timeout`` for one to be free."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout('The connection pool is closed')
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout('No database connection free after {:.1f}s ({} in use)'.format(
+                        self.timeout, self._size))
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if conn is not None and not self._usable(conn):
+            # Replace it, keeping its slot
+            self._close_quietly(conn)
+            with self._cond:
+                self._connections_lost += 1
+            conn = None
+        if conn is None:
+            conn = self._make()
+
+        now = time.monotonic()
+        waited = now - started
+        with self._cond:
+            self._checked_out[id(conn)] = now
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def _usable(self, conn):
+        if conn.closed:
+            return False
+        if self._ping is None:
+            return True
+        try:
+            self._ping(conn)
+        except Exception:
+            return False
+        return True
+
+    def putconn(self, conn, discard=False):
+        """Give a connection back; closed or ``discard``-ed ones are not reused."""
+        now = time.monotonic()
+        with self._cond:
+            checked_out_at = self._checked_out.pop(id(conn), None)
+            if checked_out_at is not None:
+                held = now - checked_out_at
+                self._returns += 1
+                self._held_total += held
+                self._held_max = max(self._held_max, held)
+        if not discard and not conn.closed and self._reset is not None:
+            try:
+                self._reset(conn)
+            except Exception:
+                discard = True
+        with self._cond:
+            keep = not (discard or conn.closed or self._closed)
+            if keep:
+                self._idle.append((conn, now))
+                self._cond.notify()
+            expired = self._expired(now)
+        if not keep:
+            self._discard(conn)
+        for idle in expired:
+            self._discard(idle)
+
+    def _expired(self, now):
+        """Take idle connections beyond ``min_size`` unused for ``max_idle`` out."""
+        expired = []
+        if self.max_idle is None:
+            return expired
+        while (self._idle and self._size - len(expired) > self.min_size
+               and now - self._idle[0][1] > self.max_idle):
+            expired.append(self._idle.popleft()[0])
+        return expired
+
+    def close(self):
+        """Close the idle connections; checked out ones are closed on return."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, collections.deque()
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._checked_out),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connections_made': self._connections_made,
+                'connections_lost': self._connections_lost,
+                'wait_seconds_total': self._wait_total,
+                'wait_seconds_max': self._wait_max,
+                'wait_seconds_mean': self._wait_total / self._checkouts if self._checkouts else 0.0,
+                'checkout_seconds_total': self._held_total,
+                'checkout_seconds_max': self._held_max,
+                'checkout_seconds_mean': self._held_total / self._returns if self._returns else 0.0,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """
+    The pool registered under ``key`` in this process, made by ``factory()``
+    on first use. Pools are never shared with forked children: a connection
+    must not be used from two processes.
+    """
+    key = (os.getpid(),) + tuple(key)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = factory()
+        return pool
+
+
+def close_pools(match=lambda key: True):
+    """Close and forget this process' pools whose key ``match``-es."""
+    pid = os.getpid()
+    with _pools_lock:
+        closing = [key for key in _pools if key[0] == pid and match(key[1:])]
+        pools = [_pools.pop(key) for key in closing]
+    for pool in pools:
+        pool.close()
+
+
+def stats():
+    """Stats of this process' pools, labelled by the first two items of their keys."""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [(key[1:3], pool) for key, pool in _pools.items() if key[0] == pid]
+    return {'/'.join(map(str, label)): pool.stats() for label, pool in pools}
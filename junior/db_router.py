@@ -0,0 +1,188 @@
+"""
+Routing of the job browsing reads to read replicas.
+
+Views opt in with ``replica_actions``, the viewset actions whose reads may
+be served by a replica, e.g. ``('list', 'retrieve')``.
+``ReplicaRoutingMiddleware`` (junior.middleware) marks safe requests to
+those actions, and for the rest of such a request ``ReplicaRouter`` sends
+reads of the browsing models (``REPLICA_MODELS``) to a replica from
+``DATABASE_REPLICAS``. Everything else, including writes, reads made after a
+write in the same request, ``select_for_update()`` and the users read to
+authenticate the request, stays on ``default``: a lagging replica must not
+refill the user cache with stale auth fields.
+
+Replicas lag the primary, so a client that has just written would not see
+the write. Any write pins the client's reads to the primary for
+``REPLICA_PIN_SECONDS`` with a signed, timestamped token, which any process
+can check without shared state. It is sent both as a cookie and in the
+``X-Primary-Pin`` response header: clients sending bearer tokens from
+another site do not send the cookie back, and echo the header instead. With
+a shared cache an authenticated user is also pinned through a key in the
+cache, which covers clients that do neither. The pin is checked on the first
+replica read, once DRF has authenticated the request.
+
+A replica that cannot be connected to, or whose connection pool is
+exhausted, is skipped for ``REPLICA_RETRY_INTERVAL`` seconds and its reads
+go to the next replica, or the primary once none is left. A replica that
+fails once a read is under way is skipped the same way, and
+``ReplicaRoutingMiddleware`` runs the view again against the primary.
+
+The routing state lives in a context variable, so it follows the request
+onto the threads the async views run sync code on.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'pin_primary'
+PIN_HEADER = 'X-Primary-Pin'
+PIN_KEY = 'replica-pin:{}'
+PIN_SALT = 'junior.db_router.pin'
+
+# The models browsing requests may read from a replica
+REPLICA_MODELS = {'joblisting.JobListing', 'joblisting.Company'}
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+
+_down_until = {}
+_down_lock = threading.Lock()
+
+
+class Routing:
+    """What the current request may read from."""
+
+    def __init__(self):
+        self.replicas_allowed = False
+        self.wrote = False
+        self.replica = None
+        self.request = None
+        self.view = None
+
+
+def start_request():
+    """Begin routing a request; returns the token ``end_request`` takes."""
+    return _routing.set(Routing())
+
+
+def end_request(token):
+    _routing.reset(token)
+
+
+def current():
+    return _routing.get()
+
+
+def mark_down(alias):
+    with _down_lock:
+        _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_INTERVAL
+
+
+def is_down(alias):
+    with _down_lock:
+        return _down_until.get(alias, 0) > time.monotonic()
+
+
+def reset_health():
+    with _down_lock:
+        _down_until.clear()
+
+
+def authenticated_user(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def pin(request, response):
+    """Send the client that made ``request`` to the primary for a while."""
+    token = signing.TimestampSigner(salt=PIN_SALT).sign('primary')
+    response.set_cookie(PIN_COOKIE, token, max_age=settings.REPLICA_PIN_SECONDS,
+                        httponly=True, samesite='Lax')
+    response[PIN_HEADER] = token
+    user = authenticated_user(request)
+    if user is not None and settings.CACHE_IS_SHARED:
+        cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def valid_pin(token):
+    try:
+        signing.TimestampSigner(salt=PIN_SALT).unsign(token, max_age=settings.REPLICA_PIN_SECONDS)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def is_pinned(request):
+    tokens = (request.COOKIES.get(PIN_COOKIE), request.headers.get(PIN_HEADER))
+    if any(token and valid_pin(token) for token in tokens):
+        return True
+    user = authenticated_user(request)
+    if user is None or not settings.CACHE_IS_SHARED:
+        return False
+    return cache.get(PIN_KEY.format(user.pk)) is not None
+
+
+def pick_replica():
+    """A replica that can be connected to, or None to read from the primary."""
+    candidates = [alias for alias in settings.DATABASE_REPLICAS if not is_down(alias)]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            # PoolTimeout included: a replica with no free connection is as good as down
+            logger.warning("Replica %s is unreachable, reading from the primary instead", alias,
+                           exc_info=True)
+            mark_down(alias)
+            continue
+        return alias
+    return None
+
+
+def fall_back_to_primary(routing, exception):
+    """
+    Stop reading from the replica ``exception`` came from during
+    ``routing``'s request; returns whether the request's reads can be retried
+    on the primary.
+    """
+    if routing is None or routing.wrote or routing.replica in (None, DEFAULT_DB_ALIAS):
+        return False
+    logger.warning("Replica %s failed during a read, retrying it on the primary", routing.replica,
+                   exc_info=exception)
+    mark_down(routing.replica)
+    routing.replica = DEFAULT_DB_ALIAS
+    return True
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (routing is None or not routing.replicas_allowed or routing.wrote
+                or model._meta.label not in REPLICA_MODELS):
+            return None
+        if routing.replica is None:
+            # One replica for the whole request, so its reads are consistent
+            replica = None
+            if settings.DATABASE_REPLICAS and not is_pinned(routing.request):
+                replica = pick_replica()
+            routing.replica = replica or DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
@@ -0,0 +1,285 @@
+"""
+Request latency histograms and counters, added up across worker processes.
+
+Each process records into a ``Registry``:
+
+* a latency histogram per view and status class (``2xx``, ``4xx``...);
+* the SQL queries each view ran;
+* hits and misses per cache, through ``count_cache``.
+
+Histograms have fixed buckets, two per doubling of the latency from 1ms to
+about 30s, HDR style. Every latency is therefore placed within about 40% of
+its value, whatever its size, and recording one is a bisect and an
+increment. Memory does not grow with traffic.
+
+gunicorn workers share no memory, so every process writes its registry to a
+JSON file of its own in ``METRICS_DIR``, every ``METRICS_FLUSH_INTERVAL``
+seconds and on each scrape. ``/metrics`` adds all the files up in the
+Prometheus text format. At each scrape the files left by workers that have
+exited are folded into a single ``archive.json`` and removed, so counters
+never go down while the directory, and the cost of a scrape, stay bounded by
+the number of live workers. Gauges, such as the password hashing queue, are
+only taken from live processes. The export job and email outbox
+queues are counted in the database at scrape time.
+"""
+import bisect
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+# Numbers of the processes that have exited, without a pid
+ARCHIVE = 'archive.json'
+
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = tuple(0.001 * 2 ** (i / 2) for i in range(31))
+
+
+def status_class(status_code):
+    return '{}xx'.format(status_code // 100)
+
+
+class Registry:
+
+    def __init__(self, directory=None, autoflush=True):
+        self._directory = directory
+        self._autoflush = autoflush
+        self._lock = threading.Lock()
+        self._pid = None
+        self.reset()
+
+    @property
+    def directory(self):
+        return self._directory or settings.METRICS_DIR
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+    def _check_process(self):
+        # A forked worker starts counting afresh, in a file and thread of its own
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._filename = '{}-{}.json'.format(pid, time.time_ns())
+        self._histograms = {}
+        self._counters = {}
+        if self._autoflush:
+            threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def observe_request(self, view, status_code, duration, queries):
+        key = (view, status_class(status_code))
+        index = bisect.bisect_left(BUCKETS, duration)
+        with self._lock:
+            self._check_process()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += duration
+            self._add('junior_db_queries_total', (('view', view),), queries)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._check_process()
+            self._add(name, tuple(sorted(labels.items())), amount)
+
+    def _add(self, name, labels, amount):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'histograms': [[list(key), counts[:], total]
+                               for key, (counts, total) in self._histograms.items()],
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'gauges': process_gauges(),
+            }
+
+    def flush(self):
+        """Write this process' numbers to its file."""
+        with self._lock:
+            self._check_process()
+            filename = self._filename
+        directory = self.directory
+        os.makedirs(directory, exist_ok=True)
+        write(os.path.join(directory, filename), self.snapshot())
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+
+registry = Registry()
+
+
+def count_cache(cache_name, hit):
+    registry.inc('junior_cache_requests_total', {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+def process_gauges():
+    """Gauges of the calling process, as ``[name, labels, value]``."""
+    from authentication.hashing import hashing_pool
+
+    return [['junior_background_queue_depth', [['queue', 'password_hashing']],
+             hashing_pool.stats()['pending']]]
+
+
+def database_gauges():
+    """Gauges counted in the database, the same whichever process asks."""
+    from authentication.models import OutgoingEmail
+    from exports.models import ExportJob
+
+    return [
+        ['junior_background_queue_depth', [['queue', 'export_jobs']],
+         ExportJob.objects.filter(status=ExportJob.Status.PENDING).count()],
+        ['junior_background_queue_depth', [['queue', 'email_outbox']],
+         OutgoingEmail.objects.filter(status__in=[OutgoingEmail.Status.PENDING,
+                                                  OutgoingEmail.Status.SENDING]).count()],
+    ]
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Removed or not fully written yet
+        return None
+
+
+def write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, path)
+
+
+def add_up(data, histograms, counters):
+    for key, counts, total in data['histograms']:
+        merged = histograms.setdefault(tuple(key), [[0] * len(counts), 0.0])
+        merged[0] = [a + b for a, b in zip(merged[0], counts)]
+        merged[1] += total
+    for name, labels, value in data['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+
+
+def archive_exited(directory):
+    """
+    Fold the files of processes that have exited into ``ARCHIVE`` and remove
+    them. Scrapes in other workers wait on a lock file meanwhile, so no file
+    is archived twice.
+    """
+    with open(os.path.join(directory, 'archive.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = []
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            data = read(path)
+            if data is not None and data['pid'] is not None and not is_alive(data['pid']):
+                exited.append((path, data))
+        if not exited:
+            return
+        archive_path = os.path.join(directory, ARCHIVE)
+        histograms, counters = {}, {}
+        for data in [read(archive_path)] + [data for path, data in exited]:
+            if data is not None:
+                add_up(data, histograms, counters)
+        write(archive_path, {
+            'pid': None,
+            'histograms': [[list(key), counts, total] for key, (counts, total) in histograms.items()],
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'gauges': [],
+        })
+        for path, data in exited:
+            os.remove(path)
+
+
+def collect(directory):
+    """Add up the files of every process that has written to ``directory``."""
+    archive_exited(directory)
+    histograms, counters, gauges = {}, {}, {}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        data = read(path)
+        if data is None:
+            continue
+        add_up(data, histograms, counters)
+        if data['pid'] is not None and is_alive(data['pid']):
+            for name, labels, value in data['gauges']:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + value
+    return histograms, counters, gauges
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+    return '{' + ','.join('{}="{}"'.format(name, escape(value)) for name, value in labels) + '}'
+
+
+def render(histograms, counters, gauges):
+    """The Prometheus text exposition format of collected metrics."""
+    lines = [
+        '# HELP junior_request_duration_seconds Time to respond, by view and status class.',
+        '# TYPE junior_request_duration_seconds histogram',
+    ]
+    for (view, status), (counts, total) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else '{:.6g}'.format(bound)
+            lines.append('junior_request_duration_seconds_bucket{} {}'.format(
+                format_labels((('view', view), ('status', status), ('le', le))), cumulative))
+        labels = format_labels((('view', view), ('status', status)))
+        lines.append('junior_request_duration_seconds_sum{} {}'.format(labels, total))
+        lines.append('junior_request_duration_seconds_count{} {}'.format(labels, cumulative))
+
+    for kind, help_texts, values in (
+            ('counter', COUNTERS, counters), ('gauge', GAUGES, gauges)):
+        for name, help_text in help_texts.items():
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append('{}{} {}'.format(name, format_labels(labels), value))
+    return '\n'.join(lines) + '\n'
+
+
+COUNTERS = {
+    'junior_db_queries_total': 'SQL queries run, by view.',
+    'junior_cache_requests_total': 'Cache lookups, by cache and hit or miss.',
+}
+
+GAUGES = {
+    'junior_background_queue_depth': 'Work waiting in a background queue.',
+}
+
+
+def exposition():
+    """Everything /metrics shows, this process' latest numbers included."""
+    registry.flush()
+    histograms, counters, gauges = collect(registry.directory)
+    for name, labels, value in database_gauges():
+        gauges[(name, tuple(map(tuple, labels)))] = value
+    return render(histograms, counters, gauges)
@@ -0,0 +1,176 @@
+"""
+Middleware that runs natively under both WSGI and ASGI.
+
+WhiteNoiseMiddleware is sync-only, so under ASGI Django would hop every
+request onto a thread for it and back. ``AsyncWhiteNoiseMiddleware`` keeps
+requests on the event loop: lookups in the static file table are plain dict
+reads, and only serving a file, or finding one with autorefresh on, touches
+the filesystem on a thread.
+
+``ReplicaRoutingMiddleware`` sets up the per-request state junior.db_router
+routes reads by, pins clients that write to the primary, and runs a sync view
+again on the primary when a replica fails during its reads.
+
+``ServerTimingMiddleware`` times requests, see junior.timing: all of them
+for the junior.metrics histograms when METRICS_ENABLED, and a sample with a
+Server-Timing header and a log line. It goes first in MIDDLEWARE so that its
+total covers the other middleware and its template response hook runs right
+before rendering.
+"""
+import asyncio
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework.permissions import SAFE_METHODS
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from junior import db_router, metrics, timing
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Lets Django's handler see that calling us returns a coroutine,
+            # as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = db_router.start_request()
+        try:
+            return self.pin(request, self.get_response(request))
+        finally:
+            db_router.end_request(token)
+
+    async def __acall__(self, request):
+        token = db_router.start_request()
+        try:
+            return self.pin(request, await self.get_response(request))
+        finally:
+            db_router.end_request(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS:
+            return None
+        # DRF's as_view() leaves the view class and, for viewsets, the
+        # method to action mapping on the view function
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(request.method.lower())
+        if action in getattr(getattr(view_func, 'cls', None), 'replica_actions', ()):
+            routing = db_router.current()
+            routing.replicas_allowed = True
+            # Whether the client is pinned is only known once DRF has set request.user
+            routing.request = request
+            routing.view = (view_func, view_args, view_kwargs)
+        return None
+
+    def process_exception(self, request, exception):
+        routing = db_router.current()
+        if (not isinstance(exception, DatabaseError) or routing is None or routing.view is None
+                or asyncio.iscoroutinefunction(routing.view[0])):
+            return None
+        if not db_router.fall_back_to_primary(routing, exception):
+            return None
+        # Nothing was written, so the request can simply be served again
+        view_func, view_args, view_kwargs = routing.view
+        return view_func(request, *view_args, **view_kwargs)
+
+    def pin(self, request, response):
+        if db_router.current().wrote:
+            db_router.pin(request, response)
+        return response
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        timing.install()
+
+    def sampled(self):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sampled = self.sampled()
+        if not (sampled or settings.METRICS_ENABLED):
+            return self.get_response(request)
+        token = timing.start()
+        try:
+            return self.report(request, self.get_response(request), sampled)
+        finally:
+            timing.end(token)
+
+    async def __acall__(self, request):
+        sampled = self.sampled()
+        if not (sampled or settings.METRICS_ENABLED):
+            return await self.get_response(request)
+        token = timing.start()
+        try:
+            return self.report(request, await self.get_response(request), sampled)
+        finally:
+            timing.end(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current = timing.current()
+        if current is not None:
+            current.view = timing.view_name(view_func, request.method)
+        return None
+
+    def process_template_response(self, request, response):
+        current = timing.current()
+        if current is not None:
+            current.start_render()
+            response.add_post_render_callback(current.end_render)
+        return response
+
+    def report(self, request, response, sampled):
+        current = timing.current()
+        total = current.total_time()
+        if settings.METRICS_ENABLED:
+            metrics.registry.observe_request(
+                current.view or 'unresolved', response.status_code, total, current.queries)
+        if sampled:
+            response['Server-Timing'] = current.header(total)
+            timing.log(request, response, current, total)
+        return response
@@ -11,10 +11,12 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 import datetime
 from datetime import timedelta
 from dotenv import load_dotenv
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -52,6 +54,7 @@ INSTALLED_APPS = [
     'authentication',
     'django_filters',
     'joblisting',
+    'exports',
 ]
 
 SWAGGER_SETTINGS = {
@@ -65,6 +68,7 @@ SWAGGER_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'junior.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -73,7 +77,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'junior.middleware.AsyncWhiteNoiseMiddleware',
+    'junior.middleware.ReplicaRoutingMiddleware',
 
 ]
 
@@ -150,12 +155,76 @@ DATABASES = {
     "default": dj_database_url.config(default=DATABASE_URL, conn_max_age=1800),
 }
 
+# Read replicas (junior/db_router.py): each of the comma-separated
+# DATABASE_REPLICA_URLS becomes an alias, replica_1, replica_2 and so on. The
+# job browsing endpoints read from them, except for REPLICA_PIN_SECONDS after
+# a client writes, and a replica that cannot be reached is skipped for
+# REPLICA_RETRY_INTERVAL seconds. Tests use the test database for them
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES['replica_%d' % index] = dict(dj_database_url.parse(url, conn_max_age=1800),
+                                           TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append('replica_%d' % index)
+DATABASE_ROUTERS = ['junior.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+REPLICA_RETRY_INTERVAL = int(os.getenv('REPLICA_RETRY_INTERVAL', 30))
+
+# Postgres connections are pooled per process (junior/db/backends/postgresql)
+# rather than kept one per thread: at most DB_POOL_MAX_SIZE are open, a request
+# waits up to DB_POOL_TIMEOUT seconds for a free one, idle ones above
+# DB_POOL_MIN_SIZE are closed after DB_POOL_MAX_IDLE seconds and, with
+# DB_POOL_PRE_PING, each is checked before use. Set DB_PGBOUNCER when
+# DATABASE_URL points at a PgBouncer in transaction pooling mode
+DB_POOL = os.getenv('DB_POOL', 'True') == 'True'
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_POOL_MAX_IDLE = int(os.getenv('DB_POOL_MAX_IDLE', 300))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True') == 'True'
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'False') == 'True'
+
+for database in DATABASES.values():
+    if database.get('ENGINE') != 'django.db.backends.postgresql':
+        continue
+    if DB_POOL:
+        database.update({
+            'ENGINE': 'junior.db.backends.postgresql',
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': DB_POOL_TIMEOUT,
+                'max_idle': DB_POOL_MAX_IDLE,
+                'pre_ping': DB_POOL_PRE_PING,
+            },
+        })
+    if DB_PGBOUNCER:
+        # Server-side cursors outlive the transaction PgBouncer lends a server for
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Files in a temporary directory by default, which every worker process on
+# the host shares. When the app runs on more than one host, point all of them
+# at one server, e.g.
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+FILE_CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', FILE_CACHE_BACKEND),
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'junior-cache')),
+    }
+}
+if CACHES['default']['BACKEND'] == FILE_CACHE_BACKEND:
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))}
+# Whether every process sees the same cache. Caches that other processes have
+# to be told to drop, like the JWT user fields, are only used when it is
+CACHE_IS_SHARED = CACHES['default']['BACKEND'].rsplit('.', 1)[-1] not in ('LocMemCache', 'DummyCache')
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'NON_FIELD_ERRORS_KEY': 'error',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
 
     ),
@@ -172,6 +241,7 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.TokenRefreshSerializer',
 
 }
 CSRF_COOKIE_SECURE = False
@@ -181,7 +251,9 @@ SESSION_COOKIE_SAMESITE = "Lax"
 CSRF_COOKIE_HTTPONLY = True
 SESSION_COOKIE_HTTPONLY = True
 
-CORS_EXPOSE_HEADERS = ["Content-Type", "X-CSRFToken"]
+CORS_EXPOSE_HEADERS = ["Content-Type", "X-CSRFToken", "X-Primary-Pin"]
+# X-Primary-Pin is echoed back by clients pinned to the primary (junior/db_router.py)
+CORS_ALLOW_HEADERS = list(default_headers) + ["x-primary-pin"]
 CORS_ALLOW_CREDENTIALS = True
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -243,5 +315,117 @@ EMAIL_PORT = 587
 EMAIL_HOST = 'premium307.web-hosting.com'
 #EMAIL_PORT = 587
 
+# Email outbox: Util.send_email stores messages and a worker sends them in
+# batches over one SMTP connection, retrying with exponential backoff.
+# With EMAIL_OUTBOX_IN_PROCESS off, run `python manage.py send_queued_email --watch`
+EMAIL_OUTBOX_IN_PROCESS = os.getenv('EMAIL_OUTBOX_IN_PROCESS', 'True') == 'True'
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_RETRY_DELAY', 30))
+EMAIL_OUTBOX_POLL_INTERVAL = int(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 30))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# Rows fetched per round trip by the streaming CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# User PDF reports with more rows than this are never rendered in the request
+USER_REPORT_SYNC_MAX_ROWS = int(os.getenv('USER_REPORT_SYNC_MAX_ROWS', 5000))
+
+# Export jobs are run by the worker process (`python manage.py run_export_jobs
+# --watch`, see Procfile). EXPORT_JOBS_IN_PROCESS runs them on a bounded thread
+# pool in the web process instead, for development without a worker
+EXPORT_JOBS_IN_PROCESS = os.getenv('EXPORT_JOBS_IN_PROCESS', 'False') == 'True'
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', 2))
+# A job whose worker has not reported progress for this many seconds is taken
+# to have lost its worker and is claimed again
+EXPORT_JOB_LEASE_SECONDS = int(os.getenv('EXPORT_JOB_LEASE_SECONDS', 3600))
+# Finished export files are kept in the database, split into rows of this size,
+# since the worker and the web dynos do not share a filesystem
+EXPORT_FILE_CHUNK_BYTES = int(os.getenv('EXPORT_FILE_CHUNK_BYTES', 1024 * 1024))
+
+# A referrer can bring in at most REFERRAL_QUOTA_LIMIT sign-ups per rolling
+# window of REFERRAL_QUOTA_WINDOW_DAYS
+REFERRAL_QUOTA_LIMIT = int(os.getenv('REFERRAL_QUOTA_LIMIT', 5))
+REFERRAL_QUOTA_WINDOW_DAYS = int(os.getenv('REFERRAL_QUOTA_WINDOW_DAYS', 30))
+
+# Password hashing pool of the async auth views: worker threads, and the most
+# hashes allowed to wait or run before new ones are refused with a 503
+HASHING_WORKERS = int(os.getenv('HASHING_WORKERS', os.cpu_count() or 1))
+HASHING_MAX_QUEUE = int(os.getenv('HASHING_MAX_QUEUE', 64))
+
+# CachedJWTAuthentication: decoded access tokens kept in process (LRU, at most
+# JWT_TOKEN_CACHE_TTL seconds) and users' auth fields in the cache, the latter
+# only when CACHE_IS_SHARED
+JWT_TOKEN_CACHE_SIZE = int(os.getenv('JWT_TOKEN_CACHE_SIZE', 4096))
+JWT_TOKEN_CACHE_TTL = int(os.getenv('JWT_TOKEN_CACHE_TTL', 300))
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', 300))
+
+# Longest a process may go without re-reading the token blacklist when the
+# cache is not shared between processes
+TOKEN_BLACKLIST_SYNC_INTERVAL = int(os.getenv('TOKEN_BLACKLIST_SYNC_INTERVAL', 5))
+
+# Session bootstrap payloads (joblisting/bootstrap.py) are cached per user for
+# at most this many seconds, and only when CACHE_IS_SHARED; writes to the
+# user's own rows drop them sooner
+BOOTSTRAP_CACHE_TTL = int(os.getenv('BOOTSTRAP_CACHE_TTL', 300))
+
+# Google sign-in certs (social_auth/google.py): where they come from, how long
+# to keep them when the response has no max-age, how early to refresh them in
+# the background, and how long to fall back on stale ones while Google is down
+GOOGLE_CERTS_URL = os.getenv('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+GOOGLE_CERTS_TIMEOUT = float(os.getenv('GOOGLE_CERTS_TIMEOUT', 5))
+GOOGLE_CERTS_DEFAULT_TTL = int(os.getenv('GOOGLE_CERTS_DEFAULT_TTL', 300))
+GOOGLE_CERTS_REFRESH_AHEAD = int(os.getenv('GOOGLE_CERTS_REFRESH_AHEAD', 300))
+GOOGLE_CERTS_RETRY_INTERVAL = int(os.getenv('GOOGLE_CERTS_RETRY_INTERVAL', 30))
+GOOGLE_CERTS_MAX_STALE = int(os.getenv('GOOGLE_CERTS_MAX_STALE', 86400))
+
+# Social sign-in provider calls (social_auth/providers.py): where they go, the
+# timeout per provider in seconds, kept-alive connections per provider, threads
+# the async views run them on, and the consecutive failures that open a
+# provider's circuit for SOCIAL_PROVIDER_RESET_TIMEOUT seconds
+FACEBOOK_GRAPH_URL = os.getenv('FACEBOOK_GRAPH_URL', 'https://graph.facebook.com')
+TWITTER_API_URL = os.getenv('TWITTER_API_URL', 'https://api.twitter.com')
+FACEBOOK_TIMEOUT = float(os.getenv('FACEBOOK_TIMEOUT', 5))
+TWITTER_TIMEOUT = float(os.getenv('TWITTER_TIMEOUT', 5))
+SOCIAL_PROVIDER_POOL_SIZE = int(os.getenv('SOCIAL_PROVIDER_POOL_SIZE', 10))
+SOCIAL_PROVIDER_WORKERS = int(os.getenv('SOCIAL_PROVIDER_WORKERS', 10))
+SOCIAL_PROVIDER_FAILURE_THRESHOLD = int(os.getenv('SOCIAL_PROVIDER_FAILURE_THRESHOLD', 5))
+SOCIAL_PROVIDER_RESET_TIMEOUT = int(os.getenv('SOCIAL_PROVIDER_RESET_TIMEOUT', 30))
+
+# Share of requests timed by junior.timing: a Server-Timing header on the
+# response and a JSON line on the junior.timing logger for each
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv('SERVER_TIMING_SAMPLE_RATE', 0.01))
+
+# Latency histograms and counters of junior.metrics, served at /metrics: each
+# worker process writes its own to METRICS_DIR every METRICS_FLUSH_INTERVAL
+# seconds. Scrapes must send METRICS_TOKEN as a Bearer token; while it is
+# unset /metrics is only served with DEBUG on
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'junior-metrics'))
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'timing': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'junior.timing': {
+            'handlers': ['timing'],
+            'level': os.getenv('TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
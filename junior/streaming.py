@@ -0,0 +1,57 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """Pseudo-buffer that hands back whatever csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def buffered(lines, size=64 * 1024):
+    """Group small string chunks into ~``size`` character blocks."""
+    block = []
+    length = 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(block)
+            block = []
+            length = 0
+    if block:
+        yield ''.join(block)
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(header, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+def streaming_export(header, rows, export_format, filename):
+    """
+    Stream ``rows`` (an iterable of tuples matching ``header``) as a file
+    download in ``export_format`` (one of EXPORT_FORMATS).
+    """
+    lines = csv_lines(header, rows) if export_format == 'csv' else ndjson_lines(header, rows)
+    response = StreamingHttpResponse(
+        buffered(lines), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(
+        filename, export_format)
+    return response
@@ -0,0 +1,168 @@
+"""
+Where the time of a request goes.
+
+``ServerTimingMiddleware`` (junior.middleware) starts a ``Timing`` for a
+request, which records:
+
+* the SQL queries on every database alias, their total time and the slowest
+  one, through an execute wrapper installed on each new connection;
+* the time spent building serializer output (``serializer.data``), queries
+  it triggers included;
+* the time spent rendering the response.
+
+For a sample of ``SERVER_TIMING_SAMPLE_RATE`` of the requests they are
+sent back in a ``Server-Timing`` header, which browsers show in
+their network panel, and logged as one JSON object per request on the
+``junior.timing`` logger, tagged with the view and action, e.g.
+``JobListingViewSet.list``. Requests that are not timed at all, outside
+the sample with junior.metrics off, only pay for a context variable lookup
+per query.
+
+The ``Timing`` lives in a context variable, so it follows the request onto
+the threads the async views run sync code on.
+"""
+import contextvars
+import json
+import logging
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Longest SQL kept for the slowest query in the log
+SQL_LOG_LENGTH = 500
+
+_timing = contextvars.ContextVar('timing', default=None)
+
+
+class Timing:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_sql = sql
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def end_render(self, response):
+        if self.render_started is not None:
+            self.render_time = time.perf_counter() - self.render_started
+
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def header(self, total):
+        metrics = [
+            ('total', total, None),
+            ('db', self.db_time, '{} queries'.format(self.queries)),
+            ('db-slowest', self.slowest_time, None),
+            ('serialize', self.serialize_time, None),
+            ('render', self.render_time, None),
+        ]
+        return ', '.join(
+            '{};dur={:.2f}'.format(name, duration * 1000) + (';desc="{}"'.format(desc) if desc else '')
+            for name, duration, desc in metrics)
+
+    def log_fields(self, request, response, total):
+        return {
+            'view': self.view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'slowest_query_ms': round(self.slowest_time * 1000, 2),
+            'slowest_query': self.slowest_sql[:SQL_LOG_LENGTH] if self.slowest_sql else None,
+            'serialize_ms': round(self.serialize_time * 1000, 2),
+            'render_ms': round(self.render_time * 1000, 2),
+        }
+
+
+def start():
+    """Time the current request; returns the token ``end`` takes."""
+    return _timing.set(Timing())
+
+
+def end(token):
+    _timing.reset(token)
+
+
+def current():
+    return _timing.get()
+
+
+def view_name(view_func, method):
+    """``ViewSet.action`` for DRF viewsets, ``View.method`` for other views."""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return '{}.{}'.format(view_func.__module__, view_func.__name__)
+    actions = getattr(view_func, 'actions', None) or {}
+    return '{}.{}'.format(view_class.__name__, actions.get(method.lower(), method.lower()))
+
+
+def log(request, response, timing, total):
+    logger.info(json.dumps(timing.log_fields(request, response, total)))
+
+
+def time_query(execute, sql, params, many, context):
+    timing = _timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.record_query(sql, time.perf_counter() - started)
+
+
+def add_query_timer(sender, connection, **kwargs):
+    # Pooled connections are handed to the same wrapper again and again.
+    # First in line, as execute_wrapper() blocks pop the last one on exit
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+_serializer_data = serializers.BaseSerializer.data
+
+
+def _timed_data(self):
+    timing = _timing.get()
+    if timing is None:
+        return _serializer_data.fget(self)
+    # Nested serializers are counted as part of the outermost one
+    timing.serialize_depth += 1
+    started = time.perf_counter()
+    try:
+        return _serializer_data.fget(self)
+    finally:
+        timing.serialize_depth -= 1
+        if not timing.serialize_depth:
+            timing.serialize_time += time.perf_counter() - started
+
+
+def install():
+    """Hook the timers into database connections and DRF serializers."""
+    connection_created.connect(add_query_timer, dispatch_uid='junior.timing')
+    # Connections this thread already has
+    for connection in connections.all():
+        add_query_timer(None, connection)
+    serializers.BaseSerializer.data = property(_timed_data)
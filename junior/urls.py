@@ -21,6 +21,7 @@ from drf_yasg import openapi
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenVerifyView, TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
+from .views import prometheus_metrics
 
 
 schema_view = get_schema_view(
@@ -44,6 +45,8 @@ urlpatterns = [
     path('api/token/verify/', TokenVerifyView.as_view()),
     path('auth/', include('authentication.urls')),
     path('job/', include('joblisting.urls')),
+    path('exports/', include('exports.urls')),
+    path('metrics', prometheus_metrics, name='metrics'),
     #path('social_auth/', include(('social_auth.urls',
     #                              'social_auth'), namespace="social_auth")),
     #path('investor/', include('investor.urls')),
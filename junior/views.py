@@ -0,0 +1,24 @@
+"""Views of the project itself rather than of one of its apps."""
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from junior import metrics
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Scrape target for Prometheus, see junior.metrics. Scrapes must send
+    METRICS_TOKEN as a Bearer token; without one set, /metrics is only served
+    with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), 'Bearer ' + token):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,69 @@
+"""
+Async versions of the social sign-in endpoints for ASGI deployments.
+
+The provider calls are awaited on ``providers.run_blocking`` with the
+providers' timeouts and circuit breakers, so a slow provider ties up a
+pool thread rather than a server worker, and a failing one is answered
+with a 503 straight away. Signing the user in then goes through the same
+serializer code as the views in views.py.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+from authentication.async_views import async_api_view, request_data
+from .facebook import Facebook
+from .google import Google
+from .serializers import FacebookSocialAuthSerializer, GoogleSocialAuthSerializer, TwitterAuthSerializer
+from .twitterhelper import TwitterAuthTokenVerification
+
+
+def required_fields(serializer, data):
+    """Validate ``data`` against the serializer's fields without their validate_ hooks."""
+    errors, values = {}, {}
+    for name, field in serializer.fields.items():
+        try:
+            values[name] = field.run_validation(data.get(name, empty))
+        except ValidationError as exc:
+            errors[name] = exc.detail
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+async def login(serializer, user_data, field):
+    """``serializer.login`` with its errors keyed the way the DRF views key them."""
+    try:
+        return await sync_to_async(serializer.login)(user_data)
+    except ValidationError as exc:
+        raise ValidationError({field: exc.detail})
+
+
+@async_api_view('POST')
+async def google(request):
+    """GoogleSocialAuthView.post with the token verified off the event loop."""
+    serializer = GoogleSocialAuthSerializer()
+    attrs = required_fields(serializer, request_data(request))
+    user_data = await Google.avalidate(attrs['auth_token'])
+    return JsonResponse(await login(serializer, user_data, 'auth_token'))
+
+
+@async_api_view('POST')
+async def facebook(request):
+    """FacebookSocialAuthView.post with the Graph API call awaited."""
+    serializer = FacebookSocialAuthSerializer()
+    attrs = required_fields(serializer, request_data(request))
+    user_data = await Facebook.avalidate(attrs['auth_token'])
+    return JsonResponse(await login(serializer, user_data, 'auth_token'))
+
+
+@async_api_view('POST')
+async def twitter(request):
+    """TwitterSocialAuthView.post with the credentials check awaited."""
+    serializer = TwitterAuthSerializer()
+    attrs = required_fields(serializer, request_data(request))
+    user_info = await TwitterAuthTokenVerification.avalidate_twitter_auth_tokens(
+        attrs['access_token_key'], attrs['access_token_secret'])
+    return JsonResponse(await login(serializer, user_info, api_settings.NON_FIELD_ERRORS_KEY))
@@ -1,4 +1,19 @@
-import facebook
+import requests
+from django.conf import settings
+
+from .providers import ProviderUnavailable, facebook_client
+
+
+def profile_request(auth_token):
+    """URL and arguments of the Graph API call returning the user's profile."""
+    return settings.FACEBOOK_GRAPH_URL + '/me', {
+        'params': {'fields': 'name,email', 'access_token': auth_token}}
+
+
+def read_profile(response):
+    if response.status_code != 200:
+        return "The token is invalid or expired."
+    return response.json()
 
 
 class Facebook:
@@ -11,9 +26,17 @@ class Facebook:
         """
         validate method Queries the facebook GraphAPI to fetch the user info
         """
+        url, kwargs = profile_request(auth_token)
+        try:
+            return read_profile(facebook_client.get(url, **kwargs))
+        except requests.RequestException:
+            raise ProviderUnavailable()
+
+    @staticmethod
+    async def avalidate(auth_token):
+        """validate for the async views"""
+        url, kwargs = profile_request(auth_token)
         try:
-            graph = facebook.GraphAPI(access_token=auth_token)
-            profile = graph.request('/me?fields=name,email')
-            return profile
-        except:
-            return "The token is invalid or expired."
+            return read_profile(await facebook_client.aget(url, **kwargs))
+        except requests.RequestException:
+            raise ProviderUnavailable()
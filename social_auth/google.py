@@ -1,5 +1,142 @@
-from google.auth.transport import requests
-from google.oauth2 import id_token
+"""
+Google ID token verification against a local copy of Google's signing certs.
+
+``google_certs`` keeps the certs for as long as the endpoint's
+``Cache-Control: max-age`` (less ``Age``) allows, and refreshes them on a
+background thread ``GOOGLE_CERTS_REFRESH_AHEAD`` seconds before they expire,
+so sign-ins only wait on the network for the very first fetch. If Google
+cannot be reached, the last certs keep being served for up to
+``GOOGLE_CERTS_MAX_STALE`` seconds, with a fetch attempted at most every
+``GOOGLE_CERTS_RETRY_INTERVAL`` seconds. Fetches go through
+``providers.google_client`` and its circuit breaker.
+"""
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from google.auth import exceptions, jwt
+
+from .providers import ProviderUnavailable, google_client, run_blocking
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def cache_ttl(headers, default):
+    """Seconds a response may be reused for according to its headers."""
+    cache_control = headers.get('Cache-Control', '')
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    if match is None:
+        return default
+    try:
+        age = int(headers.get('Age', 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class CertCache:
+
+    def __init__(self, url=None, client=None):
+        self._url = url
+        self._client = client or google_client
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self.reset()
+
+    @property
+    def url(self):
+        return self._url or settings.GOOGLE_CERTS_URL
+
+    def reset(self):
+        with self._lock:
+            self._certs = None
+            self._expires_at = 0.0
+            self._fetched_at = 0.0
+            self._retry_at = 0.0
+            self._refreshing = False
+
+    def fetch(self):
+        """Download the certs and remember them for as long as allowed."""
+        try:
+            response = self._client.get(self.url, timeout=settings.GOOGLE_CERTS_TIMEOUT)
+            response.raise_for_status()
+            certs = response.json()
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self._retry_at = time.monotonic() + settings.GOOGLE_CERTS_RETRY_INTERVAL
+            raise
+        now = time.monotonic()
+        with self._lock:
+            self._certs = certs
+            self._fetched_at = now
+            self._expires_at = now + cache_ttl(response.headers, settings.GOOGLE_CERTS_DEFAULT_TTL)
+        return certs
+
+    def get(self):
+        """Return the current certs, fetching them only if they have expired."""
+        now = time.monotonic()
+        with self._lock:
+            certs, remaining = self._certs, self._expires_at - now
+        if certs is None or remaining <= 0:
+            return self._fetch_expired(now)
+        if remaining < settings.GOOGLE_CERTS_REFRESH_AHEAD:
+            self._refresh_in_background()
+        return certs
+
+    def _fetch_expired(self, now):
+        with self._fetch_lock:
+            with self._lock:
+                certs = self._certs
+                if certs is not None and (self._expires_at > now or self._retry_at > now):
+                    # Fetched by another thread meanwhile, or failing and not due a retry
+                    return certs
+            try:
+                return self.fetch()
+            except (requests.RequestException, ValueError):
+                if certs is None or now - self._fetched_at > settings.GOOGLE_CERTS_MAX_STALE:
+                    raise
+                logger.warning("Could not refresh Google certs, using stale ones", exc_info=True)
+                return certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or self._retry_at > time.monotonic():
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='google-certs-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._fetch_lock:
+                self.fetch()
+        except (requests.RequestException, ValueError):
+            logger.warning("Could not refresh Google certs ahead of expiry", exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+google_certs = CertCache()
+
+
+def verify_id_token(auth_token, certs=None):
+    """
+    Check the signature, expiry and issuer of a Google ID token locally and
+    return its claims. Raises ValueError or GoogleAuthError if it is invalid.
+    """
+    idinfo = jwt.decode(auth_token, certs=(certs or google_certs).get())
+    if idinfo['iss'] not in GOOGLE_ISSUERS:
+        raise exceptions.GoogleAuthError('Wrong issuer: {}'.format(idinfo['iss']))
+    return idinfo
 
 
 class Google:
@@ -8,14 +145,17 @@ class Google:
     @staticmethod
     def validate(auth_token):
         """
-        validate method Queries the Google oAUTH2 api to fetch the user info
+        validate method checks the ID token against Google's cached certs
+        and returns the user info it carries
         """
         try:
-            idinfo = id_token.verify_oauth2_token(
-                auth_token, requests.Request())
-
-            if 'accounts.google.com' in idinfo['iss']:
-                return idinfo
-
-        except:
+            return verify_id_token(auth_token)
+        except requests.RequestException:
+            raise ProviderUnavailable()
+        except (exceptions.GoogleAuthError, ValueError):
             return "The token is either invalid or has expired"
+
+    @staticmethod
+    async def avalidate(auth_token):
+        """validate for the async views"""
+        return await run_blocking(Google.validate, auth_token)
@@ -0,0 +1,199 @@
+"""
+HTTP clients for the social sign-in providers.
+
+Each provider gets a ``ProviderClient``: a requests Session whose pool keeps
+connections to the provider alive between sign-ins, a timeout of its own,
+and a circuit breaker. After ``SOCIAL_PROVIDER_FAILURE_THRESHOLD``
+consecutive timeouts, connection errors or 5xx answers the circuit opens and
+calls fail at once with CircuitOpen for ``SOCIAL_PROVIDER_RESET_TIMEOUT``
+seconds. Then a single trial call is let through, and its outcome closes or
+re-opens the circuit. 4xx answers mean the user's token was rejected and do
+not count as failures.
+
+The calls block; the async views await them through ``run_blocking``,
+which runs them on a small shared thread pool the way
+``authentication.hashing`` runs password hashes. ``stats()`` reports calls,
+failures, fast failures and latency per provider.
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class CircuitOpen(requests.ConnectionError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class ProviderUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The sign-in provider is not responding, try again shortly.'
+    default_code = 'provider_unavailable'
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def failure_threshold(self):
+        return self._failure_threshold or settings.SOCIAL_PROVIDER_FAILURE_THRESHOLD
+
+    @property
+    def reset_timeout(self):
+        if self._reset_timeout is not None:
+            return self._reset_timeout
+        return settings.SOCIAL_PROVIDER_RESET_TIMEOUT
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half-open'
+
+    def allow(self):
+        """Whether a call may go out now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                # A failed trial call re-opens the circuit for another period
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def reset(self):
+        self.record_success()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.SOCIAL_PROVIDER_WORKERS,
+                                           thread_name_prefix='social-provider')
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Await ``func(*args, **kwargs)`` run on the provider thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+class ProviderClient:
+
+    def __init__(self, name, timeout_setting, breaker=None):
+        self.name = name
+        self.timeout_setting = timeout_setting
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.SOCIAL_PROVIDER_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def timeout(self):
+        return getattr(settings, self.timeout_setting)
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = 0
+            self._failures = 0
+            self._rejected = 0
+            self._latency_total = 0.0
+            self._latency_max = 0.0
+
+    def _record(self, started, failed):
+        latency = time.monotonic() - started
+        with self._lock:
+            self._calls += 1
+            self._failures += failed
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def request(self, method, url, **kwargs):
+        if not self.breaker.allow():
+            with self._lock:
+                self._rejected += 1
+            raise CircuitOpen('Not calling {}, it has been failing'.format(self.name))
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except BaseException:
+            # Not only RequestException: an unrecorded trial call would leave
+            # the circuit half-open, and so shut, for good
+            self._record(started, failed=True)
+            raise
+        self._record(started, failed=response.status_code >= 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    async def aget(self, url, **kwargs):
+        return await run_blocking(self.get, url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'timeout_seconds': self.timeout,
+                'circuit': self.breaker.state,
+                'calls': self._calls,
+                'failures': self._failures,
+                'rejected': self._rejected,
+                'latency_seconds_total': self._latency_total,
+                'latency_seconds_max': self._latency_max,
+                'latency_seconds_mean': self._latency_total / self._calls if self._calls else 0.0,
+            }
+
+
+google_client = ProviderClient('google', 'GOOGLE_CERTS_TIMEOUT')
+facebook_client = ProviderClient('facebook', 'FACEBOOK_TIMEOUT')
+twitter_client = ProviderClient('twitter', 'TWITTER_TIMEOUT')
+
+PROVIDER_CLIENTS = (google_client, facebook_client, twitter_client)
+
+
+def stats():
+    return {client.name: client.stats() for client in PROVIDER_CLIENTS}
@@ -1,53 +1,66 @@
-
-from django.contrib.auth import authenticate
+from authentication.ids import is_collision
 from authentication.models import User
-import os
+import itertools
 import random
+from django.db import IntegrityError, transaction
 from rest_framework.exceptions import AuthenticationFailed
 
+# Attempts at creating a social user before a username race is given up on
+REGISTRATION_ATTEMPTS = 3
+
 
 def generate_username(name):
+    """
+    The name without spaces, or with a number appended if that is taken.
 
+    Every taken username starting with the name is read in one query and a
+    free one is picked in memory: a random number below 1000 as before, or
+    the first free one above once those run out.
+    """
     username = "".join(name.split(' ')).lower()
-    if not User.objects.filter(username=username).exists():
+    taken = set(User.objects.filter(username__startswith=username)
+                .values_list('username', flat=True))
+    if username not in taken:
         return username
-    else:
-        random_username = username + str(random.randint(0, 1000))
-        return generate_username(random_username)
+    suffixes = itertools.chain(random.sample(range(1000), 1000), itertools.count(1000))
+    return next(candidate for candidate in (username + str(suffix) for suffix in suffixes)
+                if candidate not in taken)
+
+
+def social_login_response(user):
+    """
+    Issue tokens to a user the provider has already vouched for. Social
+    users have no password of ours, so nothing is hashed.
+    """
+    if not user.is_active:
+        raise AuthenticationFailed('Invalid credentials, try again')
+    return {
+        'username': user.username,
+        'email': user.email,
+        'tokens': user.tokens()}
+
+
+def create_social_user(provider, email, name):
+    for attempt in range(REGISTRATION_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # No password: the account can only be signed in to through the provider
+                return User.objects.create_user(
+                    username=generate_username(name), email=email,
+                    is_verified=True, auth_provider=provider)
+        except IntegrityError as error:
+            # Someone took the username between the lookup and the insert
+            if attempt == REGISTRATION_ATTEMPTS - 1 or not is_collision(error, 'username'):
+                raise
 
 
 def register_social_user(provider, user_id, email, name):
-    filtered_user_by_email = User.objects.filter(email=email)
-
-    if filtered_user_by_email.exists():
-
-        if provider == filtered_user_by_email[0].auth_provider:
-
-            registered_user = authenticate(
-                email=email, password=os.environ.get('SOCIAL_SECRET'))
-
-            return {
-                'username': registered_user.username,
-                'email': registered_user.email,
-                'tokens': registered_user.tokens()}
-
-        else:
-            raise AuthenticationFailed(
-                detail='Please continue your login using ' + filtered_user_by_email[0].auth_provider)
-
-    else:
-        user = {
-            'username': generate_username(name), 'email': email,
-            'password': os.environ.get('SOCIAL_SECRET')}
-        user = User.objects.create_user(**user)
-        user.is_verified = True
-        user.auth_provider = provider
-        user.save()
-
-        new_user = authenticate(
-            email=email, password=os.environ.get('SOCIAL_SECRET'))
-        return {
-            'email': new_user.email,
-            'username': new_user.username,
-            'tokens': new_user.tokens()
-        }
+    user = User.objects.filter(email=email).first()
+
+    if user is None:
+        return social_login_response(create_social_user(provider, email, name))
+
+    if provider != user.auth_provider:
+        raise AuthenticationFailed(
+            detail='Please continue your login using ' + user.auth_provider)
+    return social_login_response(user)
@@ -10,8 +10,10 @@ class FacebookSocialAuthSerializer(serializers.Serializer):
     auth_token = serializers.CharField()
 
     def validate_auth_token(self, auth_token):
-        user_data = facebook.Facebook.validate(auth_token)
+        return self.login(facebook.Facebook.validate(auth_token))
 
+    def login(self, user_data):
+        """Sign in the owner of the profile the provider returned."""
         try:
             user_id = user_data['id']
             email = user_data['email']
@@ -34,7 +36,10 @@ class GoogleSocialAuthSerializer(serializers.Serializer):
     auth_token = serializers.CharField()
 
     def validate_auth_token(self, auth_token):
-        user_data = google.Google.validate(auth_token)
+        return self.login(google.Google.validate(auth_token))
+
+    def login(self, user_data):
+        """Sign in the owner of the verified ID token claims."""
         try:
             user_data['sub']
         except:
@@ -68,6 +73,10 @@ class TwitterAuthSerializer(serializers.Serializer):
         user_info = twitterhelper.TwitterAuthTokenVerification.validate_twitter_auth_tokens(
             access_token_key, access_token_secret)
 
+        return self.login(user_info)
+
+    def login(self, user_info):
+        """Sign in the owner of the verified credentials."""
         try:
             user_id = user_info['id_str']
             email = user_info['email']
@@ -1,3 +1,360 @@
-from django.test import TestCase
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+import rsa
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from google.auth import crypt, jwt
+from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+
+from authentication.models import User
+from .google import CertCache, Google, cache_ttl, google_certs, verify_id_token
+from . import async_views
+from .facebook import Facebook
+from .providers import CircuitOpen, ProviderClient, ProviderUnavailable, facebook_client, twitter_client
+from .twitterhelper import TwitterAuthTokenVerification
+from .register import generate_username, register_social_user
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that time out on purpose leave broken pipes behind
+        pass
+
+
+class StubServer:
+    """Stand-in for a provider endpoint on a local port, answering ``body`` as JSON."""
+
+    def __init__(self):
+        self.body = {}
+        self.headers = {'Cache-Control': 'public, max-age=3600'}
+        self.status = 200
+        self.delay = 0
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self)
+                time.sleep(server.delay)
+                body = json.dumps(server.body).encode()
+                self.send_response(server.status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in server.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = QuietHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d' % self.httpd.server_port
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_signer(key_id):
+    public, private = rsa.newkeys(1024)
+    return crypt.RSASigner.from_string(private.save_pkcs1(), key_id=key_id), \
+        public.save_pkcs1().decode()
+
+
+class GoogleCertTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signer, cls.public_key = make_signer('key-1')
+        cls.other_signer, _ = make_signer('key-1')
+
+    def setUp(self):
+        self.server = StubServer()
+        self.server.body = {'key-1': self.public_key}
+        self.addCleanup(self.server.close)
+        self.certs = CertCache(self.server.url + '/certs', ProviderClient('google', 'GOOGLE_CERTS_TIMEOUT'))
+
+    def make_token(self, signer=None, **claims):
+        now = int(time.time())
+        payload = {'iss': 'https://accounts.google.com', 'sub': '42', 'aud': 'client',
+                   'email': 'user@example.com', 'name': 'User', 'iat': now, 'exp': now + 3600}
+        payload.update(claims)
+        return jwt.encode(signer or self.signer, payload)
+
+    def test_verifies_token_locally(self):
+        token = self.make_token()
+        for _ in range(3):
+            idinfo = verify_id_token(token, self.certs)
+        self.assertEqual(idinfo['sub'], '42')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_rejects_bad_signature_and_issuer(self):
+        with self.assertRaises(ValueError):
+            verify_id_token(self.make_token(self.other_signer), self.certs)
+        with self.assertRaises(ValueError):
+            verify_id_token(self.make_token(exp=int(time.time()) - 3600), self.certs)
+        with self.assertRaisesMessage(Exception, 'Wrong issuer'):
+            verify_id_token(self.make_token(iss='https://evil.example.com'), self.certs)
+
+    def test_honors_cache_control(self):
+        self.server.headers = {'Cache-Control': 'no-cache'}
+        token = self.make_token()
+        verify_id_token(token, self.certs)
+        verify_id_token(token, self.certs)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_cache_ttl(self):
+        self.assertEqual(cache_ttl({'Cache-Control': 'public, max-age=100'}, 5), 100)
+        self.assertEqual(cache_ttl({'Cache-Control': 'public, max-age=100', 'Age': '30'}, 5), 70)
+        self.assertEqual(cache_ttl({'Cache-Control': 'public, max-age=10', 'Age': '30'}, 5), 0)
+        self.assertEqual(cache_ttl({'Cache-Control': 'no-store'}, 5), 0)
+        self.assertEqual(cache_ttl({}, 5), 5)
+
+    @override_settings(GOOGLE_CERTS_REFRESH_AHEAD=600)
+    def test_refreshes_ahead_of_expiry(self):
+        self.server.headers = {'Cache-Control': 'max-age=300'}
+        token = self.make_token()
+        verify_id_token(token, self.certs)
+        self.server.body = {'key-1': self.public_key, 'key-2': 'rotated'}
+        self.server.headers = {'Cache-Control': 'max-age=3600'}
+
+        # Served from the cache while the refresh runs on another thread
+        verify_id_token(token, self.certs)
+        deadline = time.monotonic() + 5
+        while len(self.server.requests) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        while self.certs._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIn('key-2', self.certs.get())
+
+    def test_serves_stale_certs_while_google_is_down(self):
+        self.server.headers = {'Cache-Control': 'max-age=0'}
+        token = self.make_token()
+        verify_id_token(token, self.certs)
+
+        self.server.status = 500
+        with self.assertLogs('social_auth.google', 'WARNING'):
+            self.assertEqual(verify_id_token(token, self.certs)['sub'], '42')
+        # Retries are spaced out instead of made on every sign-in
+        verify_id_token(token, self.certs)
+        self.assertEqual(len(self.server.requests), 2)
+
+    @override_settings(GOOGLE_CERTS_MAX_STALE=0)
+    def test_gives_up_on_stale_certs(self):
+        self.server.headers = {'Cache-Control': 'max-age=0'}
+        verify_id_token(self.make_token(), self.certs)
+        self.server.status = 500
+        time.sleep(0.01)
+        with self.assertRaises(requests.HTTPError):
+            verify_id_token(self.make_token(), self.certs)
+
+    def test_google_validate(self):
+        google_certs.reset()
+        self.addCleanup(google_certs.reset)
+        with override_settings(GOOGLE_CERTS_URL=self.server.url + '/certs'):
+            self.assertEqual(Google.validate(self.make_token())['email'], 'user@example.com')
+            self.assertEqual(Google.validate('not a token'),
+                             'The token is either invalid or has expired')
+
+
+class RegisterSocialUserTest(TestCase):
+
+    def test_new_user_gets_no_password(self):
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode') as encode:
+            data = register_social_user('google', '42', 'new@example.com', 'Ada Lovelace')
+        encode.assert_not_called()
+        self.assertEqual(data['username'], 'adalovelace')
+        self.assertIn('access', data['tokens'])
+        user = User.objects.get(email='new@example.com')
+        self.assertFalse(user.has_usable_password())
+        self.assertTrue(user.is_verified)
+        self.assertEqual(user.auth_provider, 'google')
+
+    def test_existing_user_skips_password_check(self):
+        User.objects.create_user(username='ada', email='ada@example.com',
+                                 auth_provider='google', is_verified=True)
+        with mock.patch.object(User, 'check_password', side_effect=AssertionError):
+            data = register_social_user('google', '42', 'ada@example.com', 'Ada')
+        self.assertEqual(data['username'], 'ada')
+        self.assertIn('refresh', data['tokens'])
+
+    def test_other_provider_is_refused(self):
+        User.objects.create_user(username='ada', email='ada@example.com', password='pass')
+        with self.assertRaisesMessage(AuthenticationFailed, 'Please continue your login using email'):
+            register_social_user('google', '42', 'ada@example.com', 'Ada')
+
+    def test_inactive_user_is_refused(self):
+        User.objects.create_user(username='ada', email='ada@example.com',
+                                 auth_provider='google', is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            register_social_user('google', '42', 'ada@example.com', 'Ada')
+
+    def test_generate_username_in_one_query(self):
+        User.objects.create_user(username='adalovelace', email='a@example.com')
+        User.objects.bulk_create([User(username='adalovelace%d' % i, email='a%d@example.com' % i)
+                                  for i in range(1000)])
+        with self.assertNumQueries(1):
+            username = generate_username('Ada Lovelace')
+        self.assertEqual(username, 'adalovelace1000')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_username('Grace Hopper'), 'gracehopper')
+
+
+@override_settings(SOCIAL_PROVIDER_FAILURE_THRESHOLD=2, SOCIAL_PROVIDER_RESET_TIMEOUT=60)
+class ProviderClientTest(SimpleTestCase):
+
+    def setUp(self):
+        self.server = StubServer()
+        self.addCleanup(self.server.close)
+        self.client = ProviderClient('facebook', 'FACEBOOK_TIMEOUT')
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        self.server.status = 500
+        for _ in range(2):
+            self.assertEqual(self.client.get(self.server.url).status_code, 500)
+        self.assertEqual(self.client.breaker.state, 'open')
+        with self.assertRaises(CircuitOpen):
+            self.client.get(self.server.url)
+        self.assertEqual(len(self.server.requests), 2)
+
+        stats = self.client.stats()
+        self.assertEqual((stats['calls'], stats['failures'], stats['rejected']), (2, 2, 1))
+        self.assertEqual(stats['circuit'], 'open')
+
+    def test_rejected_tokens_are_not_failures(self):
+        self.server.status = 400
+        for _ in range(3):
+            self.client.get(self.server.url)
+        self.assertEqual(self.client.breaker.state, 'closed')
+        self.assertEqual(self.client.stats()['failures'], 0)
+
+    @override_settings(FACEBOOK_TIMEOUT=0.1)
+    def test_timeouts_count_as_failures(self):
+        self.server.delay = 0.5
+        with self.assertRaises(requests.Timeout):
+            self.client.get(self.server.url)
+        self.assertEqual(self.client.stats()['failures'], 1)
+
+    def test_trial_call_closes_the_circuit(self):
+        self.server.status = 500
+        for _ in range(2):
+            self.client.get(self.server.url)
+        with override_settings(SOCIAL_PROVIDER_RESET_TIMEOUT=0):
+            self.assertEqual(self.client.breaker.state, 'half-open')
+            self.server.status = 200
+            self.client.get(self.server.url)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_failed_trial_reopens_the_circuit(self):
+        self.server.status = 500
+        for _ in range(2):
+            self.client.get(self.server.url)
+        with override_settings(SOCIAL_PROVIDER_RESET_TIMEOUT=0):
+            self.client.get(self.server.url)
+        self.assertEqual(self.client.breaker.state, 'open')
+
+    def test_trial_call_failing_with_any_error_reopens_the_circuit(self):
+        self.server.status = 500
+        for _ in range(2):
+            self.client.get(self.server.url)
+        with override_settings(SOCIAL_PROVIDER_RESET_TIMEOUT=0), \
+                mock.patch.object(self.client.session, 'request', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.client.get(self.server.url)
+        with override_settings(SOCIAL_PROVIDER_RESET_TIMEOUT=0):
+            self.server.status = 200
+            self.assertEqual(self.client.get(self.server.url).status_code, 200)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_async_get(self):
+        self.server.body = {'ok': True}
+
+        async def fetch():
+            return await self.client.aget(self.server.url)
+
+        self.assertEqual(async_to_sync(fetch)().json(), {'ok': True})
+
+
+class ProviderAdapterTest(TestCase):
+
+    def setUp(self):
+        self.server = StubServer()
+        self.addCleanup(self.server.close)
+        for client in (facebook_client, twitter_client):
+            client.breaker.reset()
+            self.addCleanup(client.breaker.reset)
+        settings = override_settings(FACEBOOK_GRAPH_URL=self.server.url, TWITTER_API_URL=self.server.url,
+                                     SOCIAL_PROVIDER_FAILURE_THRESHOLD=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        environ = mock.patch.dict(os.environ, TWITTER_API_KEY='consumer', TWITTER_CONSUMER_SECRET='secret')
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def test_facebook_profile(self):
+        self.server.body = {'id': '7', 'email': 'ada@example.com', 'name': 'Ada'}
+        self.assertEqual(Facebook.validate('token'), self.server.body)
+        self.assertIn('access_token=token', self.server.requests[0].path)
+
+        self.server.status = 400
+        self.assertEqual(Facebook.validate('token'), 'The token is invalid or expired.')
+
+    def test_facebook_outage_fails_fast(self):
+        self.server.status = 503
+        for _ in range(2):
+            Facebook.validate('token')
+        with self.assertRaises(ProviderUnavailable):
+            Facebook.validate('token')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_twitter_signed_request(self):
+        self.server.body = {'id_str': '7', 'email': 'ada@example.com', 'name': 'Ada'}
+        profile = TwitterAuthTokenVerification.validate_twitter_auth_tokens('key', 'secret')
+        self.assertEqual(profile, self.server.body)
+        request = self.server.requests[0]
+        self.assertTrue(request.path.startswith('/1.1/account/verify_credentials.json'))
+        self.assertIn('oauth_token="key"', request.headers['Authorization'])
+
+        self.server.status = 401
+        with self.assertRaises(serializers.ValidationError):
+            TwitterAuthTokenVerification.validate_twitter_auth_tokens('key', 'secret')
+
+    def post(self, view, data):
+        request = RequestFactory().post('/', data, content_type='application/json')
+        return async_to_sync(view)(request)
+
+    def test_async_views(self):
+        self.server.body = {'id': '7', 'email': 'ada@example.com', 'name': 'Ada Lovelace'}
+        response = self.post(async_views.facebook, {'auth_token': 'token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['username'], 'adalovelace')
+
+        self.server.body = {'id_str': '8', 'email': 'grace@example.com', 'name': 'Grace'}
+        response = self.post(async_views.twitter, {'access_token_key': 'k', 'access_token_secret': 's'})
+        self.assertEqual(json.loads(response.content)['email'], 'grace@example.com')
+
+    def test_async_view_errors(self):
+        response = self.post(async_views.facebook, {})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {'auth_token': ['This field is required.']})
+
+        self.server.status = 400
+        response = self.post(async_views.facebook, {'auth_token': 'token'})
+        self.assertEqual(json.loads(response.content),
+                         {'auth_token': ['The token  is invalid or expired. Please login again.']})
+
+        self.server.status = 500
+        for _ in range(3):
+            response = self.post(async_views.facebook, {'auth_token': 'token'})
+        self.assertEqual(response.status_code, 503)
@@ -1,7 +1,29 @@
-import twitter
 import os
+
+import requests
+from django.conf import settings
+from requests_oauthlib import OAuth1
 from rest_framework import serializers
 
+from .providers import ProviderUnavailable, twitter_client
+
+
+def verify_credentials_request(access_token_key, access_token_secret):
+    """URL and arguments of the signed account/verify_credentials call."""
+    auth = OAuth1(os.environ.get('TWITTER_API_KEY'),
+                  client_secret=os.environ.get('TWITTER_CONSUMER_SECRET'),
+                  resource_owner_key=access_token_key,
+                  resource_owner_secret=access_token_secret)
+    return settings.TWITTER_API_URL + '/1.1/account/verify_credentials.json', {
+        'params': {'include_email': 'true'}, 'auth': auth}
+
+
+def read_profile(response):
+    if response.status_code != 200:
+        raise serializers.ValidationError({
+            "tokens": ["The tokens are invalid or expired"]})
+    return response.json()
+
 
 class TwitterAuthTokenVerification:
     """
@@ -16,22 +38,17 @@ class TwitterAuthTokenVerification:
         validate_twitter_auth_tokens methods returns a twitter
         user profile info
         """
-
-        consumer_api_key = os.environ.get('TWITTER_API_KEY')
-        consumer_api_secret_key = os.environ.get('TWITTER_CONSUMER_SECRET')
-
+        url, kwargs = verify_credentials_request(access_token_key, access_token_secret)
         try:
-            api = twitter.Api(
-                consumer_key=consumer_api_key,
-                consumer_secret=consumer_api_secret_key,
-                access_token_key=access_token_key,
-                access_token_secret=access_token_secret
-            )
-
-            user_profile_info = api.VerifyCredentials(include_email=True)
-            return user_profile_info.__dict__
+            return read_profile(twitter_client.get(url, **kwargs))
+        except requests.RequestException:
+            raise ProviderUnavailable()
 
-        except Exception as identifier:
-
-            raise serializers.ValidationError({
-                "tokens": ["The tokens are invalid or expired"]})
+    @staticmethod
+    async def avalidate_twitter_auth_tokens(access_token_key, access_token_secret):
+        """validate_twitter_auth_tokens for the async views"""
+        url, kwargs = verify_credentials_request(access_token_key, access_token_secret)
+        try:
+            return read_profile(await twitter_client.aget(url, **kwargs))
+        except requests.RequestException:
+            raise ProviderUnavailable()
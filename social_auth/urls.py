@@ -1,11 +1,16 @@
 from django.urls import path
 
-from .views import GoogleSocialAuthView, FacebookSocialAuthView, TwitterSocialAuthView
+from . import async_views
+from .views import GoogleSocialAuthView, FacebookSocialAuthView, TwitterSocialAuthView, ProviderStatsAPIView
 
 urlpatterns = [
     path('google/', GoogleSocialAuthView.as_view()),
     path('facebook/', FacebookSocialAuthView.as_view()),
     path('twitter/', TwitterSocialAuthView.as_view()),
+    path('async/google/', async_views.google),
+    path('async/facebook/', async_views.facebook),
+    path('async/twitter/', async_views.twitter),
+    path('provider-stats/', ProviderStatsAPIView.as_view()),
 
 
 ]
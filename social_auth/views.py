@@ -1,6 +1,9 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+from . import providers
 from .serializers import GoogleSocialAuthSerializer, TwitterAuthSerializer, FacebookSocialAuthSerializer
 
 
@@ -49,3 +52,11 @@ class TwitterSocialAuthView(GenericAPIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+
+class ProviderStatsAPIView(APIView):
+    """Circuit state, call counts and latency of each sign-in provider."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(providers.stats())